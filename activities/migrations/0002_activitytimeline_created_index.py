@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 04:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activities', '0001_initial'),
+        ('campaigns', '0010_importjob_error_report'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='activitytimeline',
+            index=models.Index(fields=['-created_at', '-id'], name='activities_timeline_created'),
+        ),
+    ]
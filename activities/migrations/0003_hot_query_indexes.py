@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 04:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activities', '0002_activitytimeline_created_index'),
+        ('campaigns', '0013_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='activitytimeline',
+            index=models.Index(fields=['lead', '-created_at'], name='activities_timeline_lead'),
+        ),
+    ]
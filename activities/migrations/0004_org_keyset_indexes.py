@@ -0,0 +1,22 @@
+# Generated by Django 5.2.6 on 2026-10-18 05:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activities', '0003_hot_query_indexes'),
+        ('campaigns', '0021_org_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='activitytimeline',
+            name='activities_timeline_lead',
+        ),
+        migrations.AddIndex(
+            model_name='activitytimeline',
+            index=models.Index(fields=['lead', '-created_at', '-id'], name='activities_timeline_lead'),
+        ),
+    ]
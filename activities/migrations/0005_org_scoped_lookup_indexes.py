@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-18 05:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activities', '0004_org_keyset_indexes'),
+        ('campaigns', '0021_org_keyset_indexes'),
+    ]
+
+    operations = [
+        # activities_timeline_lead starts with lead; only the single-column index
+        # is dropped, AlterField would also drop and re-validate the foreign key
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    'DROP INDEX IF EXISTS "activities_activitytimeline_lead_id_74bd07c9";',
+                    'CREATE INDEX "activities_activitytimeline_lead_id_74bd07c9" ON "activities_activitytimeline" ("lead_id");',
+                ),
+            ],
+            state_operations=[
+                migrations.AlterField(
+                    model_name='activitytimeline',
+                    name='lead',
+                    field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='activities', to='campaigns.lead'),
+                ),
+            ],
+        ),
+    ]
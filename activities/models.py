@@ -5,10 +5,21 @@ from users.models import BaseModel
 # Create your models here.
 
 class ActivityTimeline(BaseModel):
-    lead = models.ForeignKey("campaigns.Lead", related_name="activities", on_delete=models.CASCADE)
+    # served by activities_timeline_lead, which starts with lead
+    lead = models.ForeignKey("campaigns.Lead", related_name="activities", on_delete=models.CASCADE, db_index=False)
     step = models.ForeignKey("campaigns.SequenceStep", on_delete=models.CASCADE, null=True)
     payload = models.JSONField(default=dict)
 
+    class Meta:
+        indexes = [
+            # keyset pages of a large org, whose rows are dense in the global order
+            models.Index(fields=["-created_at", "-id"], name="activities_timeline_created"),
+            # a lead's timeline, newest first. A small org's keyset pages look up the
+            # rows of each of its leads through it and then sort them, as they are
+            # not ordered across leads
+            models.Index(fields=["lead", "-created_at", "-id"], name="activities_timeline_lead"),
+        ]
+
 class AIDraft(BaseModel):
     lead = models.ForeignKey("campaigns.Lead", related_name="ai_drafts", on_delete=models.CASCADE)
     variant = models.CharField(max_length=20)  # concise, detailed, meeting
@@ -3,37 +3,63 @@ from celery import shared_task
 import requests
 from django.conf import settings
 
+from integrations import http_client
+
+
+def request_call(lead_id, phone_number, agent_name):
+    """
+    Sends call request to FastAPI calling service.
+    """
+    '''{
+        "lead_id": 0,
+        "lead_name": "string",
+        "company": "string",
+        "phone_number": "string",
+        "product": "string",
+        "goal": "string"
+    }'''
+    data = {
+        "lead_id": f"{lead_id}",
+        "lead_name": "test",
+        "company": "test",
+        "product": "test",
+        "goal": "test",
+        "phone_number": phone_number,
+        # "webhook_url": f"{settings.BACKEND_URL}/api/v1/calls/webhook/",
+    }
+
+    fastapi_url = f"{settings.CALLING_SERVICE_URL}/call/initiate/"
+    # fastapi_url = "http://127.0.0.1:8001/call/initiate"
+    print(fastapi_url)
+    # not idempotent: a retried POST could place the call twice, so only 429s are retried
+    response = http_client.post(fastapi_url, json=data)
+    response.raise_for_status()
+    return response.json()
+
+
 @shared_task(bind=True, max_retries=3)
 def initiate_call_task(self, lead_id, phone_number, agent_name):
     """
     Sends call request to FastAPI calling service asynchronously.
     """
     try:
-        '''{
-            "lead_id": 0,
-            "lead_name": "string",
-            "company": "string",
-            "phone_number": "string",
-            "product": "string",
-            "goal": "string"
-        }'''
-        data = {
-            "lead_id": f"{lead_id}",
-            "lead_name": "test",
-            "company": "test",
-            "product": "test",
-            "goal": "test",
-            "phone_number": phone_number,
-            # "webhook_url": f"{settings.BACKEND_URL}/api/v1/calls/webhook/",
-        }
-
-        fastapi_url = f"{settings.CALLING_SERVICE_URL}/call/initiate/"
-        # fastapi_url = "http://127.0.0.1:8001/call/initiate"
-        print(fastapi_url)
-        response = requests.post(fastapi_url, json=data)
-        response.raise_for_status()
-
-        return {"status": "success", "response": response.json()}
+        return {"status": "success", "response": request_call(lead_id, phone_number, agent_name)}
 
     except requests.exceptions.RequestException as e:
         self.retry(exc=e, countdown=10)
+
+
+@shared_task
+def initiate_calls_batch_task(calls):
+    """
+    Requests a batch of calls, each given as [lead_id, phone_number, agent_name].
+    A failed request is handed to initiate_call_task so it gets the usual retries.
+    """
+    results = []
+    for lead_id, phone_number, agent_name in calls:
+        try:
+            results.append({"status": "success", "response": request_call(lead_id, phone_number, agent_name)})
+        except requests.exceptions.RequestException as e:
+            initiate_call_task.apply_async(args=[lead_id, phone_number, agent_name], countdown=10)
+            results.append({"status": "retrying", "lead_id": lead_id, "error": str(e)})
+    return results
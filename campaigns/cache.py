@@ -0,0 +1,103 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+# How long one request may hold the recompute lock, and how long the others
+# wait for its result before computing it themselves.
+RECOMPUTE_LOCK_TIMEOUT = 30
+RECOMPUTE_WAIT_SECONDS = 2
+RECOMPUTE_POLL_INTERVAL = 0.05
+
+LEADS = "leads"
+EMAILS = "emails"
+CAMPAIGNS = "campaigns"
+INTEGRATIONS = "integrations"
+
+
+def _tag_key(org_id, tag):
+    return f"org:{org_id}:tag:{tag}"
+
+
+def _tag_versions(org_id, tags):
+    keys = [_tag_key(org_id, tag) for tag in tags]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # start from the clock rather than 1, so a version key that was evicted
+            # never comes back to a number old cached payloads were stored under
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+    return [str(versions[key]) for key in keys]
+
+
+def bump_org_tags(org_id, *tags):
+    """Invalidates every cached payload of the org that depends on one of ``tags``."""
+    for tag in tags:
+        key = _tag_key(org_id, tag)
+        try:
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.set(key, time.time_ns(), timeout=None)
+        except Exception:
+            # payloads then live until ORG_CACHE_TIMEOUT at most
+            logger.exception("Could not bump cache tag %s", key)
+
+
+def bump_org_tags_on_commit(org_id, *tags):
+    """
+    Bumps the tags once the current transaction commits. Bumping earlier would
+    let a concurrent request cache the not yet committed state under the new
+    version.
+    """
+    transaction.on_commit(lambda: bump_org_tags(org_id, *tags))
+
+
+def cached_org_data(org, name, tags, compute, timeout=None):
+    """
+    Returns ``compute()`` for ``org``, cached under the current versions of
+    ``tags``. After an invalidation only the request that wins the recompute
+    lock runs ``compute``; the others wait briefly for its result. When the
+    cache is unavailable the data is computed without it.
+    """
+    try:
+        versions = _tag_versions(org.id, tags)
+        key = f"org:{org.id}:{name}:{'.'.join(versions)}"
+        data = cache.get(key)
+        if data is not None:
+            return data
+        lock_key = f"{key}:lock"
+        locked = cache.add(lock_key, 1, timeout=RECOMPUTE_LOCK_TIMEOUT)
+    except Exception:
+        logger.exception("Cache unavailable, computing %s directly", name)
+        return compute()
+
+    if locked:
+        try:
+            data = compute()
+            _cache_quietly(cache.set, key, data, settings.ORG_CACHE_TIMEOUT if timeout is None else timeout)
+        finally:
+            _cache_quietly(cache.delete, lock_key)
+        return data
+
+    deadline = time.monotonic() + RECOMPUTE_WAIT_SECONDS
+    while time.monotonic() < deadline:
+        time.sleep(RECOMPUTE_POLL_INTERVAL)
+        data = _cache_quietly(cache.get, key)
+        if data is not None:
+            return data
+    return compute()
+
+
+def _cache_quietly(operation, key, *args):
+    """Runs a cache operation on ``key`` whose failure only costs a later cache miss; None if it failed."""
+    try:
+        return operation(key, *args)
+    except Exception:
+        logger.exception("Cache operation on %s failed", key)
+        return None
@@ -0,0 +1,121 @@
+from django.db import connection, transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+
+from campaigns.models import Campaign, CampaignCounter, Lead, LeadEmail, SequenceStep
+
+COUNT_FIELDS = CampaignCounter.COUNT_FIELDS
+
+
+def compute_counters(org_ids=None):
+    """
+    Counts everything from the source tables, keyed by (org_id, campaign_id).
+    Every campaign and every org with a campaign gets a row, even when empty,
+    the same rows the triggers create.
+    """
+    leads = Lead.objects.all()
+    emails = LeadEmail.objects.all()
+    steps = SequenceStep.objects.all()
+    campaigns = Campaign.objects.all()
+    if org_ids is not None:
+        leads = leads.filter(org_id__in=org_ids)
+        emails = emails.filter(lead__org_id__in=org_ids)
+        steps = steps.filter(campaign__org_id__in=org_ids)
+        campaigns = campaigns.filter(org_id__in=org_ids)
+
+    counters = {}
+
+    def bucket(org_id, campaign_id):
+        return counters.setdefault((org_id, campaign_id), dict.fromkeys(COUNT_FIELDS, 0))
+
+    for org_id, campaign_id in campaigns.values_list("org_id", "id"):
+        bucket(org_id, campaign_id)
+        bucket(org_id, None)
+
+    for row in leads.order_by().values("org_id", "campaign_id").annotate(
+        leads_total=Count("id"),
+        leads_new=Count("id", filter=Q(status="new")),
+        leads_contacted=Count("id", filter=Q(status="contacted")),
+        leads_replied=Count("id", filter=Q(status="replied")),
+    ):
+        bucket(row.pop("org_id"), row.pop("campaign_id")).update(row)
+
+    for row in emails.order_by().values("lead__org_id", "lead__campaign_id").annotate(
+        emails_total=Count("id"),
+        emails_draft=Count("id", filter=Q(status="draft")),
+        emails_sent=Count("id", filter=Q(status="sent")),
+        emails_failed=Count("id", filter=Q(status="failed")),
+        emails_opened=Count("id", filter=Q(opened_at__isnull=False)),
+        emails_replied=Count("id", filter=Q(replied_at__isnull=False)),
+    ):
+        bucket(row.pop("lead__org_id"), row.pop("lead__campaign_id")).update(row)
+
+    for row in steps.order_by().values("campaign__org_id", "campaign_id").annotate(sequence_steps=Count("id")):
+        bucket(row.pop("campaign__org_id"), row.pop("campaign_id")).update(row)
+
+    return counters
+
+
+def _lock_sources():
+    # blocks writers until the surrounding transaction ends, so the recount
+    # cannot race with the triggers
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "LOCK TABLE campaigns_campaign, campaigns_lead, campaigns_leademail, campaigns_sequencestep "
+            "IN SHARE ROW EXCLUSIVE MODE"
+        )
+
+
+def _stored_counters(org_ids=None):
+    stored = CampaignCounter.objects.all()
+    if org_ids is not None:
+        stored = stored.filter(org_id__in=org_ids)
+    return {(row.org_id, row.campaign_id): row for row in stored}
+
+
+def verify_counters(org_ids=None):
+    """Returns ``(org_id, campaign_id, field, stored, expected)`` for every counter that is off."""
+    with transaction.atomic():
+        _lock_sources()
+        expected = compute_counters(org_ids)
+        stored = _stored_counters(org_ids)
+
+    mismatches = []
+    for key in sorted(set(expected) | set(stored), key=lambda k: (str(k[0]), str(k[1] or ""))):
+        expected_counts = expected.get(key, dict.fromkeys(COUNT_FIELDS, 0))
+        row = stored.get(key)
+        for field in COUNT_FIELDS:
+            stored_value = getattr(row, field) if row else None
+            if stored_value != expected_counts[field]:
+                mismatches.append((key[0], key[1], field, stored_value, expected_counts[field]))
+    return mismatches
+
+
+def rebuild_counters(org_ids=None):
+    """Recounts and overwrites the counter rows; returns the number of rows written."""
+    with transaction.atomic():
+        _lock_sources()
+        expected = compute_counters(org_ids)
+        stored = _stored_counters(org_ids)
+
+        CampaignCounter.objects.bulk_create(
+            [
+                CampaignCounter(org_id=org_id, campaign_id=campaign_id, **counts)
+                for (org_id, campaign_id), counts in expected.items()
+            ],
+            update_conflicts=True,
+            unique_fields=["org", "campaign"],
+            update_fields=COUNT_FIELDS + ["updated_at"],
+            batch_size=1000,
+        )
+        # rows nothing counts towards any more, e.g. an org's "no campaign" row
+        stale = [row.id for key, row in stored.items() if key not in expected]
+        CampaignCounter.objects.filter(id__in=stale).update(**dict.fromkeys(COUNT_FIELDS, 0))
+    return len(expected)
+
+
+def org_counter_totals(org):
+    """The counters of ``org`` summed over its campaigns, in one query."""
+    return CampaignCounter.objects.filter(org=org).aggregate(
+        **{field: Coalesce(Sum(field), 0) for field in COUNT_FIELDS}
+    )
@@ -0,0 +1,113 @@
+import csv
+import json
+from datetime import date, datetime
+from uuid import UUID
+
+from django.db.models import CharField, Value
+from django.db.models.functions import Coalesce, Concat, NullIf, Trim
+from django.http import StreamingHttpResponse
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+# leading characters that make a CSV cell a formula, escaped with a quote
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+# (column header, queryset lookup) pairs, in output order
+LEAD_EXPORT_COLUMNS = [
+    ("id", "id"),
+    ("campaign", "campaign_id"),
+    ("campaign_name", "campaign__name"),
+    ("first_name", "first_name"),
+    ("last_name", "last_name"),
+    ("email", "email"),
+    ("company", "company"),
+    ("linkedin_url", "linkedin_url"),
+    ("website", "website"),
+    ("phone", "phone"),
+    ("status", "status"),
+    ("last_contacted_at", "last_contacted_at"),
+    ("created_at", "created_at"),
+    ("updated_at", "updated_at"),
+]
+
+EMAIL_EXPORT_COLUMNS = [
+    ("id", "id"),
+    ("lead", "lead_id"),
+    ("lead_name", "lead_name"),
+    ("lead_email", "lead__email"),
+    ("subject", "subject"),
+    ("body", "body"),
+    ("preview", "preview"),
+    ("status", "status"),
+    ("sent_at", "sent_at"),
+    ("opened_at", "opened_at"),
+    ("replied_at", "replied_at"),
+    ("gmail_message_id", "gmail_message_id"),
+    ("gmail_thread_id", "gmail_thread_id"),
+    ("created_at", "created_at"),
+    ("updated_at", "updated_at"),
+]
+
+
+def annotate_lead_name(queryset):
+    """Adds ``lead_name`` computed in SQL the way LeadEmailSerializer.get_lead_name does."""
+    full_name = Trim(Concat("lead__first_name", Value(" "), "lead__last_name", output_field=CharField()))
+    return queryset.annotate(
+        lead_name=Coalesce(NullIf(full_name, Value("")), "lead__email", output_field=CharField())
+    )
+
+
+def _to_text(value):
+    if value is None:
+        return ""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    text = str(value)
+    if text.startswith(FORMULA_PREFIXES):
+        return "'" + text
+    return text
+
+
+def _to_json(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+class _Echo:
+    """File-like object handing back whatever csv.writer writes to it."""
+
+    def write(self, value):
+        return value
+
+
+def _stream_csv(headers, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(headers)
+    for row in rows:
+        yield writer.writerow([_to_text(value) for value in row])
+
+
+def _stream_ndjson(headers, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(headers, row)), default=_to_json) + "\n"
+
+
+def streaming_export(queryset, columns, export_format, filename):
+    """
+    Streams ``queryset`` as CSV or NDJSON. Rows are read through a server-side
+    cursor in chunks of EXPORT_CHUNK_SIZE and written one at a time, so memory
+    stays flat and the first bytes go out before the query has been consumed.
+    """
+    headers = [header for header, _ in columns]
+    rows = queryset.values_list(*[lookup for _, lookup in columns]).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    stream = _stream_csv(headers, rows) if export_format == "csv" else _stream_ndjson(headers, rows)
+
+    response = StreamingHttpResponse(stream, content_type=EXPORT_FORMATS[export_format])
+    response["Content-Disposition"] = f'attachment; filename="{filename}.{export_format}"'
+    return response
@@ -0,0 +1,30 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from campaigns.rollups import backfill_rollups
+
+
+def parse_day(value):
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f"Invalid date {value!r}, expected YYYY-MM-DD")
+
+
+class Command(BaseCommand):
+    help = "Recounts the daily email rollups from LeadEmail, for history or after edits the periodic task cannot see."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--org", action="append", dest="orgs", help="Limit to this organization id (repeatable).")
+        parser.add_argument("--since", help="First day to recount, YYYY-MM-DD (default: the oldest email).")
+        parser.add_argument("--until", help="Last day to recount, YYYY-MM-DD (default: today, UTC).")
+
+    def handle(self, *args, **options):
+        first_day = parse_day(options["since"]) if options["since"] else None
+        last_day = parse_day(options["until"]) if options["until"] else None
+        if first_day and last_day and first_day > last_day:
+            raise CommandError("--since must not be after --until")
+
+        rows = backfill_rollups(options["orgs"], first_day, last_day)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {rows} rollup rows"))
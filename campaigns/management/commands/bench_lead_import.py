@@ -0,0 +1,81 @@
+import time
+
+import pandas as pd
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models.signals import post_save
+
+from campaigns.models import Lead
+from campaigns.signals import auto_enrich_lead
+from campaigns.utils import LEAD_UPSERT_CHUNK_SIZE, add_leads_to_db
+from users.models import Organization
+
+
+def row_by_row_import(df, org):
+    """The pre-bulk import loop, kept here as the benchmark baseline."""
+    created, updated = 0, 0
+    for _, row in df.iterrows():
+        _, was_created = Lead.objects.update_or_create(
+            email=row["email"],
+            org=org,
+            defaults={
+                "org": org,
+                "first_name": row["first_name"],
+                "last_name": row["last_name"],
+                "company": row["company"],
+                "phone": row["phone"],
+                "website": row["website"],
+            },
+        )
+        if was_created:
+            created += 1
+        else:
+            updated += 1
+    return {"created": created, "updated": updated}
+
+
+class Command(BaseCommand):
+    help = "Compares lead import throughput of the row-by-row loop against the bulk upsert path."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=5000)
+        parser.add_argument("--chunk-size", type=int, default=LEAD_UPSERT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        rows = options["rows"]
+        chunk_size = options["chunk_size"]
+
+        # Side effects (crawls, drafts, calls) are not part of what is being measured.
+        post_save.disconnect(auto_enrich_lead, sender=Lead)
+        try:
+            with transaction.atomic():
+                org = Organization.objects.create(name="bench-lead-import")
+                for label, prefix, run in (
+                    ("row-by-row", "loop", lambda df: row_by_row_import(df, org)),
+                    ("bulk upsert", "bulk", lambda df: add_leads_to_db(df, org, chunk_size=chunk_size)),
+                ):
+                    df = self.make_frame(prefix, rows)
+                    for phase in ("insert", "update"):
+                        started = time.perf_counter()
+                        stats = run(df)
+                        elapsed = time.perf_counter() - started
+                        self.stdout.write(
+                            f"{label:<12} {phase:<6} {rows} rows in {elapsed:.2f}s "
+                            f"({rows / elapsed:,.0f} rows/s) {stats}"
+                        )
+                transaction.set_rollback(True)
+        finally:
+            post_save.connect(auto_enrich_lead, sender=Lead)
+
+    @staticmethod
+    def make_frame(prefix, rows):
+        return pd.DataFrame(
+            {
+                "email": [f"{prefix}-{i}@bench.example.com" for i in range(rows)],
+                "first_name": [f"First{i}" for i in range(rows)],
+                "last_name": [f"Last{i}" for i in range(rows)],
+                "company": [f"Company {i % 500}" for i in range(rows)],
+                "phone": [f"+1555{i:07d}" for i in range(rows)],
+                "website": [f"https://company{i % 500}.example.com" for i in range(rows)],
+            }
+        )
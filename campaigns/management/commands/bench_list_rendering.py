@@ -0,0 +1,89 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models.signals import post_save
+from rest_framework.renderers import JSONRenderer
+
+from campaigns.models import Campaign, Lead, LeadEmail
+from campaigns.renderers import ORJSONRenderer
+from campaigns.serializers import LeadEmailSerializer, LeadSerializer
+from campaigns.signals import auto_enrich_lead
+from users.models import Organization
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares list serialization throughput of ModelSerializer + JSONRenderer "
+        "against .values() rows + ORJSONRenderer, and checks both produce the same bytes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=5000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        rows = options["rows"]
+        repeat = options["repeat"]
+
+        # Side effects (crawls, drafts, calls) are not part of what is being measured.
+        post_save.disconnect(auto_enrich_lead, sender=Lead)
+        try:
+            with transaction.atomic():
+                org = self.make_data(rows)
+                leads = Lead.objects.filter(org=org).order_by("-created_at", "-id")
+                emails = LeadEmail.objects.filter(lead__org=org).order_by("-created_at", "-id")
+                for label, queryset, serializer_class in (
+                    ("leads", leads, LeadSerializer),
+                    ("emails", emails, LeadEmailSerializer),
+                ):
+                    self.compare(label, queryset, serializer_class, rows, repeat)
+                transaction.set_rollback(True)
+        finally:
+            post_save.connect(auto_enrich_lead, sender=Lead)
+
+    def compare(self, label, queryset, serializer_class, rows, repeat):
+        def serializer_path():
+            data = serializer_class(list(serializer_class.project_queryset(queryset)), many=True).data
+            return JSONRenderer().render(data)
+
+        def values_path():
+            data = serializer_class.build_rows(list(serializer_class.values_queryset(queryset)))
+            return ORJSONRenderer().render(data)
+
+        outputs = {}
+        for name, run in (("serializer", serializer_path), ("values+orjson", values_path)):
+            run()  # warm up connection and caches
+            started = time.perf_counter()
+            for _ in range(repeat):
+                outputs[name] = run()
+            elapsed = (time.perf_counter() - started) / repeat
+            self.stdout.write(f"{label:<7} {name:<14} {rows} rows in {elapsed * 1000:.1f}ms ({rows / elapsed:,.0f} rows/s)")
+
+        if outputs["serializer"] != outputs["values+orjson"]:
+            raise CommandError(f"{label}: fast path output differs from the serializer output")
+        self.stdout.write(f"{label:<7} outputs are byte-identical ({len(outputs['serializer']):,} bytes)")
+
+    @staticmethod
+    def make_data(rows):
+        org = Organization.objects.create(name="bench-list-rendering")
+        campaign = Campaign.objects.create(org=org, name="Bench campaign")
+        leads = Lead.objects.bulk_create(
+            Lead(
+                org=org,
+                # every other lead without a campaign, exercising the omitted campaign_name
+                campaign=campaign if i % 2 else None,
+                first_name=f"First{i}" if i % 3 else "",
+                last_name=f"Last{i}",
+                email=f"lead-{i}@bench.example.com",
+                company=f"Company {i % 500} — ünïcode",
+                phone=f"+1555{i:07d}",
+                website=f"https://company{i % 500}.example.com",
+            )
+            for i in range(rows)
+        )
+        LeadEmail.objects.bulk_create(
+            LeadEmail(lead=lead, subject=f"Hello {i}", body="Body\nwith lines", preview="Body", status="draft")
+            for i, lead in enumerate(leads)
+        )
+        return org
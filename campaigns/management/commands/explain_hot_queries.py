@@ -0,0 +1,125 @@
+import re
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from activities.models import ActivityTimeline
+from campaigns.models import Lead, LeadEmail, SequenceStep
+from campaigns.pagination import KeysetPagination
+from campaigns.tasks import unenriched_leads
+from campaigns.views import EmailStatsView
+from integrations.models import Integration
+
+
+INDEX_SCAN_PATTERN = re.compile(r"(?:Index Scan|Index Only Scan|Bitmap Index Scan)(?: Backward)? (?:using|on) (\w+)")
+
+
+def first_page(queryset):
+    """The first keyset page of a list view over ``queryset``."""
+    return queryset.order_by(*KeysetPagination.ordering)[: KeysetPagination.page_size + 1]
+
+
+def hot_queries(org_id):
+    """
+    (label, queryset, indexes meant to serve it) for the hot read paths of
+    ``org_id``, built the way the views build them. The indexes are those for
+    an org holding a small share of the rows; the list pages of an org that
+    holds most of them are served by the global created_at indexes instead.
+    """
+    lead_id, campaign_id = uuid.uuid4(), uuid.uuid4()
+    return [
+        (
+            "dashboard lead counts by status",
+            Lead.objects.filter(org_id=org_id, status="new").values("id"),
+            ("campaigns_lead_org_status",),
+        ),
+        (
+            "lead list page",
+            first_page(Lead.objects.filter(org_id=org_id)),
+            ("campaigns_lead_org_created",),
+        ),
+        (
+            "email list page",
+            first_page(LeadEmail.objects.filter(lead__org_id=org_id)),
+            # the org's emails are looked up per lead and then sorted
+            ("campaigns_email_lead_sent",),
+        ),
+        (
+            "activity list page",
+            # the org's rows are looked up per lead and then sorted
+            first_page(ActivityTimeline.objects.filter(lead__org_id=org_id)),
+            ("activities_timeline_lead",),
+        ),
+        (
+            "import upsert: existing emails",
+            Lead.objects.filter(org_id=org_id, email__in=["a@example.com", "b@example.com"]).values("email"),
+            ("campaigns_lead_org_email_uniq",),
+        ),
+        (
+            "daily_enrich_leads",
+            unenriched_leads()[:50],
+            ("campaigns_lead_unenriched",),
+        ),
+        (
+            "new lead intro draft check",
+            LeadEmail.objects.filter(lead_id__in=[lead_id], status="draft").values("lead_id"),
+            ("campaigns_email_lead_sent",),
+        ),
+        (
+            "email stats sent timeline",
+            EmailStatsView.timeline_queryset(org_id),
+            ("campaigns_email_lead_sent",),
+        ),
+        (
+            "campaign sequence steps",
+            SequenceStep.objects.filter(campaign_id=campaign_id).order_by("order"),
+            ("campaigns_step_campaign_order",),
+        ),
+        (
+            "lead activity timeline",
+            ActivityTimeline.objects.filter(lead_id=lead_id).order_by("-created_at"),
+            ("activities_timeline_lead",),
+        ),
+        (
+            "integration lookup",
+            Integration.objects.filter(org_id=org_id, provider="gmail"),
+            ("integrations_org_provider",),
+        ),
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs EXPLAIN on the hot tenant-scoped queries and fails if any of them "
+        "needs a sequential scan."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--org", help="Organization id to plan for; defaults to the org of the newest lead.")
+        parser.add_argument("--verbose-plans", action="store_true", help="Print the full plan of every query.")
+
+    def handle(self, *args, **options):
+        # plans depend on how many rows the org has, so prefer a real one
+        org_id = options["org"] or Lead.objects.order_by("-created_at").values_list("org_id", flat=True).first()
+        failures = []
+        with transaction.atomic():
+            # On small or empty tables the planner rightly prefers a sequential scan,
+            # so discourage it to check that an index is usable at all.
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+
+            for label, queryset, indexes in hot_queries(org_id or uuid.uuid4()):
+                plan = queryset.explain()
+                used = INDEX_SCAN_PATTERN.findall(plan)
+                ok = bool(used) and "Seq Scan" not in plan
+                # on tiny tables the planner may pick a sibling index with the same leading column
+                note = "" if set(indexes) & set(used) else f" (expected {' or '.join(indexes)})"
+                self.stdout.write(f"{'ok' if ok else 'SEQSCAN':<8} {label:<32} {', '.join(used) or '-'}{note}")
+                if options["verbose_plans"] or not ok:
+                    self.stdout.write(plan)
+                if not ok:
+                    failures.append(label)
+
+        if failures:
+            raise CommandError(f"Sequential scan in: {', '.join(failures)}")
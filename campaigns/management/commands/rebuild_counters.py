@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from campaigns.counters import rebuild_counters, verify_counters
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the per-org/per-campaign counter table from the source tables, or verifies it with --verify."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--org", action="append", dest="orgs", help="Limit to this organization id (repeatable).")
+        parser.add_argument("--verify", action="store_true", help="Only compare, exit non-zero on mismatches.")
+
+    def handle(self, *args, **options):
+        org_ids = options["orgs"]
+
+        if options["verify"]:
+            mismatches = verify_counters(org_ids)
+            for org_id, campaign_id, field, stored, expected in mismatches:
+                self.stdout.write(f"org={org_id} campaign={campaign_id or '-'} {field}: stored={stored} expected={expected}")
+            if mismatches:
+                raise CommandError(f"{len(mismatches)} counter mismatches")
+            self.stdout.write(self.style.SUCCESS("Counters are consistent"))
+            return
+
+        rows = rebuild_counters(org_ids)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} counter rows"))
@@ -0,0 +1,45 @@
+# Generated manually
+
+from django.db import migrations
+from django.db.models import Count
+
+
+def merge_duplicate_leads(apps, schema_editor):
+    """
+    Collapse leads sharing the same (org, email) onto the most recently updated
+    row so the unique constraint can be created. Related emails, activities and
+    AI drafts are re-pointed at the surviving lead before the duplicates go.
+    """
+    Lead = apps.get_model("campaigns", "Lead")
+    LeadEmail = apps.get_model("campaigns", "LeadEmail")
+    ActivityTimeline = apps.get_model("activities", "ActivityTimeline")
+    AIDraft = apps.get_model("activities", "AIDraft")
+
+    duplicates = (
+        Lead.objects.values("org_id", "email")
+        .annotate(total=Count("id"))
+        .filter(total__gt=1)
+    )
+    for dup in duplicates.iterator():
+        ids = list(
+            Lead.objects.filter(org_id=dup["org_id"], email=dup["email"])
+            .order_by("-updated_at")
+            .values_list("id", flat=True)
+        )
+        keep, stale = ids[0], ids[1:]
+        LeadEmail.objects.filter(lead_id__in=stale).update(lead_id=keep)
+        ActivityTimeline.objects.filter(lead_id__in=stale).update(lead_id=keep)
+        AIDraft.objects.filter(lead_id__in=stale).update(lead_id=keep)
+        Lead.objects.filter(id__in=stale).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("campaigns", "0006_alter_leademail_id"),
+        ("activities", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_leads, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated manually
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("campaigns", "0007_merge_duplicate_leads"),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name="lead",
+            constraint=models.UniqueConstraint(fields=("org", "email"), name="campaigns_lead_org_email_uniq"),
+        ),
+    ]
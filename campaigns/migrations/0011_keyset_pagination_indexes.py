@@ -0,0 +1,22 @@
+# Generated by Django 5.2.6 on 2026-10-18 04:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('campaigns', '0010_importjob_error_report'),
+        ('users', '0005_add_company_product_fields'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['org', '-created_at', '-id'], name='campaigns_lead_org_created'),
+        ),
+        migrations.AddIndex(
+            model_name='leademail',
+            index=models.Index(fields=['-created_at', '-id'], name='campaigns_leademail_created'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated manually
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import BtreeGinExtension
+from django.db import migrations
+
+# Names and emails are indexed without stemming, free text with the english
+# configuration. Emails and websites are also indexed with their punctuation
+# split out so "acme" matches "jane@acme.io" and "https://acme.io/about".
+# jsonb_to_tsvector picks up every string Firecrawl stored in Lead.enriched.
+CREATE_TRIGGER = """
+CREATE OR REPLACE FUNCTION campaigns_lead_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('simple', coalesce(NEW.first_name, '') || ' ' || coalesce(NEW.last_name, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(NEW.email, '') || ' ' || translate(coalesce(NEW.email, ''), '@.-_+', '     ')), 'A') ||
+        setweight(to_tsvector('english', coalesce(NEW.company, '')), 'B') ||
+        setweight(to_tsvector('simple', translate(coalesce(NEW.website, ''), '/:.-?=&', '       ')), 'C') ||
+        setweight(jsonb_to_tsvector('english', coalesce(NEW.enriched, '{}'::jsonb), '["string"]'), 'D');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER campaigns_lead_search_vector
+BEFORE INSERT OR UPDATE OF first_name, last_name, email, company, website, enriched ON campaigns_lead
+FOR EACH ROW EXECUTE FUNCTION campaigns_lead_search_vector_update();
+
+UPDATE campaigns_lead SET first_name = first_name;
+"""
+
+DROP_TRIGGER = """
+DROP TRIGGER IF EXISTS campaigns_lead_search_vector ON campaigns_lead;
+DROP FUNCTION IF EXISTS campaigns_lead_search_vector_update();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("campaigns", "0011_keyset_pagination_indexes"),
+    ]
+
+    operations = [
+        BtreeGinExtension(),
+        migrations.AddField(
+            model_name="lead",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunSQL(CREATE_TRIGGER, DROP_TRIGGER),
+        migrations.AddIndex(
+            model_name="lead",
+            index=django.contrib.postgres.indexes.GinIndex(fields=["org", "search_vector"], name="campaigns_lead_search"),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.6 on 2026-10-18 04:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('campaigns', '0013_trigram_indexes'),
+        ('users', '0005_add_company_product_fields'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['org', 'status'], name='campaigns_lead_org_status'),
+        ),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(condition=models.Q(('enriched', {}), models.Q(('website', ''), _negated=True)), fields=['created_at'], name='campaigns_lead_unenriched'),
+        ),
+        migrations.AddIndex(
+            model_name='leademail',
+            index=models.Index(fields=['lead', 'status'], name='campaigns_email_lead_status'),
+        ),
+        migrations.AddIndex(
+            model_name='leademail',
+            index=models.Index(fields=['status', '-sent_at'], name='campaigns_email_status_sent'),
+        ),
+        migrations.AddIndex(
+            model_name='sequencestep',
+            index=models.Index(fields=['campaign', 'order'], name='campaigns_step_campaign_order'),
+        ),
+    ]
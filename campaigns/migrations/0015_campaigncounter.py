@@ -0,0 +1,315 @@
+# Generated manually
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+COUNT_FIELDS = [
+    "leads_total",
+    "leads_new",
+    "leads_contacted",
+    "leads_replied",
+    "emails_total",
+    "emails_draft",
+    "emails_sent",
+    "emails_failed",
+    "emails_opened",
+    "emails_replied",
+    "sequence_steps",
+]
+
+
+def lead_counts(alias):
+    return {
+        "leads_total": "1",
+        "leads_new": f"({alias}.status = 'new')::int",
+        "leads_contacted": f"({alias}.status = 'contacted')::int",
+        "leads_replied": f"({alias}.status = 'replied')::int",
+    }
+
+
+def email_counts(alias):
+    return {
+        "emails_total": "1",
+        "emails_draft": f"({alias}.status = 'draft')::int",
+        "emails_sent": f"({alias}.status = 'sent')::int",
+        "emails_failed": f"({alias}.status = 'failed')::int",
+        "emails_opened": f"campaigns_meta_flag({alias}.meta, 'opened_at')",
+        "emails_replied": f"campaigns_meta_flag({alias}.meta, 'replied_at')",
+    }
+
+
+STEP_COUNTS = {"sequence_steps": "1"}
+
+
+def select(org, campaign, sign, counts, source):
+    """One signed contribution per source row, in the column order of campaigns_counter_delta."""
+    columns = [f"{org} AS org_id", f"{campaign} AS campaign_id"]
+    columns += [f"{sign} * {counts[name]} AS {name}" if name in counts else f"0 AS {name}" for name in COUNT_FIELDS]
+    return f"SELECT {', '.join(columns)} FROM {source}"
+
+
+def apply(parts, create_missing):
+    """Sums the contributions per (org, campaign) and hands them to campaigns_counter_apply."""
+    sums = ", ".join(f"sum({name})" for name in COUNT_FIELDS)
+    union = "\n            UNION ALL ".join(parts)
+    return f"""PERFORM campaigns_counter_apply(ARRAY(
+            SELECT ROW(org_id, campaign_id, {sums})::campaigns_counter_delta
+            FROM ({union}) d
+            GROUP BY org_id, campaign_id
+        ), {create_missing});"""
+
+
+def trigger_function(name, insert, update, delete):
+    return f"""
+CREATE OR REPLACE FUNCTION {name}() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        {insert}
+    ELSIF TG_OP = 'UPDATE' THEN
+        {update}
+    ELSE
+        {delete}
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+"""
+
+
+def statement_triggers(table, function, events=("INSERT", "UPDATE", "DELETE")):
+    # transition tables are only allowed on single-event triggers
+    referencing = {
+        "INSERT": "REFERENCING NEW TABLE AS new_rows",
+        "UPDATE": "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows",
+        "DELETE": "REFERENCING OLD TABLE AS old_rows",
+    }
+    return "".join(
+        f"CREATE TRIGGER {table}_counters_{event.lower()} AFTER {event} ON {table} "
+        f"{referencing[event]} FOR EACH STATEMENT EXECUTE FUNCTION {function}();\n"
+        for event in events
+    )
+
+
+COLUMNS = ", ".join(COUNT_FIELDS)
+
+# Counts a meta key the way Python would test meta.get(key) for truthiness.
+# Deltas from deletes and updates only touch existing rows: while an org or a
+# campaign is being deleted its counter rows may already be gone, and creating
+# them again would violate the foreign key. Rows for every campaign and for
+# "no campaign" are created with the campaign, so updates always find theirs.
+CREATE_FUNCTIONS = f"""
+CREATE TYPE campaigns_counter_delta AS (
+    org_id uuid,
+    campaign_id uuid,
+    {", ".join(f"{name} bigint" for name in COUNT_FIELDS)}
+);
+
+CREATE OR REPLACE FUNCTION campaigns_meta_flag(meta jsonb, key text) RETURNS integer AS $$
+    SELECT CASE WHEN coalesce(meta ->> key, '') IN ('', 'false', '0', '[]', '{{}}') THEN 0 ELSE 1 END
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION campaigns_counter_apply(deltas campaigns_counter_delta[], create_missing boolean)
+RETURNS void AS $$
+BEGIN
+    IF create_missing THEN
+        INSERT INTO campaigns_campaigncounter AS c (id, created_at, updated_at, org_id, campaign_id, {COLUMNS})
+        SELECT gen_random_uuid(), now(), now(), d.org_id, d.campaign_id, {", ".join(f"d.{name}" for name in COUNT_FIELDS)}
+        FROM unnest(deltas) d
+        ORDER BY d.org_id, d.campaign_id
+        ON CONFLICT (org_id, campaign_id) DO UPDATE SET
+            {", ".join(f"{name} = c.{name} + EXCLUDED.{name}" for name in COUNT_FIELDS)},
+            updated_at = EXCLUDED.updated_at;
+    ELSE
+        UPDATE campaigns_campaigncounter c SET
+            {", ".join(f"{name} = c.{name} + d.{name}" for name in COUNT_FIELDS)},
+            updated_at = now()
+        FROM unnest(deltas) d
+        WHERE c.org_id = d.org_id
+            AND c.campaign_id IS NOT DISTINCT FROM d.campaign_id
+            AND ({" OR ".join(f"d.{name} <> 0" for name in COUNT_FIELDS)});
+    END IF;
+END
+$$ LANGUAGE plpgsql;
+"""
+
+LEAD_CHANGED = (
+    "old_rows o JOIN new_rows n ON n.id = o.id "
+    "WHERE (o.org_id, o.campaign_id, o.status) IS DISTINCT FROM (n.org_id, n.campaign_id, n.status)"
+)
+# emails are counted in the bucket of their lead, so they move with it
+LEAD_EMAILS_MOVED = (
+    "old_rows o JOIN new_rows n ON n.id = o.id JOIN campaigns_leademail e ON e.lead_id = n.id "
+    "WHERE (o.org_id, o.campaign_id) IS DISTINCT FROM (n.org_id, n.campaign_id)"
+)
+EMAIL_CHANGED = (
+    "old_rows o JOIN new_rows n ON n.id = o.id "
+    "JOIN campaigns_lead ol ON ol.id = o.lead_id JOIN campaigns_lead nl ON nl.id = n.lead_id "
+    "WHERE (o.lead_id, o.status, campaigns_meta_flag(o.meta, 'opened_at'), campaigns_meta_flag(o.meta, 'replied_at')) "
+    "IS DISTINCT FROM (n.lead_id, n.status, campaigns_meta_flag(n.meta, 'opened_at'), campaigns_meta_flag(n.meta, 'replied_at'))"
+)
+STEP_MOVED = (
+    "old_rows o JOIN new_rows n ON n.id = o.id "
+    "JOIN campaigns_campaign oc ON oc.id = o.campaign_id JOIN campaigns_campaign nc ON nc.id = n.campaign_id "
+    "WHERE o.campaign_id IS DISTINCT FROM n.campaign_id"
+)
+
+CREATE_TRIGGERS = (
+    trigger_function(
+        "campaigns_lead_counters",
+        insert=apply([select("n.org_id", "n.campaign_id", "1", lead_counts("n"), "new_rows n")], "true"),
+        update=apply(
+            [
+                select("n.org_id", "n.campaign_id", "1", lead_counts("n"), LEAD_CHANGED),
+                select("o.org_id", "o.campaign_id", "-1", lead_counts("o"), LEAD_CHANGED),
+                select("n.org_id", "n.campaign_id", "1", email_counts("e"), LEAD_EMAILS_MOVED),
+                select("o.org_id", "o.campaign_id", "-1", email_counts("e"), LEAD_EMAILS_MOVED),
+            ],
+            "false",
+        ),
+        delete=apply([select("o.org_id", "o.campaign_id", "-1", lead_counts("o"), "old_rows o")], "false"),
+    )
+    + trigger_function(
+        "campaigns_leademail_counters",
+        insert=apply(
+            [select("l.org_id", "l.campaign_id", "1", email_counts("n"), "new_rows n JOIN campaigns_lead l ON l.id = n.lead_id")],
+            "true",
+        ),
+        update=apply(
+            [
+                select("nl.org_id", "nl.campaign_id", "1", email_counts("n"), EMAIL_CHANGED),
+                select("ol.org_id", "ol.campaign_id", "-1", email_counts("o"), EMAIL_CHANGED),
+            ],
+            "false",
+        ),
+        delete=apply(
+            [select("l.org_id", "l.campaign_id", "-1", email_counts("o"), "old_rows o JOIN campaigns_lead l ON l.id = o.lead_id")],
+            "false",
+        ),
+    )
+    + trigger_function(
+        "campaigns_sequencestep_counters",
+        insert=apply(
+            [select("c.org_id", "n.campaign_id", "1", STEP_COUNTS, "new_rows n JOIN campaigns_campaign c ON c.id = n.campaign_id")],
+            "true",
+        ),
+        update=apply(
+            [
+                select("nc.org_id", "n.campaign_id", "1", STEP_COUNTS, STEP_MOVED),
+                select("oc.org_id", "o.campaign_id", "-1", STEP_COUNTS, STEP_MOVED),
+            ],
+            "false",
+        ),
+        delete=apply(
+            [select("c.org_id", "o.campaign_id", "-1", STEP_COUNTS, "old_rows o JOIN campaigns_campaign c ON c.id = o.campaign_id")],
+            "false",
+        ),
+    )
+    + f"""
+CREATE OR REPLACE FUNCTION campaigns_campaign_counters() RETURNS trigger AS $$
+BEGIN
+    {apply([select("n.org_id", "n.id", "1", {}, "new_rows n"), select("n.org_id", "NULL::uuid", "1", {}, "new_rows n")], "true")}
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+"""
+    + statement_triggers("campaigns_lead", "campaigns_lead_counters")
+    + statement_triggers("campaigns_leademail", "campaigns_leademail_counters")
+    + statement_triggers("campaigns_sequencestep", "campaigns_sequencestep_counters")
+    + statement_triggers("campaigns_campaign", "campaigns_campaign_counters", events=("INSERT",))
+)
+
+# Writers are blocked until the migration commits, so no change slips in
+# between the backfill and the triggers taking over.
+BACKFILL = f"""
+LOCK TABLE campaigns_campaign, campaigns_lead, campaigns_leademail, campaigns_sequencestep IN SHARE ROW EXCLUSIVE MODE;
+
+INSERT INTO campaigns_campaigncounter (id, created_at, updated_at, org_id, campaign_id, {COLUMNS})
+SELECT gen_random_uuid(), now(), now(), org_id, campaign_id, {", ".join(f"sum({name})" for name in COUNT_FIELDS)}
+FROM (
+    {select("l.org_id", "l.campaign_id", "1", lead_counts("l"), "campaigns_lead l")}
+    UNION ALL {select("l.org_id", "l.campaign_id", "1", email_counts("e"), "campaigns_leademail e JOIN campaigns_lead l ON l.id = e.lead_id")}
+    UNION ALL {select("c.org_id", "s.campaign_id", "1", STEP_COUNTS, "campaigns_sequencestep s JOIN campaigns_campaign c ON c.id = s.campaign_id")}
+    UNION ALL {select("c.org_id", "c.id", "1", {}, "campaigns_campaign c")}
+    UNION ALL {select("c.org_id", "NULL::uuid", "1", {}, "campaigns_campaign c")}
+) d
+GROUP BY org_id, campaign_id;
+"""
+
+DROP_TRIGGERS = """
+DROP TRIGGER IF EXISTS campaigns_lead_counters_insert ON campaigns_lead;
+DROP TRIGGER IF EXISTS campaigns_lead_counters_update ON campaigns_lead;
+DROP TRIGGER IF EXISTS campaigns_lead_counters_delete ON campaigns_lead;
+DROP TRIGGER IF EXISTS campaigns_leademail_counters_insert ON campaigns_leademail;
+DROP TRIGGER IF EXISTS campaigns_leademail_counters_update ON campaigns_leademail;
+DROP TRIGGER IF EXISTS campaigns_leademail_counters_delete ON campaigns_leademail;
+DROP TRIGGER IF EXISTS campaigns_sequencestep_counters_insert ON campaigns_sequencestep;
+DROP TRIGGER IF EXISTS campaigns_sequencestep_counters_update ON campaigns_sequencestep;
+DROP TRIGGER IF EXISTS campaigns_sequencestep_counters_delete ON campaigns_sequencestep;
+DROP TRIGGER IF EXISTS campaigns_campaign_counters_insert ON campaigns_campaign;
+DROP FUNCTION IF EXISTS campaigns_lead_counters();
+DROP FUNCTION IF EXISTS campaigns_leademail_counters();
+DROP FUNCTION IF EXISTS campaigns_sequencestep_counters();
+DROP FUNCTION IF EXISTS campaigns_campaign_counters();
+DROP FUNCTION IF EXISTS campaigns_counter_apply(campaigns_counter_delta[], boolean);
+DROP FUNCTION IF EXISTS campaigns_meta_flag(jsonb, text);
+DROP TYPE IF EXISTS campaigns_counter_delta;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("campaigns", "0014_hot_query_indexes"),
+        ("users", "0005_add_company_product_fields"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CampaignCounter",
+            fields=[
+                ("id", models.UUIDField(default=uuid.uuid4, primary_key=True, serialize=False)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("leads_total", models.BigIntegerField(default=0)),
+                ("leads_new", models.BigIntegerField(default=0)),
+                ("leads_contacted", models.BigIntegerField(default=0)),
+                ("leads_replied", models.BigIntegerField(default=0)),
+                ("emails_total", models.BigIntegerField(default=0)),
+                ("emails_draft", models.BigIntegerField(default=0)),
+                ("emails_sent", models.BigIntegerField(default=0)),
+                ("emails_failed", models.BigIntegerField(default=0)),
+                ("emails_opened", models.BigIntegerField(default=0)),
+                ("emails_replied", models.BigIntegerField(default=0)),
+                ("sequence_steps", models.BigIntegerField(default=0)),
+                (
+                    "campaign",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="counters",
+                        to="campaigns.campaign",
+                    ),
+                ),
+                (
+                    "org",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="campaign_counters",
+                        to="users.organization",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("org", "campaign"),
+                        name="campaigns_counter_org_campaign_uniq",
+                        nulls_distinct=False,
+                    )
+                ],
+            },
+        ),
+        migrations.RunSQL(CREATE_FUNCTIONS + CREATE_TRIGGERS + BACKFILL, DROP_TRIGGERS),
+    ]
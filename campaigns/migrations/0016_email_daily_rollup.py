@@ -0,0 +1,47 @@
+# Generated by Django 5.2.6 on 2026-10-18 04:53
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('campaigns', '0015_campaigncounter'),
+        ('users', '0005_add_company_product_fields'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmailDailyRollup',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('day', models.DateField()),
+                ('sent', models.PositiveIntegerField(default=0)),
+                ('opened', models.PositiveIntegerField(default=0)),
+                ('replied', models.PositiveIntegerField(default=0)),
+                ('failed', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='leademail',
+            index=models.Index(fields=['updated_at'], name='campaigns_email_updated'),
+        ),
+        migrations.AddField(
+            model_name='emaildailyrollup',
+            name='campaign',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='email_rollups', to='campaigns.campaign'),
+        ),
+        migrations.AddField(
+            model_name='emaildailyrollup',
+            name='org',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='email_rollups', to='users.organization'),
+        ),
+        migrations.AddConstraint(
+            model_name='emaildailyrollup',
+            constraint=models.UniqueConstraint(fields=('org', 'day', 'campaign'), name='campaigns_rollup_org_day_campaign_uniq', nulls_distinct=False),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.6 on 2026-10-18 04:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('campaigns', '0016_email_daily_rollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='leademail',
+            name='gmail_message_id',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='leademail',
+            name='gmail_thread_id',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='leademail',
+            name='opened_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='leademail',
+            name='replied_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='leademail',
+            index=models.Index(condition=models.Q(('opened_at__isnull', False)), fields=['opened_at'], name='campaigns_email_opened'),
+        ),
+        migrations.AddIndex(
+            model_name='leademail',
+            index=models.Index(condition=models.Q(('replied_at__isnull', False)), fields=['replied_at'], name='campaigns_email_replied'),
+        ),
+        migrations.AddIndex(
+            model_name='leademail',
+            index=models.Index(condition=models.Q(('gmail_message_id', ''), _negated=True), fields=['gmail_message_id'], name='campaigns_email_gmail_msg'),
+        ),
+        migrations.AddIndex(
+            model_name='leademail',
+            index=models.Index(condition=models.Q(('gmail_thread_id', ''), _negated=True), fields=['gmail_thread_id'], name='campaigns_email_gmail_thread'),
+        ),
+    ]
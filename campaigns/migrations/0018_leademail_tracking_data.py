@@ -0,0 +1,248 @@
+# Generated manually
+
+import datetime
+import json
+
+from django.db import migrations
+from django.utils.dateparse import parse_datetime
+
+TRACKING_KEYS = ["opened_at", "replied_at", "gmail_message_id", "gmail_thread_id"]
+BATCH_SIZE = 1000
+
+
+def meta_text(value):
+    """The text ``meta ->> key`` returns for a JSON value."""
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value, separators=(",", ":"))
+
+
+def tracking_time(email, key):
+    """
+    The timestamp stored under ``meta[key]``, or None when campaigns_meta_flag
+    counted it as unset. Set values that are not timestamps fall back to the
+    send time, so every email the counters saw as opened/replied stays so.
+    """
+    text = meta_text(email.meta.get(key))
+    if text in (None, "", "false", "0", "[]", "{}"):
+        return None
+    value = parse_datetime(text) if isinstance(email.meta[key], str) else None
+    if value is None:
+        return email.sent_at or email.updated_at
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    return value
+
+
+def tracked_batches(apps):
+    LeadEmail = apps.get_model("campaigns", "LeadEmail")
+    emails = LeadEmail.objects.filter(meta__has_any_keys=TRACKING_KEYS).order_by("id")
+    last_id = None
+    while True:
+        batch = emails.filter(id__gt=last_id) if last_id else emails
+        batch = list(batch[:BATCH_SIZE])
+        if not batch:
+            return
+        yield LeadEmail, batch
+        last_id = batch[-1].id
+
+
+def copy_tracking_from_meta(apps, schema_editor):
+    for LeadEmail, batch in tracked_batches(apps):
+        for email in batch:
+            email.opened_at = tracking_time(email, "opened_at")
+            email.replied_at = tracking_time(email, "replied_at")
+            email.gmail_message_id = str(email.meta.get("gmail_message_id") or "")
+            email.gmail_thread_id = str(email.meta.get("gmail_thread_id") or "")
+        LeadEmail.objects.bulk_update(batch, ["opened_at", "replied_at", "gmail_message_id", "gmail_thread_id"])
+
+
+def copy_tracking_to_meta(apps, schema_editor):
+    LeadEmail = apps.get_model("campaigns", "LeadEmail")
+    emails = LeadEmail.objects.exclude(opened_at=None, replied_at=None, gmail_message_id="", gmail_thread_id="")
+    for email in emails.iterator(chunk_size=BATCH_SIZE):
+        meta = dict(email.meta or {})
+        for key in ("opened_at", "replied_at"):
+            if getattr(email, key):
+                meta[key] = getattr(email, key).isoformat()
+        for key in ("gmail_message_id", "gmail_thread_id"):
+            if getattr(email, key):
+                meta[key] = getattr(email, key)
+        LeadEmail.objects.filter(id=email.id).update(meta=meta)
+
+
+def strip_tracking_meta(apps, schema_editor):
+    # the columns are the only copy from here on; the counter triggers no
+    # longer read meta, so this leaves the counters alone
+    for LeadEmail, batch in tracked_batches(apps):
+        for email in batch:
+            email.meta = {key: value for key, value in email.meta.items() if key not in TRACKING_KEYS}
+        LeadEmail.objects.bulk_update(batch, ["meta"])
+
+
+# The trigger SQL below is copied from migration 0015, which built the same
+# functions with campaigns_meta_flag, so this migration does not depend on it.
+COUNT_FIELDS = [
+    "leads_total",
+    "leads_new",
+    "leads_contacted",
+    "leads_replied",
+    "emails_total",
+    "emails_draft",
+    "emails_sent",
+    "emails_failed",
+    "emails_opened",
+    "emails_replied",
+    "sequence_steps",
+]
+
+
+def lead_counts(alias):
+    return {
+        "leads_total": "1",
+        "leads_new": f"({alias}.status = 'new')::int",
+        "leads_contacted": f"({alias}.status = 'contacted')::int",
+        "leads_replied": f"({alias}.status = 'replied')::int",
+    }
+
+
+def meta_email_counts(alias):
+    return {
+        "emails_total": "1",
+        "emails_draft": f"({alias}.status = 'draft')::int",
+        "emails_sent": f"({alias}.status = 'sent')::int",
+        "emails_failed": f"({alias}.status = 'failed')::int",
+        "emails_opened": f"campaigns_meta_flag({alias}.meta, 'opened_at')",
+        "emails_replied": f"campaigns_meta_flag({alias}.meta, 'replied_at')",
+    }
+
+
+def email_counts(alias):
+    return {
+        **meta_email_counts(alias),
+        "emails_opened": f"({alias}.opened_at IS NOT NULL)::int",
+        "emails_replied": f"({alias}.replied_at IS NOT NULL)::int",
+    }
+
+
+def select(org, campaign, sign, counts, source):
+    """One signed contribution per source row, in the column order of campaigns_counter_delta."""
+    columns = [f"{org} AS org_id", f"{campaign} AS campaign_id"]
+    columns += [f"{sign} * {counts[name]} AS {name}" if name in counts else f"0 AS {name}" for name in COUNT_FIELDS]
+    return f"SELECT {', '.join(columns)} FROM {source}"
+
+
+def apply(parts, create_missing):
+    """Sums the contributions per (org, campaign) and hands them to campaigns_counter_apply."""
+    sums = ", ".join(f"sum({name})" for name in COUNT_FIELDS)
+    union = "\n            UNION ALL ".join(parts)
+    return f"""PERFORM campaigns_counter_apply(ARRAY(
+            SELECT ROW(org_id, campaign_id, {sums})::campaigns_counter_delta
+            FROM ({union}) d
+            GROUP BY org_id, campaign_id
+        ), {create_missing});"""
+
+
+def trigger_function(name, insert, update, delete):
+    return f"""
+CREATE OR REPLACE FUNCTION {name}() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        {insert}
+    ELSIF TG_OP = 'UPDATE' THEN
+        {update}
+    ELSE
+        {delete}
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+"""
+
+
+LEAD_CHANGED = (
+    "old_rows o JOIN new_rows n ON n.id = o.id "
+    "WHERE (o.org_id, o.campaign_id, o.status) IS DISTINCT FROM (n.org_id, n.campaign_id, n.status)"
+)
+# emails are counted in the bucket of their lead, so they move with it
+LEAD_EMAILS_MOVED = (
+    "old_rows o JOIN new_rows n ON n.id = o.id JOIN campaigns_leademail e ON e.lead_id = n.id "
+    "WHERE (o.org_id, o.campaign_id) IS DISTINCT FROM (n.org_id, n.campaign_id)"
+)
+META_EMAIL_CHANGED = (
+    "old_rows o JOIN new_rows n ON n.id = o.id "
+    "JOIN campaigns_lead ol ON ol.id = o.lead_id JOIN campaigns_lead nl ON nl.id = n.lead_id "
+    "WHERE (o.lead_id, o.status, campaigns_meta_flag(o.meta, 'opened_at'), campaigns_meta_flag(o.meta, 'replied_at')) "
+    "IS DISTINCT FROM (n.lead_id, n.status, campaigns_meta_flag(n.meta, 'opened_at'), campaigns_meta_flag(n.meta, 'replied_at'))"
+)
+EMAIL_CHANGED = (
+    "old_rows o JOIN new_rows n ON n.id = o.id "
+    "JOIN campaigns_lead ol ON ol.id = o.lead_id JOIN campaigns_lead nl ON nl.id = n.lead_id "
+    "WHERE (o.lead_id, o.status, o.opened_at IS NOT NULL, o.replied_at IS NOT NULL) "
+    "IS DISTINCT FROM (n.lead_id, n.status, n.opened_at IS NOT NULL, n.replied_at IS NOT NULL)"
+)
+
+
+def counter_functions(email_counts, email_changed):
+    """The lead and email counter trigger functions, counting emails with ``email_counts``."""
+    return trigger_function(
+        "campaigns_lead_counters",
+        insert=apply([select("n.org_id", "n.campaign_id", "1", lead_counts("n"), "new_rows n")], "true"),
+        update=apply(
+            [
+                select("n.org_id", "n.campaign_id", "1", lead_counts("n"), LEAD_CHANGED),
+                select("o.org_id", "o.campaign_id", "-1", lead_counts("o"), LEAD_CHANGED),
+                select("n.org_id", "n.campaign_id", "1", email_counts("e"), LEAD_EMAILS_MOVED),
+                select("o.org_id", "o.campaign_id", "-1", email_counts("e"), LEAD_EMAILS_MOVED),
+            ],
+            "false",
+        ),
+        delete=apply([select("o.org_id", "o.campaign_id", "-1", lead_counts("o"), "old_rows o")], "false"),
+    ) + trigger_function(
+        "campaigns_leademail_counters",
+        insert=apply(
+            [select("l.org_id", "l.campaign_id", "1", email_counts("n"), "new_rows n JOIN campaigns_lead l ON l.id = n.lead_id")],
+            "true",
+        ),
+        update=apply(
+            [
+                select("nl.org_id", "nl.campaign_id", "1", email_counts("n"), email_changed),
+                select("ol.org_id", "ol.campaign_id", "-1", email_counts("o"), email_changed),
+            ],
+            "false",
+        ),
+        delete=apply(
+            [select("l.org_id", "l.campaign_id", "-1", email_counts("o"), "old_rows o JOIN campaigns_lead l ON l.id = o.lead_id")],
+            "false",
+        ),
+    )
+
+
+META_FLAG_FUNCTION = """
+CREATE OR REPLACE FUNCTION campaigns_meta_flag(meta jsonb, key text) RETURNS integer AS $$
+    SELECT CASE WHEN coalesce(meta ->> key, '') IN ('', 'false', '0', '[]', '{}') THEN 0 ELSE 1 END
+$$ LANGUAGE sql IMMUTABLE;
+"""
+
+# The columns were filled from the same values campaigns_meta_flag tested, so
+# switching the triggers over does not change any count.
+USE_COLUMNS = counter_functions(email_counts, EMAIL_CHANGED) + "DROP FUNCTION campaigns_meta_flag(jsonb, text);\n"
+USE_META = META_FLAG_FUNCTION + counter_functions(meta_email_counts, META_EMAIL_CHANGED)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("campaigns", "0017_leademail_tracking_columns"),
+    ]
+
+    operations = [
+        # writers wait for the migration to commit, so no email changes between the copy and the switch
+        migrations.RunSQL(
+            "LOCK TABLE campaigns_lead, campaigns_leademail IN SHARE ROW EXCLUSIVE MODE;", migrations.RunSQL.noop
+        ),
+        # meta is left as is here, so the counter triggers, which still read it, see no change
+        migrations.RunPython(copy_tracking_from_meta, migrations.RunPython.noop),
+        migrations.RunSQL(USE_COLUMNS, USE_META),
+        migrations.RunPython(strip_tracking_meta, copy_tracking_to_meta),
+    ]
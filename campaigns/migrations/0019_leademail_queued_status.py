@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 04:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('campaigns', '0018_leademail_tracking_data'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='leademail',
+            name='status',
+            field=models.CharField(choices=[('draft', 'Draft'), ('queued', 'Queued'), ('sent', 'Sent'), ('failed', 'Failed')], default='draft', max_length=20),
+        ),
+    ]
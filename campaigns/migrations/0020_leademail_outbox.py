@@ -0,0 +1,22 @@
+# Generated by Django 5.2.6 on 2026-10-18 05:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('campaigns', '0019_leademail_queued_status'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='leademail',
+            name='status',
+            field=models.CharField(choices=[('draft', 'Draft'), ('queued', 'Queued'), ('sending', 'Sending'), ('sent', 'Sent'), ('failed', 'Failed')], default='draft', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='leademail',
+            index=models.Index(condition=models.Q(('status__in', ['queued', 'sending'])), fields=['created_at'], name='campaigns_email_outbox'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-18 05:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('campaigns', '0020_leademail_outbox'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='leademail',
+            index=models.Index(fields=['lead', '-created_at', '-id'], name='campaigns_email_lead_created'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.6 on 2026-10-18 05:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('campaigns', '0021_org_keyset_indexes'),
+        ('users', '0005_add_company_product_fields'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='leademail',
+            index=models.Index(fields=['lead', 'status', '-sent_at'], name='campaigns_email_lead_sent'),
+        ),
+        migrations.RemoveIndex(
+            model_name='leademail',
+            name='campaigns_email_lead_status',
+        ),
+        # the composite indexes start with these columns; only the single-column
+        # indexes are dropped, AlterField would also drop and re-validate the foreign keys
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    'DROP INDEX IF EXISTS "campaigns_lead_org_id_7857c416";',
+                    'CREATE INDEX "campaigns_lead_org_id_7857c416" ON "campaigns_lead" ("org_id");',
+                ),
+                migrations.RunSQL(
+                    'DROP INDEX IF EXISTS "campaigns_leademail_lead_id_0e94ddf5";',
+                    'CREATE INDEX "campaigns_leademail_lead_id_0e94ddf5" ON "campaigns_leademail" ("lead_id");',
+                ),
+            ],
+            state_operations=[
+                migrations.AlterField(
+                    model_name='lead',
+                    name='org',
+                    field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='users.organization'),
+                ),
+                migrations.AlterField(
+                    model_name='leademail',
+                    name='lead',
+                    field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='emails', to='campaigns.lead'),
+                ),
+            ],
+        ),
+    ]
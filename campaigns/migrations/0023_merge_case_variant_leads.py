@@ -0,0 +1,50 @@
+# Generated manually
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import Lower, Trim
+
+
+def merge_case_variant_leads(apps, schema_editor):
+    """
+    Lowercase and strip every lead email, as the API and imports now store
+    them. Leads of one org whose emails only differ in case or surrounding
+    spaces are collapsed onto the most recently updated one first, like 0007
+    does for exact duplicates, so the lowercased emails stay unique.
+    """
+    Lead = apps.get_model("campaigns", "Lead")
+    LeadEmail = apps.get_model("campaigns", "LeadEmail")
+    ActivityTimeline = apps.get_model("activities", "ActivityTimeline")
+    AIDraft = apps.get_model("activities", "AIDraft")
+
+    leads = Lead.objects.annotate(normalized=Lower(Trim("email")))
+    duplicates = (
+        leads.values("org_id", "normalized")
+        .annotate(total=Count("id"))
+        .filter(total__gt=1)
+    )
+    for dup in duplicates.iterator():
+        ids = list(
+            leads.filter(org_id=dup["org_id"], normalized=dup["normalized"])
+            .order_by("-updated_at")
+            .values_list("id", flat=True)
+        )
+        keep, stale = ids[0], ids[1:]
+        LeadEmail.objects.filter(lead_id__in=stale).update(lead_id=keep)
+        ActivityTimeline.objects.filter(lead_id__in=stale).update(lead_id=keep)
+        AIDraft.objects.filter(lead_id__in=stale).update(lead_id=keep)
+        Lead.objects.filter(id__in=stale).delete()
+
+    leads.exclude(email=models.F("normalized")).update(email=Lower(Trim("email")))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("campaigns", "0022_org_scoped_lookup_indexes"),
+        ("activities", "0005_org_scoped_lookup_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_case_variant_leads, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated manually
+
+from django.db import migrations, models
+from django.db.models.functions import Lower, Trim
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("campaigns", "0023_merge_case_variant_leads"),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name="lead",
+            constraint=models.CheckConstraint(
+                condition=models.Q(email=Lower(Trim("email"))), name="campaigns_lead_email_normalized"
+            ),
+        ),
+    ]
@@ -0,0 +1,74 @@
+# Generated manually
+
+from django.db import migrations
+
+COUNT_FIELDS = [
+    "leads_total",
+    "leads_new",
+    "leads_contacted",
+    "leads_replied",
+    "emails_total",
+    "emails_draft",
+    "emails_sent",
+    "emails_failed",
+    "emails_opened",
+    "emails_replied",
+    "sequence_steps",
+]
+COLUMNS = ", ".join(COUNT_FIELDS)
+MATCHES = (
+    "c.org_id = d.org_id\n"
+    "            AND c.campaign_id IS NOT DISTINCT FROM d.campaign_id\n"
+    f"            AND ({' OR '.join(f'd.{name} <> 0' for name in COUNT_FIELDS)})"
+)
+
+
+def counter_apply(lock_in_order):
+    """
+    campaigns_counter_apply as 0015 created it, or with the counter rows locked
+    in (org_id, campaign_id) order before they are updated. ``UPDATE ... FROM``
+    locks them in join order, so two statements touching the same counters
+    could lock them in opposite orders and deadlock; inserts already go in order.
+    """
+    lock = (
+        f"""PERFORM 1 FROM campaigns_campaigncounter c, unnest(deltas) d
+        WHERE {MATCHES}
+        ORDER BY c.org_id, c.campaign_id
+        FOR UPDATE OF c;
+        """
+        if lock_in_order
+        else ""
+    )
+    return f"""
+CREATE OR REPLACE FUNCTION campaigns_counter_apply(deltas campaigns_counter_delta[], create_missing boolean)
+RETURNS void AS $$
+BEGIN
+    IF create_missing THEN
+        INSERT INTO campaigns_campaigncounter AS c (id, created_at, updated_at, org_id, campaign_id, {COLUMNS})
+        SELECT gen_random_uuid(), now(), now(), d.org_id, d.campaign_id, {", ".join(f"d.{name}" for name in COUNT_FIELDS)}
+        FROM unnest(deltas) d
+        ORDER BY d.org_id, d.campaign_id
+        ON CONFLICT (org_id, campaign_id) DO UPDATE SET
+            {", ".join(f"{name} = c.{name} + EXCLUDED.{name}" for name in COUNT_FIELDS)},
+            updated_at = EXCLUDED.updated_at;
+    ELSE
+        {lock}UPDATE campaigns_campaigncounter c SET
+            {", ".join(f"{name} = c.{name} + d.{name}" for name in COUNT_FIELDS)},
+            updated_at = now()
+        FROM unnest(deltas) d
+        WHERE {MATCHES};
+    END IF;
+END
+$$ LANGUAGE plpgsql;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("campaigns", "0024_lead_email_normalized"),
+    ]
+
+    operations = [
+        migrations.RunSQL(counter_apply(lock_in_order=True), counter_apply(lock_in_order=False)),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-18 06:10
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('campaigns', '0025_counter_apply_lock_order'),
+    ]
+
+    operations = [
+        # a small org's emails are read per lead and then sorted, which
+        # campaigns_email_lead_sent serves as well; nothing merges this index's order
+        migrations.RemoveIndex(
+            model_name='leademail',
+            name='campaigns_email_lead_created',
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.6 on 2026-10-18 06:20
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('campaigns', '0026_remove_email_lead_created'),
+        ('users', '0005_add_company_product_fields'),
+    ]
+
+    # org_id is indexed through btree_gin, added by 0012
+    operations = [
+        migrations.RemoveIndex(
+            model_name='campaign',
+            name='campaigns_campaign_name_trgm',
+        ),
+        migrations.RemoveIndex(
+            model_name='lead',
+            name='campaigns_lead_email_trgm',
+        ),
+        migrations.RemoveIndex(
+            model_name='lead',
+            name='campaigns_lead_company_trgm',
+        ),
+        migrations.AddIndex(
+            model_name='campaign',
+            index=django.contrib.postgres.indexes.GinIndex(models.F('org'), django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('name'), name='gin_trgm_ops'), name='campaigns_campaign_name_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='lead',
+            index=django.contrib.postgres.indexes.GinIndex(models.F('org'), django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('email'), name='gin_trgm_ops'), name='campaigns_lead_email_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='lead',
+            index=django.contrib.postgres.indexes.GinIndex(models.F('org'), django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('company'), name='gin_trgm_ops'), name='campaigns_lead_company_trgm'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.6 on 2026-10-18 06:40
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('campaigns', '0027_org_scoped_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmailRollupWatermark',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('scanned_through', models.DateTimeField()),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
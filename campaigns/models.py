@@ -1,4 +1,7 @@
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models.functions import Lower, Trim, Upper
 from django.utils import timezone
 
 from users.models import BaseModel, Organization
@@ -8,9 +11,17 @@ class Campaign(BaseModel):
     org = models.ForeignKey(Organization, on_delete=models.CASCADE)
     name = models.CharField(max_length=255)
 
+    class Meta:
+        indexes = [
+            # btree_gin org plus a trigram index on UPPER(name): icontains and
+            # similarity lookups of one org, without reading every org's matches
+            GinIndex("org", OpClass(Upper("name"), name="gin_trgm_ops"), name="campaigns_campaign_name_trgm"),
+        ]
+
 
 class Lead(BaseModel):
-    org = models.ForeignKey(Organization, on_delete=models.CASCADE)
+    # served by the composite indexes below, which all start with org
+    org = models.ForeignKey(Organization, on_delete=models.CASCADE, db_index=False)
     campaign = models.ForeignKey("campaigns.Campaign", null=True, blank=True, on_delete=models.SET_NULL)
     first_name = models.CharField(max_length=120, blank=True)
     last_name = models.CharField(max_length=120, blank=True)
@@ -26,6 +37,28 @@ class Lead(BaseModel):
         default="new",
     )
     last_contacted_at = models.DateTimeField(null=True, blank=True)
+    # maintained by the campaigns_lead_search_vector trigger, see migration 0012
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["org", "email"], name="campaigns_lead_org_email_uniq"),
+            # stored lowercased and stripped, so the unique constraint also catches case variants
+            models.CheckConstraint(condition=models.Q(email=Lower(Trim("email"))), name="campaigns_lead_email_normalized"),
+        ]
+        indexes = [
+            models.Index(fields=["org", "-created_at", "-id"], name="campaigns_lead_org_created"),
+            models.Index(fields=["org", "status"], name="campaigns_lead_org_status"),
+            # only the leads daily_enrich_leads still has to pick up
+            models.Index(
+                fields=["created_at"],
+                condition=models.Q(enriched={}) & ~models.Q(website=""),
+                name="campaigns_lead_unenriched",
+            ),
+            GinIndex(fields=["org", "search_vector"], name="campaigns_lead_search"),
+            GinIndex("org", OpClass(Upper("email"), name="gin_trgm_ops"), name="campaigns_lead_email_trgm"),
+            GinIndex("org", OpClass(Upper("company"), name="gin_trgm_ops"), name="campaigns_lead_company_trgm"),
+        ]
 
 
 class SequenceStep(BaseModel):
@@ -34,22 +67,70 @@ class SequenceStep(BaseModel):
     action = models.CharField(max_length=20, choices=[("send_email", "Send Email"), ("wait", "Wait")])
     wait_days = models.IntegerField(default=0)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["campaign", "order"], name="campaigns_step_campaign_order"),
+        ]
+
 
 class LeadEmail(BaseModel):
     STATUS_CHOICES = [
         ("draft", "Draft"),
+        # handed to the send workers, see campaigns.sending
+        ("queued", "Queued"),
+        # claimed by a send worker; back to claimable once SENDING_LEASE passes
+        ("sending", "Sending"),
         ("sent", "Sent"),
         ("failed", "Failed"),
     ]
 
-    lead = models.ForeignKey(Lead, related_name="emails", on_delete=models.CASCADE)
+    # served by the composite indexes below, which start with lead
+    lead = models.ForeignKey(Lead, related_name="emails", on_delete=models.CASCADE, db_index=False)
     subject = models.CharField(max_length=255)
     body = models.TextField()
     preview = models.TextField(blank=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="draft")
     sent_at = models.DateTimeField(null=True, blank=True)
+    opened_at = models.DateTimeField(null=True, blank=True)
+    replied_at = models.DateTimeField(null=True, blank=True)
+    gmail_message_id = models.CharField(max_length=255, blank=True)
+    gmail_thread_id = models.CharField(max_length=255, blank=True)
     meta = models.JSONField(default=dict, blank=True)
 
+    class Meta:
+        indexes = [
+            # keyset pages of a large org, whose rows are dense in the global order
+            models.Index(fields=["-created_at", "-id"], name="campaigns_leademail_created"),
+            # a lead's emails by status. A small org's keyset pages and sent timeline
+            # also start from it: the emails of each of the org's leads are looked
+            # up through it and then sorted, as they are not ordered across leads
+            models.Index(fields=["lead", "status", "-sent_at"], name="campaigns_email_lead_sent"),
+            # the sent timeline of a large org, whose rows are dense in the global order
+            models.Index(fields=["status", "-sent_at"], name="campaigns_email_status_sent"),
+            # changed emails picked up by update_email_rollups
+            models.Index(fields=["updated_at"], name="campaigns_email_updated"),
+            # only tracked emails, which are a small share of all rows
+            models.Index(
+                fields=["opened_at"], condition=models.Q(opened_at__isnull=False), name="campaigns_email_opened"
+            ),
+            models.Index(
+                fields=["replied_at"], condition=models.Q(replied_at__isnull=False), name="campaigns_email_replied"
+            ),
+            # lookups from Gmail message and thread ids back to the email
+            models.Index(
+                fields=["gmail_message_id"], condition=~models.Q(gmail_message_id=""), name="campaigns_email_gmail_msg"
+            ),
+            models.Index(
+                fields=["gmail_thread_id"], condition=~models.Q(gmail_thread_id=""), name="campaigns_email_gmail_thread"
+            ),
+            # the outbox, claimed oldest first by the send workers
+            models.Index(
+                fields=["created_at"],
+                condition=models.Q(status__in=["queued", "sending"]),
+                name="campaigns_email_outbox",
+            ),
+        ]
+
     def mark_sent(self, meta=None):
         self.status = "sent"
         self.sent_at = timezone.now()
@@ -57,3 +138,118 @@ class LeadEmail(BaseModel):
             self.meta = meta
         self.save(update_fields=["status", "sent_at", "meta", "updated_at"])
 
+
+
+class ImportJob(BaseModel):
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("running", "Running"),
+        ("completed", "Completed"),
+        ("failed", "Failed"),
+    ]
+
+    org = models.ForeignKey(Organization, on_delete=models.CASCADE)
+    campaign = models.ForeignKey(Campaign, null=True, blank=True, on_delete=models.SET_NULL)
+    file_name = models.CharField(max_length=255)
+    file_path = models.CharField(max_length=1024)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    processed_rows = models.PositiveIntegerField(default=0)
+    created_leads = models.PositiveIntegerField(default=0)
+    updated_leads = models.PositiveIntegerField(default=0)
+    failed_rows = models.PositiveIntegerField(default=0)
+    # number of file chunks already written, a restarted job resumes after them
+    committed_chunks = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    # first rows rejected or cleaned by validation, see campaigns.utils.validate_lead_frame
+    error_report = models.JSONField(default=list, blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+
+class CampaignCounter(BaseModel):
+    """
+    Denormalized counts per org and campaign; the row with no campaign holds the
+    org's leads (and their emails) that are not in any campaign. Kept up to date
+    by statement-level triggers on leads, emails, steps and campaigns, see
+    migrations 0015 and 0018, and rebuilt or verified with ``manage.py rebuild_counters``.
+    """
+
+    COUNT_FIELDS = [
+        "leads_total",
+        "leads_new",
+        "leads_contacted",
+        "leads_replied",
+        "emails_total",
+        "emails_draft",
+        "emails_sent",
+        "emails_failed",
+        "emails_opened",
+        "emails_replied",
+        "sequence_steps",
+    ]
+
+    org = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name="campaign_counters")
+    campaign = models.ForeignKey(Campaign, null=True, blank=True, on_delete=models.CASCADE, related_name="counters")
+    leads_total = models.BigIntegerField(default=0)
+    leads_new = models.BigIntegerField(default=0)
+    leads_contacted = models.BigIntegerField(default=0)
+    leads_replied = models.BigIntegerField(default=0)
+    emails_total = models.BigIntegerField(default=0)
+    emails_draft = models.BigIntegerField(default=0)
+    emails_sent = models.BigIntegerField(default=0)
+    emails_failed = models.BigIntegerField(default=0)
+    emails_opened = models.BigIntegerField(default=0)
+    emails_replied = models.BigIntegerField(default=0)
+    sequence_steps = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["org", "campaign"],
+                name="campaigns_counter_org_campaign_uniq",
+                nulls_distinct=False,
+            ),
+        ]
+
+
+class EmailDailyRollup(BaseModel):
+    """
+    Email activity per org, campaign and UTC day, read by the analytics endpoint
+    instead of scanning ``LeadEmail``. An email counts on the day it was sent
+    (failed emails on the day they were last updated); opened and replied are
+    counted against the send day. Kept up to date by
+    ``campaigns.tasks.update_email_rollups`` and rebuilt with
+    ``manage.py backfill_email_rollups``.
+    """
+
+    COUNT_FIELDS = ["sent", "opened", "replied", "failed"]
+
+    org = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name="email_rollups")
+    campaign = models.ForeignKey(
+        Campaign, null=True, blank=True, on_delete=models.CASCADE, related_name="email_rollups"
+    )
+    day = models.DateField()
+    sent = models.PositiveIntegerField(default=0)
+    opened = models.PositiveIntegerField(default=0)
+    replied = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # org and day first, so date-range reads of an org use it as their index
+            models.UniqueConstraint(
+                fields=["org", "day", "campaign"],
+                name="campaigns_rollup_org_day_campaign_uniq",
+                nulls_distinct=False,
+            ),
+        ]
+
+
+class EmailRollupWatermark(BaseModel):
+    """
+    Single row holding how far ``update_email_rollups`` has scanned. It moves on
+    every run, including runs that find nothing to recount.
+    """
+
+    # emails changed or tracked at or after this time, minus ROLLUP_OVERLAP, are rescanned
+    scanned_through = models.DateTimeField()
@@ -0,0 +1,59 @@
+import functools
+import logging
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class query_budget:
+    """
+    Caps the number of SQL queries a block of code may run.
+
+    Usable as a decorator on view handlers or as a context manager. What happens
+    when the budget is exceeded is controlled by ``settings.QUERY_BUDGET_ACTION``:
+    ``"log"`` emits a warning, ``"raise"`` raises QueryBudgetExceeded (meant for
+    tests, so N+1 regressions fail loudly) and ``"off"`` disables counting.
+    """
+
+    def __init__(self, max_queries, label=None):
+        self.max_queries = max_queries
+        self.label = label
+        self.count = 0
+
+    def __call__(self, func):
+        label = self.label or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with query_budget(self.max_queries, label=label):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    def _count_query(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self.action = getattr(settings, "QUERY_BUDGET_ACTION", "log")
+        if self.action != "off":
+            self._wrapper = connection.execute_wrapper(self._count_query)
+            self._wrapper.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.action == "off":
+            return False
+        self._wrapper.__exit__(exc_type, exc, tb)
+        if exc_type is None and self.count > self.max_queries:
+            message = f"{self.label or 'block'} ran {self.count} queries, budget is {self.max_queries}"
+            if self.action == "raise":
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return False
@@ -0,0 +1,222 @@
+import datetime
+from collections import defaultdict
+
+from django.db import connection, transaction
+from django.db.models import Count, F, Max, Min, Q, Sum
+from django.db.models.functions import Coalesce, TruncDate, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from campaigns.models import EmailDailyRollup, EmailRollupWatermark, LeadEmail
+
+COUNT_FIELDS = EmailDailyRollup.COUNT_FIELDS
+ROLLUP_STATUSES = ("sent", "failed")
+# emails changed this long before the previous run are rescanned, so a
+# transaction that committed after that run read its changes is not missed
+ROLLUP_OVERLAP = datetime.timedelta(minutes=15)
+# days recounted per transaction by backfill_rollups
+BACKFILL_WINDOW_DAYS = 31
+# trailing days recounted every night by recount_recent_rollups
+ROLLUP_RECOUNT_DAYS = 31
+ROLLUP_INTERVALS = {"day": None, "week": TruncWeek, "month": TruncMonth}
+
+# the UTC day an email counts on: its send time, or its last update if it never went out
+ACTIVITY_DAY = TruncDate(Coalesce("sent_at", "updated_at"), tzinfo=datetime.timezone.utc)
+
+
+def _day_start(day):
+    return datetime.datetime.combine(day, datetime.time.min, tzinfo=datetime.timezone.utc)
+
+
+def compute_rollups(emails):
+    """Counts ``emails`` per org, campaign and activity day, as unsaved rollup rows."""
+    rows = (
+        emails.filter(status__in=ROLLUP_STATUSES)
+        .order_by()
+        .annotate(day=ACTIVITY_DAY)
+        .values("lead__org_id", "lead__campaign_id", "day")
+        .annotate(
+            sent=Count("id", filter=Q(status="sent")),
+            opened=Count("id", filter=Q(status="sent", opened_at__isnull=False)),
+            replied=Count("id", filter=Q(status="sent", replied_at__isnull=False)),
+            failed=Count("id", filter=Q(status="failed")),
+        )
+    )
+    return [
+        EmailDailyRollup(org_id=row.pop("lead__org_id"), campaign_id=row.pop("lead__campaign_id"), **row)
+        for row in rows
+    ]
+
+
+def _lock_rollups():
+    # one recount at a time; readers are not blocked
+    with connection.cursor() as cursor:
+        cursor.execute("LOCK TABLE campaigns_emaildailyrollup IN SHARE ROW EXCLUSIVE MODE")
+
+
+def _recount(spans):
+    """
+    Replaces the rollup rows of every ``(org_ids, first_day, last_day)`` span
+    with a fresh count; ``org_ids`` of None means every org. Returns the number
+    of rows written.
+    """
+    email_filter = Q()
+    rollup_filter = Q()
+    for org_ids, first_day, last_day in spans:
+        start = _day_start(first_day)
+        end = _day_start(last_day + datetime.timedelta(days=1))
+        activity = Q(sent_at__gte=start, sent_at__lt=end) | Q(
+            sent_at__isnull=True, updated_at__gte=start, updated_at__lt=end
+        )
+        rollup = Q(day__gte=first_day, day__lte=last_day)
+        if org_ids is not None:
+            activity &= Q(lead__org_id__in=org_ids)
+            rollup &= Q(org_id__in=org_ids)
+        email_filter |= activity
+        rollup_filter |= rollup
+
+    rows = compute_rollups(LeadEmail.objects.filter(email_filter))
+    EmailDailyRollup.objects.filter(rollup_filter).delete()
+    EmailDailyRollup.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def update_rollups():
+    """
+    Recounts the (org, day) pairs of emails changed since the previous run, as
+    recorded by EmailRollupWatermark, minus ROLLUP_OVERLAP. Fills the table
+    from scratch when it is empty. Returns the number of rows written.
+
+    An email counts as changed when its updated_at, opened_at or replied_at
+    is past the watermark, so tracking writes made with ``.update()`` are
+    picked up without touching updated_at. Only the day an email counts on
+    now is recounted: an email that moves to another day, e.g. failed and
+    later sent, or that is deleted along with its lead, stays in its old day
+    until recount_recent_rollups runs, as does a tracking write that stores
+    an older time than the watermark.
+    """
+    started = timezone.now()
+    if not EmailDailyRollup.objects.exists():
+        written = backfill_rollups()
+        _move_watermark(started)
+        return written
+
+    with transaction.atomic():
+        _lock_rollups()
+        watermark = EmailRollupWatermark.objects.first()
+        if watermark is not None:
+            since = watermark.scanned_through
+        else:
+            # runs before the watermark row existed
+            since = EmailDailyRollup.objects.aggregate(latest=Max("updated_at"))["latest"]
+            if since is None:
+                return 0
+        since -= ROLLUP_OVERLAP
+        changed = (
+            LeadEmail.objects.filter(
+                Q(updated_at__gte=since) | Q(opened_at__gte=since) | Q(replied_at__gte=since),
+                status__in=ROLLUP_STATUSES,
+            )
+            .order_by()
+            .annotate(day=ACTIVITY_DAY)
+            .values_list("lead__org_id", "day")
+            .distinct()
+        )
+        orgs_by_day = defaultdict(set)
+        for org_id, day in changed:
+            orgs_by_day[day].add(org_id)
+        written = 0
+        if orgs_by_day:
+            written = _recount([(org_ids, day, day) for day, org_ids in orgs_by_day.items()])
+        _move_watermark(started)
+        return written
+
+
+def _move_watermark(scanned_through):
+    updated = EmailRollupWatermark.objects.update(scanned_through=scanned_through, updated_at=timezone.now())
+    if not updated:
+        EmailRollupWatermark.objects.create(scanned_through=scanned_through)
+
+
+def backfill_rollups(org_ids=None, first_day=None, last_day=None):
+    """
+    Recounts every day from ``first_day`` (default: the oldest email) through
+    ``last_day`` (default: today), BACKFILL_WINDOW_DAYS per transaction.
+    Returns the number of rows written.
+    """
+    if first_day is None:
+        emails = LeadEmail.objects.all()
+        if org_ids is not None:
+            emails = emails.filter(lead__org_id__in=org_ids)
+        # sent_at is set by the sender and is not guaranteed to follow created_at
+        oldest = emails.aggregate(created=Min("created_at"), sent=Min("sent_at"))
+        oldest = [value for value in oldest.values() if value is not None]
+        if not oldest:
+            return 0
+        first_day = min(oldest).astimezone(datetime.timezone.utc).date()
+    if last_day is None:
+        last_day = timezone.now().astimezone(datetime.timezone.utc).date()
+
+    written = 0
+    window_start = first_day
+    while window_start <= last_day:
+        window_end = min(window_start + datetime.timedelta(days=BACKFILL_WINDOW_DAYS - 1), last_day)
+        with transaction.atomic():
+            _lock_rollups()
+            written += _recount([(org_ids, window_start, window_end)])
+        window_start = window_end + datetime.timedelta(days=1)
+    return written
+
+
+def recount_recent_rollups(days=ROLLUP_RECOUNT_DAYS):
+    """
+    Recounts the last ``days`` days for every org, which moves emails that
+    changed day since update_rollups counted them, e.g. a failed email sent on
+    a later retry, and drops deleted ones. Older days only change through
+    backfill_rollups. Returns the number of rows written.
+    """
+    today = timezone.now().astimezone(datetime.timezone.utc).date()
+    return backfill_rollups(first_day=today - datetime.timedelta(days=days - 1), last_day=today)
+
+
+def _bucket_start(day, interval):
+    if interval == "week":
+        return day - datetime.timedelta(days=day.weekday())
+    if interval == "month":
+        return day.replace(day=1)
+    return day
+
+
+def _next_bucket(day, interval):
+    if interval == "week":
+        return day + datetime.timedelta(days=7)
+    if interval == "month":
+        return (day.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+    return day + datetime.timedelta(days=1)
+
+
+def rollup_series(org, first_day, last_day, interval="day", campaign_id=None):
+    """
+    Email activity of ``org`` from ``first_day`` through ``last_day`` as one
+    entry per day, week (starting Monday) or month, zero-filled, plus totals.
+    Reads only the rollup table.
+    """
+    rollups = EmailDailyRollup.objects.filter(org=org, day__gte=first_day, day__lte=last_day)
+    if campaign_id is not None:
+        rollups = rollups.filter(campaign_id=campaign_id)
+
+    trunc = ROLLUP_INTERVALS[interval]
+    bucket = trunc("day") if trunc else F("day")
+    sums = {field: Sum(field) for field in COUNT_FIELDS}
+    rows = rollups.order_by().values(bucket=bucket).annotate(**sums)
+    counts = {row.pop("bucket"): row for row in rows}
+
+    series = []
+    totals = dict.fromkeys(COUNT_FIELDS, 0)
+    day = _bucket_start(first_day, interval)
+    while day <= last_day:
+        entry = counts.get(day, dict.fromkeys(COUNT_FIELDS, 0))
+        series.append({"date": day.isoformat(), **entry})
+        for field in COUNT_FIELDS:
+            totals[field] += entry[field]
+        day = _next_bucket(day, interval)
+    return {"series": series, "totals": totals}
@@ -0,0 +1,238 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+
+from campaigns.cache import EMAILS, LEADS, bump_org_tags_on_commit
+from campaigns.models import Lead, LeadEmail
+from integrations.gmail_utils import find_gmail_message, send_gmail_email
+from integrations.rate_limit import gmail_send_bucket
+
+# emails claimed per send_email_outbox task; small enough that a mailbox's
+# batches spread over all workers, large enough to record results in few statements
+SEND_BATCH_SIZE = 50
+QUEUE_CHUNK_SIZE = 1000
+# a claimed email whose outcome is not recorded within this time is claimable
+# again; each email's claim is renewed right before it is sent
+SENDING_LEASE = timedelta(minutes=10)
+# seconds a worker waits for the mailbox's rate limit before deferring the rest of its batch
+SEND_WAIT_SECONDS = 60
+SEND_RESULT_FIELDS = ["status", "sent_at", "gmail_message_id", "gmail_thread_id", "meta", "updated_at"]
+
+
+def queue_campaign_emails(campaign):
+    """
+    Moves the drafts of the campaign's leads that have not replied from "draft"
+    to "queued" and returns their ids. Drafts already being queued by a
+    concurrent call are skipped rather than waited for.
+    """
+    drafts = LeadEmail.objects.filter(
+        lead__campaign=campaign, lead__org_id=campaign.org_id, status="draft"
+    ).exclude(lead__status="replied")
+
+    with transaction.atomic():
+        email_ids = list(drafts.select_for_update(skip_locked=True, of=("self",)).values_list("id", flat=True))
+        now = timezone.now()
+        for start in range(0, len(email_ids), QUEUE_CHUNK_SIZE):
+            LeadEmail.objects.filter(id__in=email_ids[start:start + QUEUE_CHUNK_SIZE]).update(
+                status="queued", updated_at=now
+            )
+        bump_org_tags_on_commit(campaign.org_id, EMAILS)
+    return email_ids
+
+
+def _is_rate_limited(error):
+    response = getattr(error, "response", None)
+    return response is not None and response.status_code == 429
+
+
+def outbox_message_id(lead_email):
+    """The Message-ID every send attempt of ``lead_email`` uses, its idempotency key."""
+    return f"<{lead_email.id}@{settings.EMAIL_MESSAGE_ID_DOMAIN}>"
+
+
+def pending_outbox(org_id=None):
+    """Emails waiting to be sent: queued ones and those whose claim has lapsed."""
+    pending = LeadEmail.objects.filter(
+        Q(status="queued") | Q(status="sending", updated_at__lt=timezone.now() - SENDING_LEASE)
+    )
+    if org_id is not None:
+        pending = pending.filter(lead__org_id=org_id)
+    return pending
+
+
+def active_outbox_org_ids():
+    """Orgs with emails claimed by a worker whose claim has not lapsed."""
+    return set(
+        LeadEmail.objects.filter(status="sending", updated_at__gte=timezone.now() - SENDING_LEASE)
+        .values_list("lead__org_id", flat=True)
+        .distinct()
+    )
+
+
+def _still_claimed(emails):
+    """The given emails that still carry the claim they were loaded with, i.e. the same ``updated_at``."""
+    claims = Q()
+    for lead_email in emails:
+        claims |= Q(id=lead_email.id, updated_at=lead_email.updated_at)
+    return LeadEmail.objects.filter(claims, status="sending")
+
+
+def claim_outbox_emails(org_id, limit=SEND_BATCH_SIZE):
+    """
+    Claims up to ``limit`` of the org's pending emails, oldest first, by moving
+    them to "sending" in a short transaction. Rows another worker is claiming
+    are skipped rather than waited for, so any number of workers drain one
+    outbox without sending an email twice. Emails claimed before, by a worker
+    that did not record their outcome, come back with ``reclaimed`` set.
+    The claim time is kept in ``updated_at``; later writes check it is unchanged.
+    """
+    with transaction.atomic():
+        emails = list(
+            pending_outbox(org_id)
+            .select_for_update(skip_locked=True, of=("self",))
+            .select_related("lead")
+            .order_by("created_at")[:limit]
+        )
+        now = timezone.now()
+        LeadEmail.objects.filter(id__in=[lead_email.id for lead_email in emails]).update(
+            status="sending", updated_at=now
+        )
+        if emails:
+            bump_org_tags_on_commit(org_id, EMAILS)
+    for lead_email in emails:
+        lead_email.reclaimed = lead_email.status == "sending"
+        lead_email.status = "sending"
+        lead_email.updated_at = now
+    return emails
+
+
+def release_outbox_emails(org_id, emails):
+    """
+    Hands claimed emails back to the outbox, e.g. when Gmail rate-limits the
+    mailbox. Reclaimed emails keep their claim until it lapses instead, so the
+    next worker still asks Gmail whether the lost attempt sent them. Emails
+    another worker has claimed since are left alone.
+    """
+    emails = [lead_email for lead_email in emails if not lead_email.reclaimed]
+    if not emails:
+        return
+    _still_claimed(emails).update(status="queued", updated_at=timezone.now())
+    bump_org_tags_on_commit(org_id, EMAILS)
+
+
+def renew_claim(lead_email):
+    """
+    Restarts the lease of one claimed email, right before it is sent. Returns
+    False when the claim lapsed and another worker has claimed the email since,
+    in which case it must not be sent from here.
+    """
+    now = timezone.now()
+    if not _still_claimed([lead_email]).update(updated_at=now):
+        return False
+    lead_email.updated_at = now
+    return True
+
+
+def fail_outbox_emails(org_id):
+    """Marks the org's pending emails failed, for an org that has no mailbox to send them from."""
+    with transaction.atomic():
+        failed = LeadEmail.objects.filter(
+            id__in=pending_outbox(org_id).select_for_update(skip_locked=True, of=("self",)).values("id")
+        ).update(status="failed", updated_at=timezone.now())
+        bump_org_tags_on_commit(org_id, EMAILS)
+    return failed
+
+
+def _send(integration, lead_email):
+    """
+    Sends one claimed email under its outbox Message-ID. An email claimed
+    before may already have gone out, so Gmail is asked for that Message-ID
+    first and a message found there is recorded instead of sending again.
+    """
+    message_id = outbox_message_id(lead_email)
+    if lead_email.reclaimed:
+        existing = find_gmail_message(integration, message_id)
+        if existing:
+            return existing
+    return send_gmail_email(
+        integration=integration,
+        to_email=lead_email.lead.email,
+        subject=lead_email.subject,
+        body=lead_email.body,
+        message_id=message_id,
+    )
+
+
+def send_outbox_emails(integration, limit=SEND_BATCH_SIZE):
+    """
+    Claims a batch of the outbox of the integration's org and sends it through
+    its Gmail mailbox, paced by the mailbox's shared token bucket, then records
+    every outcome in one transaction. Emails whose claim was taken over while
+    waiting for the bucket are skipped. Returns ``(sent, failed, deferred)``:
+    when the mailbox's rate limit keeps the worker waiting too long, or Gmail
+    rate-limits it anyway, the emails not tried yet are released back to the
+    outbox for a later batch.
+    """
+    emails = claim_outbox_emails(integration.org_id, limit)
+    bucket = gmail_send_bucket(integration)
+
+    done = []
+    deferred = []
+    for index, lead_email in enumerate(emails):
+        if not bucket.acquire(timeout=SEND_WAIT_SECONDS):
+            deferred = emails[index:]
+            break
+        if not renew_claim(lead_email):
+            continue
+        try:
+            response = _send(integration, lead_email)
+        except Exception as e:
+            if _is_rate_limited(e):
+                deferred = emails[index:]
+                break
+            # one bad address or token must not lose the outcomes of the rest of the batch
+            lead_email.status = "failed"
+            lead_email.meta = {**(lead_email.meta or {}), "disposition": "gmail_send_failed", "error": str(e)}
+        else:
+            lead_email.status = "sent"
+            lead_email.sent_at = timezone.now()
+            lead_email.gmail_message_id = response.get("id") or ""
+            lead_email.gmail_thread_id = response.get("threadId") or ""
+            lead_email.meta = {**(lead_email.meta or {}), "disposition": "sent_via_gmail"}
+        done.append(lead_email)
+
+    done = record_send_results(integration.org_id, done)
+    release_outbox_emails(integration.org_id, deferred)
+    sent = sum(1 for lead_email in done if lead_email.status == "sent")
+    return sent, len(done) - sent, len(deferred)
+
+
+def record_send_results(org_id, emails):
+    """
+    Saves the status of sent and failed emails with one bulk update and marks
+    the leads that were emailed as contacted, keeping "replied" leads as they are.
+    Only emails still carrying this worker's claim are saved, under a row lock
+    so the claim cannot lapse meanwhile; returns the emails that were saved.
+    """
+    if not emails:
+        return []
+    now = timezone.now()
+    with transaction.atomic():
+        claimed = set(_still_claimed(emails).select_for_update().values_list("id", flat=True))
+        emails = [lead_email for lead_email in emails if lead_email.id in claimed]
+        for lead_email in emails:
+            lead_email.updated_at = now
+        contacted = [lead_email.lead_id for lead_email in emails if lead_email.status == "sent"]
+
+        LeadEmail.objects.bulk_update(emails, SEND_RESULT_FIELDS)
+        Lead.objects.filter(id__in=contacted).update(
+            status=Case(When(status="new", then=Value("contacted")), default=F("status")),
+            last_contacted_at=now,
+            updated_at=now,
+        )
+        # bulk writes send no cache-invalidating signals
+        bump_org_tags_on_commit(org_id, EMAILS, LEADS)
+    return emails
@@ -1,7 +1,138 @@
+import datetime
+import functools
+
+from django.utils import timezone
 from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
 
 from activities.models import ActivityTimeline
-from campaigns.models import Campaign, Lead, LeadEmail, SequenceStep
+from campaigns.models import Campaign, ImportJob, Lead, LeadEmail, SequenceStep
+
+
+class SparseFieldsMixin:
+    """
+    Adds ``?fields=`` projections to a ModelSerializer. Passing ``fields`` drops
+    every other field from the output, and ``project_queryset`` loads only the
+    columns those fields read, following related sources with select_related.
+    """
+
+    # model columns read by fields whose source is not a model attribute path
+    field_columns = {}
+    # columns always loaded, e.g. the pagination sort key
+    required_columns = ("id", "created_at")
+    # builds the value of a field listed in field_columns from a ``.values()`` row
+    row_builders = {}
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    @classmethod
+    def get_requested_fields(cls, request):
+        value = request.query_params.get("fields")
+        if not value:
+            return None
+        requested = [name.strip() for name in value.split(",") if name.strip()]
+        unknown = set(requested) - set(cls.Meta.fields)
+        if unknown:
+            raise ValidationError({"fields": f"Unknown fields: {', '.join(sorted(unknown))}"})
+        return requested
+
+    @classmethod
+    def project_queryset(cls, queryset, fields=None):
+        declared = cls().fields
+        columns = list(cls.required_columns)
+        for name in fields or cls.Meta.fields:
+            if name in cls.field_columns:
+                columns.extend(cls.field_columns[name])
+            else:
+                columns.append(declared[name].source.replace(".", "__"))
+
+        related = {column.rsplit("__", 1)[0] for column in columns if "__" in column}
+        if related:
+            queryset = queryset.select_related(*related)
+        return queryset.only(*dict.fromkeys(columns))
+
+    @classmethod
+    def get_row_mapping(cls, fields=None):
+        return cls._build_row_mapping(frozenset(fields) if fields is not None else None)
+
+    @classmethod
+    @functools.lru_cache(maxsize=128)
+    def _build_row_mapping(cls, fields):
+        """
+        Works out, once per field set, how to read each rendered field from a
+        ``.values()`` row. Returns the columns to select and, in serializer
+        order, ``(name, column or row builder, kind, skip_none)`` entries.
+        """
+        declared = cls().fields
+        columns = list(cls.required_columns)
+        mapping = []
+        for name in cls.Meta.fields:
+            if fields is not None and name not in fields:
+                continue
+            field = declared[name]
+            if name in cls.row_builders:
+                columns.extend(cls.field_columns[name])
+                mapping.append((name, cls.row_builders[name], "row", False))
+                continue
+
+            column = field.source.replace(".", "__")
+            columns.append(column)
+            if isinstance(field, serializers.DateTimeField):
+                kind = "datetime"
+            elif isinstance(field, (serializers.UUIDField, serializers.PrimaryKeyRelatedField)):
+                kind = "str"
+            else:
+                kind = None
+            # a source across a null relation raises SkipField, which drops the key
+            mapping.append((name, column, kind, "__" in column))
+        return list(dict.fromkeys(columns)), mapping
+
+    @classmethod
+    def values_queryset(cls, queryset, fields=None):
+        columns, _ = cls.get_row_mapping(fields)
+        return queryset.values(*columns)
+
+    @classmethod
+    def build_rows(cls, rows, fields=None):
+        """
+        Turns ``.values()`` rows into the dicts ``cls(rows, many=True).data`` would
+        return, without instantiating models or running per-field serializer code.
+        """
+        _, mapping = cls.get_row_mapping(fields)
+        tz = timezone.get_current_timezone()
+        converters = {
+            "datetime": lambda value: _datetime_to_representation(value, tz),
+            "str": str,
+        }
+        data = []
+        for row in rows:
+            item = {}
+            for name, column, kind, skip_none in mapping:
+                if kind == "row":
+                    item[name] = column(row)
+                    continue
+                value = row[column]
+                if value is None:
+                    if not skip_none:
+                        item[name] = None
+                    continue
+                item[name] = converters[kind](value) if kind else value
+            data.append(item)
+        return data
+
+
+def _datetime_to_representation(value, tz):
+    """Same output as DateTimeField.to_representation with the default ISO 8601 format."""
+    if timezone.is_aware(value):
+        value = value.astimezone(tz)
+    value = value.isoformat()
+    if value.endswith("+00:00"):
+        value = value[:-6] + "Z"
+    return value
 
 
 class CampaignSerializer(serializers.ModelSerializer):
@@ -11,7 +142,7 @@ class CampaignSerializer(serializers.ModelSerializer):
         read_only_fields = ["id", "created_at", "updated_at"]
 
 
-class LeadSerializer(serializers.ModelSerializer):
+class LeadSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     campaign_name = serializers.CharField(source="campaign.name", read_only=True)
 
     class Meta:
@@ -34,6 +165,10 @@ class LeadSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ["id", "campaign_name", "created_at", "updated_at", "last_contacted_at"]
 
+    def validate_email(self, value):
+        # imports store emails lowercased; (org, email) is unique on the stored value
+        return value.strip().lower()
+
 
 class SequenceStepSerializer(serializers.ModelSerializer):
     campaign_name = serializers.CharField(source="campaign.name", read_only=True)
@@ -44,10 +179,15 @@ class SequenceStepSerializer(serializers.ModelSerializer):
         read_only_fields = ["id", "campaign_name", "created_at", "updated_at"]
 
 
-class LeadEmailSerializer(serializers.ModelSerializer):
+class LeadEmailSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     lead_name = serializers.SerializerMethodField()
     lead_email = serializers.CharField(source="lead.email", read_only=True)
 
+    field_columns = {"lead_name": ["lead__first_name", "lead__last_name", "lead__email"]}
+    row_builders = {
+        "lead_name": lambda row: f"{row['lead__first_name']} {row['lead__last_name']}".strip() or row["lead__email"],
+    }
+
     class Meta:
         model = LeadEmail
         fields = [
@@ -60,10 +200,25 @@ class LeadEmailSerializer(serializers.ModelSerializer):
             "preview",
             "status",
             "sent_at",
+            "opened_at",
+            "replied_at",
+            "gmail_message_id",
+            "gmail_thread_id",
+            "created_at",
+            "updated_at",
+        ]
+        read_only_fields = [
+            "id",
+            "lead_name",
+            "lead_email",
+            "sent_at",
+            "opened_at",
+            "replied_at",
+            "gmail_message_id",
+            "gmail_thread_id",
             "created_at",
             "updated_at",
         ]
-        read_only_fields = ["id", "lead_name", "lead_email", "sent_at", "created_at", "updated_at"]
 
     def get_lead_name(self, obj):
         full_name = f"{obj.lead.first_name} {obj.lead.last_name}".strip()
@@ -88,3 +243,89 @@ class ActivityTimelineSerializer(serializers.ModelSerializer):
         read_only_fields = ["id", "lead_email", "campaign_name", "created_at"]
 
 
+class ImportJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ImportJob
+        fields = [
+            "id",
+            "campaign",
+            "file_name",
+            "status",
+            "processed_rows",
+            "created_leads",
+            "updated_leads",
+            "failed_rows",
+            "error",
+            "error_report",
+            "started_at",
+            "finished_at",
+            "created_at",
+            "updated_at",
+        ]
+        read_only_fields = fields
+
+
+class LeadBulkFilterSerializer(serializers.Serializer):
+    status = serializers.ChoiceField(choices=Lead._meta.get_field("status").choices, required=False)
+    campaign = serializers.UUIDField(required=False, allow_null=True)
+    company = serializers.CharField(required=False)
+    created_after = serializers.DateTimeField(required=False)
+    created_before = serializers.DateTimeField(required=False)
+
+    def to_internal_value(self, data):
+        if isinstance(data, dict):
+            unknown = set(data) - set(self.fields)
+            if unknown:
+                raise ValidationError(f"Unknown filters: {', '.join(sorted(unknown))}")
+        return super().to_internal_value(data)
+
+
+class LeadBulkChangesSerializer(serializers.Serializer):
+    status = serializers.ChoiceField(choices=Lead._meta.get_field("status").choices, required=False)
+    campaign = serializers.UUIDField(required=False, allow_null=True)
+
+    def validate_campaign(self, value):
+        # the target campaign must belong to the requesting org
+        if value is not None and not Campaign.objects.filter(id=value, org=self.context["org"]).exists():
+            raise ValidationError("Campaign not found for this organization.")
+        return value
+
+
+class LeadBulkActionSerializer(serializers.Serializer):
+    """Request body of the bulk lead endpoint: an action and either ``ids`` or a ``filter``."""
+
+    MAX_IDS = 10000
+
+    action = serializers.ChoiceField(choices=["update", "delete"])
+    ids = serializers.ListField(child=serializers.UUIDField(), required=False, allow_empty=False, max_length=MAX_IDS)
+    filter = LeadBulkFilterSerializer(required=False)
+    changes = LeadBulkChangesSerializer(required=False)
+
+    def validate(self, attrs):
+        if ("ids" in attrs) == ("filter" in attrs):
+            raise ValidationError("Provide either ids or filter.")
+        if "filter" in attrs and not attrs["filter"]:
+            raise ValidationError({"filter": "At least one filter is required."})
+        if attrs["action"] == "update" and not attrs.get("changes"):
+            raise ValidationError({"changes": "At least one change is required for update."})
+        return attrs
+
+
+class EmailAnalyticsQuerySerializer(serializers.Serializer):
+    """Query parameters of the email analytics endpoint; the range defaults to the last 30 days."""
+
+    MAX_DAYS = 731
+
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    interval = serializers.ChoiceField(choices=["day", "week", "month"], default="day")
+    campaign = serializers.UUIDField(required=False)
+
+    def validate(self, attrs):
+        end = attrs.setdefault("end", timezone.now().astimezone(datetime.timezone.utc).date())
+        start = attrs.setdefault("start", end - datetime.timedelta(days=29))
+        if start > end:
+            raise ValidationError({"start": "start must not be after end."})
+        if (end - start).days >= self.MAX_DAYS:
+            raise ValidationError(f"The range may span at most {self.MAX_DAYS} days.")
+        return attrs
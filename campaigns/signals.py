@@ -1,49 +1,35 @@
-from django.db.models.signals import post_save
+import logging
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-from .models import Lead, LeadEmail
-from .tasks import crawl_company_website
+from .cache import CAMPAIGNS, EMAILS, INTEGRATIONS, LEADS, bump_org_tags_on_commit
+from .models import Campaign, Lead, LeadEmail, SequenceStep
+from .tasks import crawl_company_websites
 from .utils import personalize_template_copy
-from agents.tasks import initiate_call_task
+from agents.tasks import initiate_calls_batch_task
+from integrations.models import Integration
 from users.models import OrganizationConfigurations
 
-@receiver(post_save, sender=Lead)
-def auto_enrich_lead(sender, instance, created, **kwargs):
-    if created:
-        # Trigger Celery task asynchronously
-        print("Going to crawl")
-        crawl_company_website.delay(instance.id)
-        
-        # Auto-generate email draft for the new lead
-        try:
-            org_config = OrganizationConfigurations.objects.filter(organization=instance.org).first()
-            if not org_config:
-                print(f"No organization config found for org: {instance.org}")
-                return
-            
-            if not org_config.product_name:
-                print(f"No product_name configured for org: {instance.org}")
-                return
-            
-            if not instance.email:
-                print(f"No email for lead: {instance.id}")
-                return
-            
-            # Check if a draft already exists for this lead
-            existing_draft = LeadEmail.objects.filter(lead=instance, status="draft").first()
-            if existing_draft:
-                print(f"Draft already exists for lead: {instance.id}")
-                return
-            
-            # Generate email draft based on product information
-            company_name = org_config.company_name or "our company"
-            product_name = org_config.product_name
-            product_description = org_config.product_description or ""
-            
-            # Default subject template
-            subject_template = f"Quick intro from {company_name}"
-            
-            # Default email body template using product information
-            email_body_template = f"""Hi {{first_name}},
+logger = logging.getLogger(__name__)
+
+# Leads per enrichment/call message sent to the broker
+NEW_LEAD_TASK_CHUNK_SIZE = 100
+# You can customize the agent name or assign based on rules
+AUTO_DIALER_AGENT_NAME = "AutoDialer"
+
+
+def build_intro_draft(lead, org_config):
+    """Builds (without saving) the auto-generated intro email draft for a new lead."""
+    company_name = org_config.company_name or "our company"
+    product_name = org_config.product_name
+    product_description = org_config.product_description or ""
+
+    # Default subject template
+    subject_template = f"Quick intro from {company_name}"
+
+    # Default email body template using product information
+    email_body_template = f"""Hi {{first_name}},
 
 I'm reaching out from {company_name} about {product_name}.
 
@@ -52,36 +38,109 @@ I'm reaching out from {company_name} about {product_name}.
 Would you be open to a quick conversation to see if this could be a good fit for your team?
 
 Best regards"""
-            
-            rendered_subject = personalize_template_copy(subject_template, instance)
-            rendered_body = personalize_template_copy(email_body_template, instance)
-            
-            email_draft = LeadEmail.objects.create(
-                lead=instance,
-                subject=rendered_subject,
-                body=rendered_body,
-                preview=rendered_body,
-                status="draft",
-                meta={
-                    "source": "auto_generated",
-                    "product": product_name,
-                    "company": company_name,
-                },
-            )
-            print(f"Successfully created email draft {email_draft.id} for lead {instance.id}")
-        except Exception as e:
-            import traceback
-            print(f"Error auto-generating email draft: {e}")
-            print(traceback.format_exc())
-        
-        if not instance.phone:
-            return
-
-            # You can customize the agent name or assign based on rules
-        agent_name = "AutoDialer"
-
-        initiate_call_task.delay(
-            lead_id=str(instance.id),
-            phone_number=instance.phone,
-            agent_name=agent_name,
-        )
+
+    rendered_subject = personalize_template_copy(subject_template, lead)
+    rendered_body = personalize_template_copy(email_body_template, lead)
+
+    return LeadEmail(
+        lead=lead,
+        subject=rendered_subject,
+        body=rendered_body,
+        preview=rendered_body,
+        status="draft",
+        meta={
+            "source": "auto_generated",
+            "product": product_name,
+            "company": company_name,
+        },
+    )
+
+
+def handle_new_leads(leads):
+    """
+    Runs the side effects of newly created leads for a whole batch at once:
+    one configuration lookup, one existing-draft check and one bulk insert for
+    the intro drafts, then website crawls and calls enqueued as chunked tasks.
+    Only leads that get an intro draft are called. Meant to run after the
+    creating transaction has committed.
+    """
+    leads = list(leads)
+    if not leads:
+        return
+
+    org_configs = {}
+    for org_config in OrganizationConfigurations.objects.filter(
+        organization_id__in={lead.org_id for lead in leads}
+    ).order_by("created_at"):
+        org_configs.setdefault(org_config.organization_id, org_config)
+
+    leads_with_draft = set(
+        LeadEmail.objects.filter(lead__in=leads, status="draft").values_list("lead_id", flat=True)
+    )
+    drafts = []
+    for lead in leads:
+        org_config = org_configs.get(lead.org_id)
+        if not org_config or not org_config.product_name:
+            continue
+        if not lead.email or lead.id in leads_with_draft:
+            continue
+        drafts.append(build_intro_draft(lead, org_config))
+
+    try:
+        LeadEmail.objects.bulk_create(drafts, batch_size=NEW_LEAD_TASK_CHUNK_SIZE * 10)
+        for org_id in {draft.lead.org_id for draft in drafts}:
+            bump_org_tags_on_commit(org_id, EMAILS)
+        logger.info("Created %s email drafts for %s new leads", len(drafts), len(leads))
+    except Exception:
+        logger.exception("Error auto-generating email drafts")
+
+    lead_ids = [str(lead.id) for lead in leads]
+    for start in range(0, len(lead_ids), NEW_LEAD_TASK_CHUNK_SIZE):
+        crawl_company_websites.delay(lead_ids[start:start + NEW_LEAD_TASK_CHUNK_SIZE])
+
+    # only leads that passed the draft checks are called, as they always were
+    calls = [[str(draft.lead.id), draft.lead.phone, AUTO_DIALER_AGENT_NAME] for draft in drafts if draft.lead.phone]
+    for start in range(0, len(calls), NEW_LEAD_TASK_CHUNK_SIZE):
+        initiate_calls_batch_task.delay(calls[start:start + NEW_LEAD_TASK_CHUNK_SIZE])
+
+
+@receiver(post_save, sender=Lead)
+def auto_enrich_lead(sender, instance, created, **kwargs):
+    # Bulk imports use bulk_create, which sends no post_save; they call handle_new_leads themselves.
+    if created:
+        transaction.on_commit(lambda: handle_new_leads([instance]))
+
+
+# Cached dashboard/stats payloads (campaigns.cache) are invalidated by bumping
+# the org's tags. Bulk writes, which send no signals, and lead deletes bump the
+# tags themselves: a post_delete receiver would run once per deleted lead, and
+# one on LeadEmail would stop Django from fast-deleting a lead's emails.
+
+@receiver(post_save, sender=Lead)
+def invalidate_lead_cache(sender, instance, **kwargs):
+    bump_org_tags_on_commit(instance.org_id, LEADS)
+
+
+@receiver(post_save, sender=LeadEmail)
+def invalidate_email_cache(sender, instance, **kwargs):
+    # loading the whole lead just for its org_id would add a query to every email save
+    if LeadEmail.lead.is_cached(instance):
+        org_id = instance.lead.org_id
+    else:
+        org_id = Lead.objects.filter(id=instance.lead_id).values_list("org_id", flat=True).first()
+    bump_org_tags_on_commit(org_id, EMAILS)
+
+
+@receiver([post_save, post_delete], sender=Campaign)
+def invalidate_campaign_cache(sender, instance, **kwargs):
+    bump_org_tags_on_commit(instance.org_id, CAMPAIGNS, LEADS)
+
+
+@receiver([post_save, post_delete], sender=SequenceStep)
+def invalidate_sequence_cache(sender, instance, **kwargs):
+    bump_org_tags_on_commit(instance.campaign.org_id, CAMPAIGNS)
+
+
+@receiver([post_save, post_delete], sender=Integration)
+def invalidate_integration_cache(sender, instance, **kwargs):
+    bump_org_tags_on_commit(instance.org_id, INTEGRATIONS)
@@ -1,15 +1,39 @@
-from celery import shared_task
+from celery import group, shared_task
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
 from django.utils import timezone
 from users.models import OrganizationConfigurations
-from .models import Lead
+from .models import ImportJob, Lead
+from .rollups import recount_recent_rollups, update_rollups
+from .sending import (
+    SEND_BATCH_SIZE,
+    active_outbox_org_ids,
+    fail_outbox_emails,
+    pending_outbox,
+    send_outbox_emails,
+)
+from .utils import (
+    IMPORT_CHUNK_SIZE,
+    MAX_REPORTED_ERRORS,
+    EmailSeenSet,
+    add_leads_to_db,
+    delete_upload,
+    file_preprocessing,
+    read_file_chunks,
+)
 from firecrawl import Firecrawl
+from integrations.models import Integration
 import requests
 
+# how long a batch waits after Gmail rate-limited its mailbox
+SEND_RATE_LIMITED_RETRY_SECONDS = 60
+
+
+def enrich_lead_website(lead, org_config):
+    if not org_config or not org_config.firecrawl_api_key:
+        return {"status": "not_configured", "lead_id": str(lead.id)}
 
-@shared_task
-def crawl_company_website(lead_id):
-    lead = Lead.objects.get(id=lead_id)
-    org_config = OrganizationConfigurations.objects.filter(organization=lead.org).last()
     firecrawl = Firecrawl(api_key=org_config.firecrawl_api_key)
     company_url = lead.website
     if not company_url:
@@ -41,19 +65,53 @@ def crawl_company_website(lead_id):
         return {"status": "error", "lead_id": str(lead.id), "error": str(e)}
 
 
+@shared_task
+def crawl_company_website(lead_id):
+    lead = Lead.objects.get(id=lead_id)
+    org_config = OrganizationConfigurations.objects.filter(organization=lead.org).last()
+    return enrich_lead_website(lead, org_config)
+
+
+@shared_task
+def crawl_company_websites(lead_ids):
+    """
+    Batch variant of crawl_company_website used for imports: loads the leads and
+    their org configurations once and fans the crawlable ones out as a group of
+    crawl_company_website tasks, so the Firecrawl extracts run in parallel.
+    """
+    leads = list(Lead.objects.filter(id__in=lead_ids).exclude(website="").only("id", "org_id"))
+    org_configs = {}
+    for org_config in OrganizationConfigurations.objects.filter(
+        organization_id__in={lead.org_id for lead in leads}
+    ).order_by("created_at"):
+        org_configs[org_config.organization_id] = org_config
+
+    crawlable = [
+        str(lead.id) for lead in leads
+        if org_configs.get(lead.org_id) and org_configs[lead.org_id].firecrawl_api_key
+    ]
+    if crawlable:
+        group([crawl_company_website.s(lead_id) for lead_id in crawlable]).apply_async()
+    return {"status": "queued", "crawls": len(crawlable), "skipped": len(lead_ids) - len(crawlable)}
+
+
+def unenriched_leads():
+    """
+    Leads with a website and no enrichment data yet. ``enriched`` is not
+    nullable, so an empty object is the only "not enriched" value; the filter
+    is written to match the campaigns_lead_unenriched partial index.
+    """
+    return Lead.objects.filter(enriched={}).exclude(website="").order_by("created_at")
+
+
 @shared_task
 def daily_enrich_leads():
     """
     Daily task to enrich leads that haven't been enriched yet or need re-enrichment.
     Processes leads that have a website but no enrichment data or stale enrichment.
     """
-    from django.db.models import Q
-    
-    # Get leads that have a website but no enrichment or empty enrichment
-    leads_to_enrich = Lead.objects.filter(
-        Q(website__isnull=False) & ~Q(website=""),
-        Q(enriched__isnull=True) | Q(enriched={})
-    )[:50]  # Process up to 50 leads per run to avoid overwhelming the system
+    # Get leads that have a website but no enrichment, oldest first
+    leads_to_enrich = unenriched_leads()[:50]  # Process up to 50 leads per run to avoid overwhelming the system
     
     enriched_count = 0
     error_count = 0
@@ -78,3 +136,130 @@ def daily_enrich_leads():
         "total_found": leads_to_enrich.count()
     }
 
+
+@shared_task(acks_late=True, reject_on_worker_lost=True)
+def run_import_job(job_id):
+    """
+    Commits an uploaded lead file in chunks, recording progress on the ImportJob.
+    Every chunk is written in the same transaction as the counters, so a job
+    redelivered after a worker crash skips the chunks already committed.
+    """
+    job = ImportJob.objects.select_related("org").get(id=job_id)
+    if job.status in ("completed", "failed"):
+        return {"status": job.status, "job_id": str(job.id)}
+
+    job.status = "running"
+    job.started_at = job.started_at or timezone.now()
+    job.save(update_fields=["status", "started_at", "updated_at"])
+
+    seen = EmailSeenSet()
+    try:
+        for index, chunk in enumerate(read_file_chunks(job.file_path, IMPORT_CHUNK_SIZE)):
+            read_rows = len(chunk.index)
+            chunk, errors = file_preprocessing(chunk)
+            chunk = seen.drop_seen(chunk)
+            if index < job.committed_chunks:
+                # already committed by an earlier run, only replayed to rebuild the seen set
+                continue
+
+            invalid_rows = errors.loc[errors["field"] == "email", "row"].nunique()
+            progress = {}
+            if len(job.error_report) < MAX_REPORTED_ERRORS and not errors.empty:
+                job.error_report += errors.head(MAX_REPORTED_ERRORS - len(job.error_report)).to_dict(orient="records")
+                progress["error_report"] = job.error_report
+
+            with transaction.atomic():
+                stats = add_leads_to_db(chunk, job.org, job.campaign_id)
+                rows = len(chunk.index)
+                ImportJob.objects.filter(id=job.id).update(
+                    # every row read, so the duplicates of an email are the rows
+                    # neither created, updated nor failed
+                    processed_rows=F("processed_rows") + read_rows,
+                    created_leads=F("created_leads") + stats["created"],
+                    updated_leads=F("updated_leads") + stats["updated"],
+                    failed_rows=F("failed_rows") + invalid_rows + rows - stats["created"] - stats["updated"],
+                    committed_chunks=index + 1,
+                    updated_at=timezone.now(),
+                    **progress,
+                )
+    except Exception as e:
+        ImportJob.objects.filter(id=job.id).update(
+            status="failed", error=str(e), finished_at=timezone.now(), updated_at=timezone.now()
+        )
+        delete_upload(job.file_path)
+        return {"status": "failed", "job_id": str(job.id), "error": str(e)}
+
+    ImportJob.objects.filter(id=job.id).update(
+        status="completed", finished_at=timezone.now(), updated_at=timezone.now()
+    )
+    # only a job that has not finished may still read its file
+    delete_upload(job.file_path)
+    return {"status": "completed", "job_id": str(job.id)}
+
+
+@shared_task
+def update_email_rollups():
+    """
+    Periodic task folding email activity since the previous run into the daily
+    rollup table the analytics endpoint reads.
+    """
+    rows = update_rollups()
+    return {"status": "completed", "rows": rows}
+
+
+@shared_task
+def recount_email_rollups():
+    """
+    Nightly task recounting the recent rollup days, for emails that moved to
+    another day or were deleted after update_email_rollups counted them.
+    """
+    rows = recount_recent_rollups()
+    return {"status": "completed", "rows": rows}
+
+
+@shared_task
+def send_email_outbox(integration_id):
+    """
+    One send worker of a Gmail integration's outbox: claims a batch of its org's
+    pending emails, sends it, and hands over to a fresh task while a full batch
+    was found. Workers of the same mailbox claim disjoint rows and share its
+    rate limit; when Gmail still rate-limits it, the worker retries later.
+    """
+    integration = Integration.objects.filter(id=integration_id).first()
+    if integration is None:
+        return {"status": "no_integration"}
+
+    sent, failed, deferred = send_outbox_emails(integration)
+    if deferred:
+        send_email_outbox.apply_async(args=[integration_id], countdown=SEND_RATE_LIMITED_RETRY_SECONDS)
+    elif sent + failed == SEND_BATCH_SIZE:
+        send_email_outbox.delay(integration_id)
+    return {"status": "completed", "sent": sent, "failed": failed, "deferred": deferred}
+
+
+def start_outbox_workers(integration_id, queued):
+    """Starts enough send_email_outbox workers for ``queued`` new emails, up to EMAIL_OUTBOX_WORKERS."""
+    workers = min(-(-queued // SEND_BATCH_SIZE), settings.EMAIL_OUTBOX_WORKERS)
+    for _ in range(workers):
+        send_email_outbox.delay(str(integration_id))
+
+
+@shared_task
+def drain_email_outbox():
+    """
+    Periodic task starting a worker for every outbox with pending emails, which
+    picks up emails whose worker was lost. Outboxes a worker is still sending
+    from, with unexpired claims, are left to it. Emails of orgs without a Gmail
+    integration cannot be sent and are marked failed.
+    """
+    org_ids = set(pending_outbox().values_list("lead__org_id", flat=True).distinct())
+    integrations = Integration.objects.filter(org_id__in=org_ids, provider="gmail")
+    busy = active_outbox_org_ids()
+    for integration in integrations:
+        if integration.org_id not in busy:
+            send_email_outbox.delay(str(integration.id))
+
+    unsendable = org_ids - {integration.org_id for integration in integrations}
+    for org_id in unsendable:
+        fail_outbox_emails(org_id)
+    return {"status": "completed", "outboxes": len(org_ids), "unsendable": len(unsendable)}
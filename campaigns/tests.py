@@ -1,3 +1,1128 @@
-from django.test import TestCase
+import csv
+import datetime
+import importlib
+import json
+import os
+import tempfile
+import threading
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.postgres.search import SearchQuery
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from openpyxl import Workbook
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from activities.models import ActivityTimeline
+from integrations.models import Integration
+from users.models import Organization, OrganizationConfigurations, User
+from .cache import EMAILS, LEADS, _tag_versions, bump_org_tags, cached_org_data
+from .counters import verify_counters
+from .exports import EMAIL_EXPORT_COLUMNS, LEAD_EXPORT_COLUMNS
+from .management.commands.explain_hot_queries import INDEX_SCAN_PATTERN, hot_queries
+from .models import Campaign, EmailDailyRollup, EmailRollupWatermark, ImportJob, Lead, LeadEmail, SequenceStep
+from .rollups import compute_rollups, rollup_series, update_rollups
+from .serializers import LeadEmailSerializer, LeadSerializer
+from .sending import (
+    SENDING_LEASE,
+    claim_outbox_emails,
+    outbox_message_id,
+    record_send_results,
+    send_outbox_emails,
+)
+from .tasks import crawl_company_websites, drain_email_outbox, run_import_job
+from .utils import bulk_lead_action, delete_upload, import_leads_from_file, read_file_chunks
+from .views import DashboardSummaryView
+
+LOCMEM_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+def create_outbox(count, org=None):
+    """An org with a Gmail integration and ``count`` queued emails, one per lead, oldest first."""
+    org = org or Organization.objects.create(name="Acme")
+    integration = Integration.objects.create(
+        org=org, provider="gmail", access_token="token", refresh_token="refresh",
+        expires_at=timezone.now() + timedelta(hours=1),
+    )
+    # bulk_create sends no post_save, so no drafts, crawls or calls are started
+    leads = Lead.objects.bulk_create(
+        Lead(org=org, email=f"lead{index}@example.com") for index in range(count)
+    )
+    now = timezone.now()
+    emails = LeadEmail.objects.bulk_create(
+        LeadEmail(lead=lead, subject="Hi", body="Hello", status="queued", created_at=now + timedelta(seconds=index))
+        for index, lead in enumerate(leads)
+    )
+    return integration, emails
+
+
+def expire_claims(emails):
+    LeadEmail.objects.filter(id__in=[lead_email.id for lead_email in emails]).update(
+        status="sending", updated_at=timezone.now() - SENDING_LEASE - timedelta(seconds=1)
+    )
+
+
+def write_upload(testcase, text, ext=".csv"):
+    """A temporary upload file holding ``text``, removed when the test ends."""
+    handle, path = tempfile.mkstemp(suffix=ext)
+    with os.fdopen(handle, "w") as upload:
+        upload.write(text)
+    testcase.addCleanup(delete_upload, path)
+    return path
+
+
+class MigrationTestCase(TransactionTestCase):
+    """
+    Migrates to ``migrate_from`` before each test, so rows can be created in
+    that older schema through ``self.old_apps``; ``migrate()`` then applies
+    ``migrate_to``. The database is migrated back to the latest state after.
+    """
+
+    migrate_from = None
+    migrate_to = None
+
+    def setUp(self):
+        self.old_apps = self._migrate(self.migrate_from)
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+        super().tearDown()
+
+    def migrate(self):
+        return self._migrate(self.migrate_to)
+
+    @staticmethod
+    def _migrate(targets):
+        executor = MigrationExecutor(connection)
+        executor.migrate(targets)
+        executor.loader.build_graph()
+        return executor.loader.project_state(targets).apps
+
+
+class OpenBucket:
+    def acquire(self, tokens=1, timeout=None):
+        return True
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class OutboxClaimTests(TransactionTestCase):
+    def test_claim_skips_emails_locked_by_another_worker(self):
+        integration, emails = create_outbox(4)
+        locked = threading.Event()
+        release = threading.Event()
+
+        def other_worker():
+            try:
+                with transaction.atomic():
+                    list(LeadEmail.objects.filter(id__in=[emails[0].id, emails[1].id]).select_for_update())
+                    locked.set()
+                    release.wait(10)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=other_worker)
+        thread.start()
+        try:
+            self.assertTrue(locked.wait(10))
+            claimed = claim_outbox_emails(integration.org_id)
+        finally:
+            release.set()
+            thread.join()
+
+        self.assertEqual([lead_email.id for lead_email in claimed], [emails[2].id, emails[3].id])
+        self.assertEqual(
+            set(LeadEmail.objects.filter(status="sending").values_list("id", flat=True)),
+            {emails[2].id, emails[3].id},
+        )
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+@mock.patch("campaigns.sending.gmail_send_bucket", return_value=OpenBucket())
+class OutboxSendTests(TestCase):
+    def test_claimed_emails_are_claimable_again_only_after_the_lease(self, bucket):
+        integration, emails = create_outbox(3)
+        first = claim_outbox_emails(integration.org_id, limit=2)
+        self.assertFalse(any(lead_email.reclaimed for lead_email in first))
+
+        self.assertEqual([lead_email.id for lead_email in claim_outbox_emails(integration.org_id)], [emails[2].id])
+        self.assertEqual(claim_outbox_emails(integration.org_id), [])
+
+        expire_claims(emails[:1])
+        reclaimed = claim_outbox_emails(integration.org_id)
+        self.assertEqual([lead_email.id for lead_email in reclaimed], [emails[0].id])
+        self.assertTrue(reclaimed[0].reclaimed)
+
+    @mock.patch("campaigns.sending.send_gmail_email")
+    @mock.patch("campaigns.sending.find_gmail_message", return_value={"id": "m1", "threadId": "t1"})
+    def test_reclaimed_email_already_in_gmail_is_not_sent_again(self, find, send, bucket):
+        integration, emails = create_outbox(1)
+        expire_claims(emails)
+
+        self.assertEqual(send_outbox_emails(integration), (1, 0, 0))
+        find.assert_called_once_with(integration, outbox_message_id(emails[0]))
+        send.assert_not_called()
+        lead_email = LeadEmail.objects.get(id=emails[0].id)
+        self.assertEqual((lead_email.status, lead_email.gmail_message_id), ("sent", "m1"))
+        self.assertEqual(Lead.objects.get(id=lead_email.lead_id).status, "contacted")
+
+    @mock.patch("campaigns.sending.send_gmail_email", return_value={"id": "m2", "threadId": "t2"})
+    @mock.patch("campaigns.sending.find_gmail_message", return_value=None)
+    def test_reclaimed_email_missing_from_gmail_is_sent_under_its_message_id(self, find, send, bucket):
+        integration, emails = create_outbox(1)
+        expire_claims(emails)
+
+        self.assertEqual(send_outbox_emails(integration), (1, 0, 0))
+        self.assertEqual(send.call_args.kwargs["message_id"], outbox_message_id(emails[0]))
+        self.assertEqual(LeadEmail.objects.get(id=emails[0].id).gmail_message_id, "m2")
+
+    @mock.patch("campaigns.sending.send_gmail_email", return_value={"id": "m3", "threadId": "t3"})
+    def test_first_send_does_not_look_up_gmail(self, send, bucket):
+        integration, emails = create_outbox(2)
+        with mock.patch("campaigns.sending.find_gmail_message") as find:
+            self.assertEqual(send_outbox_emails(integration), (2, 0, 0))
+        find.assert_not_called()
+        self.assertEqual(send.call_count, 2)
+
+    @mock.patch("campaigns.sending.send_gmail_email")
+    def test_email_claimed_by_another_worker_meanwhile_is_skipped(self, send, bucket):
+        integration, emails = create_outbox(2)
+        taken_over = timezone.now() + timedelta(seconds=5)
+
+        def send_and_lose_the_next_claim(**kwargs):
+            LeadEmail.objects.filter(id=emails[1].id).update(updated_at=taken_over)
+            return {"id": "m4", "threadId": "t4"}
+
+        send.side_effect = send_and_lose_the_next_claim
+        self.assertEqual(send_outbox_emails(integration), (1, 0, 0))
+        self.assertEqual(send.call_count, 1)
+        skipped = LeadEmail.objects.get(id=emails[1].id)
+        self.assertEqual((skipped.status, skipped.updated_at), ("sending", taken_over))
+
+    def test_outcome_of_a_lapsed_claim_is_not_recorded(self, bucket):
+        integration, emails = create_outbox(2)
+        claimed = claim_outbox_emails(integration.org_id)
+        expire_claims(claimed[:1])
+        claim_outbox_emails(integration.org_id)
+
+        for lead_email in claimed:
+            lead_email.status = "sent"
+        recorded = record_send_results(integration.org_id, claimed)
+
+        self.assertEqual([lead_email.id for lead_email in recorded], [emails[1].id])
+        self.assertEqual(LeadEmail.objects.get(id=emails[0].id).status, "sending")
+        self.assertEqual(LeadEmail.objects.get(id=emails[1].id).status, "sent")
+
+    @mock.patch("campaigns.tasks.send_email_outbox.delay")
+    def test_drain_leaves_outboxes_with_unexpired_claims_to_their_worker(self, delay, bucket):
+        busy, _ = create_outbox(2)
+        claim_outbox_emails(busy.org_id, limit=1)
+        idle, _ = create_outbox(1)
+
+        drain_email_outbox()
+        delay.assert_called_once_with(str(idle.id))
+
+
+@override_settings(CACHES=LOCMEM_CACHES, QUERY_BUDGET_ACTION="raise")
+class QueryBudgetTests(TestCase):
+    """The budgeted views stay within their query budgets with several rows per table."""
+
+    @classmethod
+    def setUpTestData(cls):
+        org = Organization.objects.create(name="Acme")
+        cls.user = User.objects.create_user(username="sdr", password="secret", org=org, role="sdr")
+        Integration.objects.create(
+            org=org, provider="gmail", access_token="token", refresh_token="refresh",
+            expires_at=timezone.now() + timedelta(hours=1),
+        )
+        campaigns = [Campaign.objects.create(org=org, name=f"Campaign {index}") for index in range(3)]
+        for campaign in campaigns:
+            SequenceStep.objects.bulk_create(
+                SequenceStep(campaign=campaign, order=order, action="send_email") for order in range(3)
+            )
+        leads = Lead.objects.bulk_create(
+            Lead(org=org, campaign=campaigns[index % 3], email=f"lead{index}@example.com", first_name=f"Lead {index}")
+            for index in range(12)
+        )
+        now = timezone.now()
+        LeadEmail.objects.bulk_create(
+            LeadEmail(lead=lead, subject="Hi", body="Hello", status=status, sent_at=now if status == "sent" else None)
+            for lead in leads
+            for status in ("sent", "draft")
+        )
+        ActivityTimeline.objects.bulk_create(ActivityTimeline(lead=lead, payload={"event": "called"}) for lead in leads)
+        EmailDailyRollup.objects.bulk_create(
+            EmailDailyRollup(org=org, campaign=campaign, day=now.date() - timedelta(days=day), sent=2)
+            for campaign in campaigns
+            for day in range(5)
+        )
+
+    def setUp(self):
+        cache.clear()
+        # a real token, so the views load the user and its org the way they do in production
+        self.client.defaults["HTTP_AUTHORIZATION"] = f"Bearer {RefreshToken.for_user(self.user).access_token}"
+
+    def assertListed(self, name, count, query=""):
+        response = self.client.get(reverse(name) + query)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(len(data["results"] if isinstance(data, dict) else data), count)
+        return response
+
+    def test_list_views(self):
+        self.assertListed("lead-list-create", 12)
+        self.assertListed("lead-list-create", 12, "?fields=id,email,campaign_name")
+        self.assertListed("email-log", 24)
+        self.assertListed("activity-list", 12)
+        self.assertListed("sequence-list-create", 9)
+
+    def test_unchanged_list_is_not_modified(self):
+        etag = self.assertListed("lead-list-create", 12)["ETag"]
+        response = self.client.get(reverse("lead-list-create"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_dashboard_cache_miss_and_hit(self):
+        org = self.user.org
+        build_payload = mock.patch.object(
+            DashboardSummaryView, "build_payload", autospec=True, side_effect=DashboardSummaryView.build_payload
+        )
+
+        def total_leads():
+            response = self.client.get(reverse("campaign-summary"))
+            self.assertEqual(response.status_code, 200)
+            return response.json()["metrics"]["total_leads"]
+
+        with build_payload as build:
+            self.assertEqual(total_leads(), 12)
+            with CaptureQueriesContext(connection) as hit:
+                self.assertEqual(total_leads(), 12)
+            self.assertEqual(build.call_count, 1)
+            # only authentication and the org lookup; nothing of the payload is read
+            self.assertFalse([query["sql"] for query in hit if "campaigns_" in query["sql"]])
+            with self.assertNumQueries(0):
+                cached_org_data(org, "dashboard", DashboardSummaryView.cache_tags, mock.Mock())
+
+            # bulk_create sends no signals, so the cached payload stays until the tag is bumped
+            Lead.objects.bulk_create([Lead(org=org, email="new@example.com")])
+            self.assertEqual(total_leads(), 12)
+            bump_org_tags(org.id, LEADS)
+            self.assertEqual(total_leads(), 13)
+            self.assertEqual(build.call_count, 2)
+
+    def test_email_analytics(self):
+        response = self.client.get(reverse("email-analytics"), {"interval": "week"})
+        self.assertEqual(response.status_code, 200)
+
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        org = Organization.objects.create(name="Acme")
+        user = User.objects.create_user(username="sdr", password="secret", org=org, role="sdr")
+        self.client.defaults["HTTP_AUTHORIZATION"] = f"Bearer {RefreshToken.for_user(user).access_token}"
+        self.leads = Lead.objects.bulk_create(Lead(org=org, email=f"lead{index}@example.com") for index in range(5))
+        Lead.objects.bulk_create([Lead(org=Organization.objects.create(name="Other"), email="other@example.com")])
+        # three leads share created_at, so only the id orders them
+        now = timezone.now()
+        for lead, age in zip(self.leads, (timedelta(), timedelta(seconds=1), timedelta(seconds=1), timedelta(seconds=1), timedelta(days=1))):
+            lead.created_at = now - age
+            Lead.objects.filter(id=lead.id).update(created_at=lead.created_at)
+
+    def test_cursor_walks_every_row_once_in_order(self):
+        ids, query = [], {"page_size": 2}
+        while True:
+            data = self.client.get(reverse("lead-list-create"), query).json()
+            ids += [row["id"] for row in data["results"]]
+            if not data["next"]:
+                break
+            query = {"page_size": 2, "cursor": data["next"]}
+
+        expected = sorted(self.leads, key=lambda lead: (lead.created_at, lead.id), reverse=True)
+        self.assertEqual(ids, [str(lead.id) for lead in expected])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse("lead-list-create"), {"cursor": "not-a-cursor"})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"cursor": "Invalid cursor."})
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class TypeaheadTests(TestCase):
+    def setUp(self):
+        org = Organization.objects.create(name="Acme")
+        user = User.objects.create_user(username="sdr", password="secret", org=org, role="sdr")
+        self.client.defaults["HTTP_AUTHORIZATION"] = f"Bearer {RefreshToken.for_user(user).access_token}"
+        Lead.objects.create(org=org, email="ab@example.com")
+
+    def test_terms_without_a_trigram_match_nothing(self):
+        for kind in ("lead", "campaign"):
+            response = self.client.get(reverse("typeahead"), {"q": " ab ", "type": kind})
+
+            self.assertEqual(response.json(), {"results": []})
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ExportTests(TestCase):
+    def setUp(self):
+        org = Organization.objects.create(name="Acme")
+        user = User.objects.create_user(username="sdr", password="secret", org=org, role="sdr")
+        self.client.defaults["HTTP_AUTHORIZATION"] = f"Bearer {RefreshToken.for_user(user).access_token}"
+        campaign = Campaign.objects.create(org=org, name="Launch")
+        self.contacted_at = timezone.now()
+        self.lead, self.unnamed = Lead.objects.bulk_create([
+            Lead(
+                org=org, campaign=campaign, email="jane@example.com", first_name="Jane",
+                company='=HYPERLINK("http://evil.example")', phone="+15551234567", last_contacted_at=self.contacted_at,
+            ),
+            Lead(org=org, email="bob@example.com", company="@SUM(A1)"),
+        ])
+        LeadEmail.objects.bulk_create([
+            LeadEmail(lead=self.lead, subject="-2+3", body="Hello", status="sent", sent_at=self.contacted_at),
+            LeadEmail(lead=self.unnamed, subject="Hi", body="Hello"),
+        ])
+        other = Lead.objects.bulk_create([Lead(org=Organization.objects.create(name="Other"), email="other@example.com")])
+        LeadEmail.objects.bulk_create([LeadEmail(lead=other[0], subject="Hi", body="Hello")])
+
+    def export(self, name, output):
+        response = self.client.get(reverse(name), {"output": output})
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content).decode()
+
+    def test_lead_csv(self):
+        header, *rows = csv.reader(self.export("lead-export", "csv").splitlines())
+
+        self.assertEqual(header, [name for name, _ in LEAD_EXPORT_COLUMNS])
+        rows = [dict(zip(header, row)) for row in rows]
+        self.assertEqual([row["email"] for row in rows], ["jane@example.com", "bob@example.com"])
+        self.assertEqual(
+            (rows[0]["campaign_name"], rows[0]["company"], rows[0]["phone"], rows[0]["last_contacted_at"]),
+            ("Launch", '\'=HYPERLINK("http://evil.example")', "'+15551234567", self.contacted_at.isoformat()),
+        )
+        self.assertEqual((rows[1]["campaign"], rows[1]["company"], rows[1]["last_contacted_at"]), ("", "'@SUM(A1)", ""))
+
+    def test_lead_ndjson(self):
+        rows = [json.loads(line) for line in self.export("lead-export", "ndjson").splitlines()]
+
+        self.assertEqual([list(row) for row in rows], [[name for name, _ in LEAD_EXPORT_COLUMNS]] * 2)
+        self.assertEqual(
+            (rows[0]["id"], rows[0]["company"], rows[0]["last_contacted_at"]),
+            (str(self.lead.id), '=HYPERLINK("http://evil.example")', self.contacted_at.isoformat()),
+        )
+        self.assertEqual((rows[1]["email"], rows[1]["campaign"], rows[1]["last_contacted_at"]), ("bob@example.com", None, None))
+
+    def test_email_csv_and_ndjson(self):
+        header, *rows = csv.reader(self.export("email-export", "csv").splitlines())
+
+        self.assertEqual(header, [name for name, _ in EMAIL_EXPORT_COLUMNS])
+        rows = [dict(zip(header, row)) for row in rows]
+        self.assertEqual(
+            [(row["lead_name"], row["subject"], row["sent_at"]) for row in rows],
+            [("Jane", "'-2+3", self.contacted_at.isoformat()), ("bob@example.com", "Hi", "")],
+        )
+
+        rows = [json.loads(line) for line in self.export("email-export", "ndjson").splitlines()]
+        self.assertEqual(
+            [(row["lead_name"], row["subject"], row["sent_at"]) for row in rows],
+            [("Jane", "-2+3", self.contacted_at.isoformat()), ("bob@example.com", "Hi", None)],
+        )
+
+    def test_unknown_output(self):
+        response = self.client.get(reverse("lead-export"), {"output": "xlsx"})
+
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class LeadBulkActionTests(TestCase):
+    def setUp(self):
+        self.org = Organization.objects.create(name="Acme")
+        user = User.objects.create_user(username="sdr", password="secret", org=self.org, role="sdr")
+        self.client.defaults["HTTP_AUTHORIZATION"] = f"Bearer {RefreshToken.for_user(user).access_token}"
+        self.campaign = Campaign.objects.create(org=self.org, name="Launch")
+        self.leads = Lead.objects.bulk_create(
+            Lead(org=self.org, email=f"lead{index}@example.com", company="Acme") for index in range(3)
+        )
+        LeadEmail.objects.bulk_create(LeadEmail(lead=lead, subject="Hi", body="Hello") for lead in self.leads)
+        other_org = Organization.objects.create(name="Other")
+        self.other_campaign = Campaign.objects.create(org=other_org, name="Theirs")
+        self.other_lead = Lead.objects.bulk_create([Lead(org=other_org, email="other@example.com", company="Acme")])[0]
+
+    def post(self, body):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse("lead-bulk"), body, content_type="application/json")
+
+    def test_update_by_ids_skips_other_orgs(self):
+        versions = _tag_versions(self.org.id, [LEADS, EMAILS])
+        ids = [str(self.leads[0].id), str(self.leads[1].id), str(self.other_lead.id)]
+
+        response = self.post({"action": "update", "ids": ids, "changes": {"status": "contacted", "campaign": str(self.campaign.id)}})
+
+        self.assertEqual(response.json(), {"action": "update", "updated": 2})
+        self.assertEqual(
+            set(Lead.objects.filter(status="contacted", campaign=self.campaign).values_list("id", flat=True)),
+            {self.leads[0].id, self.leads[1].id},
+        )
+        self.other_lead.refresh_from_db()
+        self.assertEqual((self.other_lead.status, self.other_lead.campaign_id), ("new", None))
+        new_versions = _tag_versions(self.org.id, [LEADS, EMAILS])
+        self.assertNotEqual(new_versions[0], versions[0])
+        self.assertEqual(new_versions[1], versions[1])
+
+    def test_update_by_filter_stays_in_the_org(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            updated = bulk_lead_action(self.org, "update", filters={"company": "ACME"}, changes={"status": "replied"}, chunk_size=2)
+
+        self.assertEqual(updated, 3)
+        self.assertEqual(Lead.objects.filter(status="replied").count(), 3)
+        self.other_lead.refresh_from_db()
+        self.assertEqual(self.other_lead.status, "new")
+
+    def test_delete_by_filter_stays_in_the_org(self):
+        versions = _tag_versions(self.org.id, [LEADS, EMAILS])
+
+        response = self.post({"action": "delete", "filter": {"company": "Acme"}})
+
+        self.assertEqual(response.json(), {"action": "delete", "deleted": 3})
+        self.assertEqual(list(Lead.objects.values_list("id", flat=True)), [self.other_lead.id])
+        self.assertFalse(LeadEmail.objects.exists())
+        new_versions = _tag_versions(self.org.id, [LEADS, EMAILS])
+        self.assertTrue(all(new != old for new, old in zip(new_versions, versions)))
+
+    def test_campaign_of_another_org_is_rejected(self):
+        response = self.post({"action": "update", "ids": [str(self.leads[0].id)], "changes": {"campaign": str(self.other_campaign.id)}})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("campaign", response.json()["changes"])
+        self.assertFalse(Lead.objects.filter(campaign=self.other_campaign).exists())
+
+    def test_invalid_requests(self):
+        lead_id = str(self.leads[0].id)
+        for body in (
+            {"action": "delete", "ids": [lead_id], "filter": {"status": "new"}},
+            {"action": "delete"},
+            {"action": "delete", "filter": {}},
+            {"action": "delete", "filter": {"org": "anything"}},
+            {"action": "update", "ids": [lead_id]},
+        ):
+            with self.subTest(body):
+                self.assertEqual(self.post(body).status_code, 400)
+        self.assertEqual(Lead.objects.count(), 4)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class LeadSearchTests(TestCase):
+    def setUp(self):
+        self.org = Organization.objects.create(name="Acme")
+        user = User.objects.create_user(username="sdr", password="secret", org=self.org, role="sdr")
+        self.client.defaults["HTTP_AUTHORIZATION"] = f"Bearer {RefreshToken.for_user(user).access_token}"
+
+    def assertMatches(self, lead, term, matches=True):
+        query = SearchQuery(term, search_type="websearch", config="english")
+        self.assertEqual(Lead.objects.filter(id=lead.id, search_vector=query).exists(), matches, term)
+
+    def test_trigger_indexes_inserts_and_updates(self):
+        lead = Lead.objects.bulk_create([
+            Lead(org=self.org, email="jane@globex.io", company="Initech", enriched={"description": "Industrial robotics"}),
+        ])[0]
+        for term in ("globex", "initech", "robot"):
+            self.assertMatches(lead, term)
+
+        Lead.objects.filter(id=lead.id).update(enriched={"recent news": {"headline": "Opened a warehouse"}})
+        self.assertMatches(lead, "robotics", matches=False)
+        self.assertMatches(lead, "warehouses")
+
+        lead.refresh_from_db()
+        lead.company = "Umbrella"
+        lead.save()
+        self.assertMatches(lead, "initech", matches=False)
+        self.assertMatches(lead, "umbrella")
+
+    def test_results_are_ranked_and_org_scoped(self):
+        enriched_only, in_email = Lead.objects.bulk_create([
+            Lead(org=self.org, email="bob@example.com", enriched={"description": "Partner of Globex"}),
+            Lead(org=self.org, email="jane@globex.io"),
+            Lead(org=self.org, email="nobody@example.com"),
+        ])[:2]
+        Lead.objects.bulk_create([Lead(org=Organization.objects.create(name="Other"), email="jane@globex.io")])
+
+        results = self.client.get(reverse("lead-search"), {"q": "globex"}).json()["results"]
+
+        self.assertEqual([row["id"] for row in results], [str(in_email.id), str(enriched_only.id)])
+        self.assertGreater(results[0]["rank"], results[1]["rank"])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class SparseFieldsTests(TestCase):
+    def setUp(self):
+        org = Organization.objects.create(name="Acme")
+        user = User.objects.create_user(username="sdr", password="secret", org=org, role="sdr")
+        self.client.defaults["HTTP_AUTHORIZATION"] = f"Bearer {RefreshToken.for_user(user).access_token}"
+        campaign = Campaign.objects.create(org=org, name="Launch")
+        self.lead, unnamed = Lead.objects.bulk_create([
+            Lead(org=org, campaign=campaign, email="jane@example.com", first_name="Jane", last_contacted_at=timezone.now()),
+            Lead(org=org, email="bob@example.com"),
+        ])
+        LeadEmail.objects.bulk_create(
+            LeadEmail(lead=lead, subject="Hi", body="Hello", status="sent", sent_at=timezone.now()) for lead in (self.lead, unnamed)
+        )
+
+    def get_results(self, name, fields=None):
+        response = self.client.get(reverse(name), {"fields": fields} if fields else {})
+        self.assertEqual(response.status_code, 200)
+        return response.json()["results"]
+
+    def test_rows_match_the_serializers(self):
+        # the lists build rows from .values() instead of running the serializers
+        for name, serializer_class, queryset in (
+            ("lead-list-create", LeadSerializer, Lead.objects.all()),
+            ("email-log", LeadEmailSerializer, LeadEmail.objects.all()),
+        ):
+            with self.subTest(name):
+                expected = serializer_class(queryset.order_by("-created_at", "-id"), many=True).data
+                self.assertEqual(self.get_results(name), json.loads(json.dumps(expected, cls=JSONEncoder)))
+
+    def test_requested_fields_are_projected(self):
+        results = self.get_results("lead-list-create", "email, campaign_name,id")
+        # like the serializer, a lead without a campaign has no campaign_name
+        self.assertEqual(
+            results,
+            [
+                {"id": mock.ANY, "email": "bob@example.com"},
+                {"id": str(self.lead.id), "campaign_name": "Launch", "email": "jane@example.com"},
+            ],
+        )
+        self.assertEqual(list(results[1]), ["id", "campaign_name", "email"])
+
+        results = self.get_results("email-log", "lead_name,subject")
+        self.assertEqual(results, [{"lead_name": "bob@example.com", "subject": "Hi"}, {"lead_name": "Jane", "subject": "Hi"}])
+
+    def test_only_the_requested_columns_are_loaded(self):
+        lead = LeadSerializer.project_queryset(Lead.objects.all(), ["email", "campaign_name"]).get(id=self.lead.id)
+
+        self.assertEqual(
+            lead.get_deferred_fields(),
+            {field.attname for field in Lead._meta.concrete_fields} - {"id", "created_at", "email", "campaign_id"},
+        )
+        with self.assertNumQueries(0):
+            self.assertEqual(lead.campaign.name, "Launch")
+
+    def test_unknown_fields_are_rejected(self):
+        response = self.client.get(reverse("lead-list-create"), {"fields": "email,password,org"})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"fields": "Unknown fields: org, password"})
+
+
+class EmailRollupTests(TestCase):
+    def setUp(self):
+        self.org = Organization.objects.create(name="Acme")
+        self.campaign = Campaign.objects.create(org=self.org, name="Launch")
+        self.lead, self.loose_lead = Lead.objects.bulk_create([
+            Lead(org=self.org, campaign=self.campaign, email="jane@example.com"),
+            Lead(org=self.org, email="bob@example.com"),
+        ])
+
+    def create_emails(self, *emails):
+        """Emails as ``(lead, status, sent_at, updated_at, **fields)``; updated_at is set after the insert."""
+        created = LeadEmail.objects.bulk_create(
+            LeadEmail(lead=lead, subject="Hi", body="Hello", status=status, sent_at=sent_at, **fields)
+            for lead, status, sent_at, _, fields in emails
+        )
+        for email, (*_, updated_at, _) in zip(created, emails):
+            LeadEmail.objects.filter(id=email.id).update(updated_at=updated_at)
+        return created
+
+    def test_emails_count_on_their_activity_day(self):
+        day = datetime.datetime(2026, 3, 2, 23, 30, tzinfo=datetime.timezone.utc)
+        next_day = day + timedelta(hours=1)
+        self.create_emails(
+            (self.lead, "sent", day, next_day, {"opened_at": next_day, "replied_at": next_day}),
+            (self.lead, "sent", day, day, {}),
+            # failed emails count on the day they were last updated
+            (self.lead, "failed", None, next_day, {}),
+            (self.loose_lead, "sent", next_day, next_day, {"opened_at": next_day}),
+            (self.loose_lead, "draft", None, day, {}),
+        )
+
+        rows = {
+            (row.campaign_id, row.day): [getattr(row, field) for field in EmailDailyRollup.COUNT_FIELDS]
+            for row in compute_rollups(LeadEmail.objects.all())
+        }
+
+        self.assertEqual(rows, {
+            (self.campaign.id, day.date()): [2, 1, 1, 0],
+            (self.campaign.id, next_day.date()): [0, 0, 0, 1],
+            (None, next_day.date()): [1, 1, 0, 0],
+        })
+
+    def test_series_are_bucketed_and_zero_filled(self):
+        EmailDailyRollup.objects.bulk_create([
+            EmailDailyRollup(org=self.org, campaign=self.campaign, day=datetime.date(2026, 1, 30), sent=1),
+            EmailDailyRollup(org=self.org, campaign=None, day=datetime.date(2026, 1, 30), sent=2, opened=1),
+            EmailDailyRollup(org=self.org, campaign=self.campaign, day=datetime.date(2026, 2, 2), sent=4, replied=1),
+            EmailDailyRollup(org=Organization.objects.create(name="Other"), day=datetime.date(2026, 1, 30), sent=8),
+        ])
+        first_day, last_day = datetime.date(2026, 1, 29), datetime.date(2026, 2, 2)
+
+        def sent(interval, campaign_id=None):
+            result = rollup_series(self.org, first_day, last_day, interval, campaign_id)
+            return [(entry["date"], entry["sent"]) for entry in result["series"]], result["totals"]
+
+        self.assertEqual(sent("day"), (
+            [("2026-01-29", 0), ("2026-01-30", 3), ("2026-01-31", 0), ("2026-02-01", 0), ("2026-02-02", 4)],
+            {"sent": 7, "opened": 1, "replied": 1, "failed": 0},
+        ))
+        # weeks start on Monday, so the first bucket starts before first_day
+        self.assertEqual(sent("week")[0], [("2026-01-26", 3), ("2026-02-02", 4)])
+        self.assertEqual(sent("month")[0], [("2026-01-01", 3), ("2026-02-01", 4)])
+        self.assertEqual(sent("month", self.campaign.id)[0], [("2026-01-01", 1), ("2026-02-01", 4)])
+
+    def test_update_picks_up_tracking_writes_that_keep_updated_at(self):
+        sent_at = timezone.now() - timedelta(days=2)
+        email, _ = self.create_emails(
+            (self.lead, "sent", sent_at, sent_at, {}),
+            (self.lead, "sent", sent_at, sent_at, {}),
+        )
+        update_rollups()
+        self.assertEqual(EmailDailyRollup.objects.get().opened, 0)
+
+        # a queryset update leaves updated_at as it was
+        LeadEmail.objects.filter(id=email.id).update(opened_at=timezone.now())
+        update_rollups()
+
+        self.assertEqual(EmailDailyRollup.objects.get().opened, 1)
+
+    def test_watermark_moves_on_runs_without_changes(self):
+        sent_at = timezone.now() - timedelta(days=2)
+        self.create_emails((self.lead, "sent", sent_at, sent_at, {}))
+        update_rollups()
+        first = EmailRollupWatermark.objects.get().scanned_through
+
+        self.assertEqual(update_rollups(), 0)
+
+        self.assertGreater(EmailRollupWatermark.objects.get().scanned_through, first)
+
+class HotQueryPlanTests(TestCase):
+    """The hot queries of an org holding a small share of the rows are planned on their indexes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        large = Organization.objects.create(name="Large")
+        cls.small = Organization.objects.create(name="Small")
+        others = Organization.objects.bulk_create(Organization(name=f"Org {index}") for index in range(500))
+        now = timezone.now()
+        Integration.objects.bulk_create(
+            Integration(
+                org=org, provider=provider, access_token="token", refresh_token="refresh",
+                expires_at=now + timedelta(hours=1),
+            )
+            for org in [large, cls.small, *others]
+            for provider in ("gmail", "hubspot")
+        )
+        # one tenant holding most rows next to a small one, whose pages are only
+        # cheap through the org- and lead-scoped indexes
+        for org, count in ((large, 10000), (cls.small, 20)):
+            campaigns = Campaign.objects.bulk_create(
+                Campaign(org=org, name=f"{org.name} campaign {index}") for index in range(count // 10)
+            )
+            SequenceStep.objects.bulk_create(
+                SequenceStep(campaign=campaign, order=order, action="send_email")
+                for campaign in campaigns
+                for order in range(3)
+            )
+            leads = Lead.objects.bulk_create(
+                Lead(
+                    org=org, campaign=campaigns[index % len(campaigns)], email=f"lead{index}@example.com",
+                    status=("new", "contacted", "replied")[index % 3],
+                )
+                for index in range(count)
+            )
+            LeadEmail.objects.bulk_create(
+                LeadEmail(
+                    lead=lead, subject="Hi", body="Hello", status=status,
+                    sent_at=now - timedelta(minutes=index) if status == "sent" else None,
+                )
+                for index, lead in enumerate(leads)
+                for status in ("sent", "draft")
+            )
+            ActivityTimeline.objects.bulk_create(ActivityTimeline(lead=lead) for lead in leads for _ in range(2))
+
+        # statistics of the rows above, as autovacuum would gather them
+        with connection.cursor() as cursor:
+            for model in (Lead, LeadEmail, ActivityTimeline, Campaign, SequenceStep, Integration):
+                cursor.execute(f"ANALYZE {model._meta.db_table}")
+
+    def test_hot_queries_use_their_indexes(self):
+        for label, queryset, indexes in hot_queries(self.small.id):
+            with self.subTest(label):
+                plan = queryset.explain()
+                self.assertTrue(set(indexes) & set(INDEX_SCAN_PATTERN.findall(plan)), plan)
+
+
+class LeadImportTests(TestCase):
+    def setUp(self):
+        self.org = Organization.objects.create(name="Acme")
+
+    def test_reimport_keeps_stored_values_of_blank_and_invalid_cells(self):
+        lead = Lead.objects.create(
+            org=self.org, email="jane@example.com", first_name="Jane", company="Acme",
+            phone="+15551234567", website="https://acme.com",
+        )
+        path = write_upload(
+            self,
+            "email,first_name,company,phone,website\n"
+            "jane@example.com,,Acme Inc,555-123-4567,not a url\n"
+            "new@example.com,New,,,\n",
+        )
+
+        result = import_leads_from_file(path, self.org, commit=True)
+
+        self.assertEqual(result["stats"], {"created": 1, "updated": 1})
+        self.assertEqual({error["field"] for error in result["errors"]}, {"phone", "website"})
+        lead.refresh_from_db()
+        self.assertEqual(
+            (lead.first_name, lead.company, lead.phone, lead.website),
+            ("Jane", "Acme Inc", "+15551234567", "https://acme.com"),
+        )
+        self.assertEqual(Lead.objects.get(org=self.org, email="new@example.com").first_name, "New")
+
+    @override_settings(LEAD_IMPORT_DEFAULT_COUNTRY_CODE="1")
+    def test_reimport_overwrites_with_valid_values(self):
+        lead = Lead.objects.create(org=self.org, email="jane@example.com", phone="+15551234567")
+        path = write_upload(self, "email,phone,website\njane@example.com,1-555-765-4321,Example.com/\n")
+
+        import_leads_from_file(path, self.org, commit=True)
+
+        lead.refresh_from_db()
+        self.assertEqual((lead.phone, lead.website), ("+15557654321", "https://example.com"))
+
+
+
+
+
+class CrawlFanOutTests(TestCase):
+    @mock.patch("campaigns.tasks.crawl_company_website.s")
+    @mock.patch("campaigns.tasks.group")
+    def test_crawlable_leads_are_crawled_as_a_group(self, group, signature):
+        org, unconfigured_org = Organization.objects.create(name="Acme"), Organization.objects.create(name="Other")
+        OrganizationConfigurations.objects.create(organization=org, firecrawl_api_key="key")
+        crawlable, no_website, unconfigured = Lead.objects.bulk_create([
+            Lead(org=org, email="a@example.com", website="https://a.com"),
+            Lead(org=org, email="b@example.com"),
+            Lead(org=unconfigured_org, email="c@example.com", website="https://c.com"),
+        ])
+
+        with self.assertNumQueries(2):
+            result = crawl_company_websites([str(lead.id) for lead in (crawlable, no_website, unconfigured)])
+
+        self.assertEqual(result, {"status": "queued", "crawls": 1, "skipped": 2})
+        signature.assert_called_once_with(str(crawlable.id))
+        group.assert_called_once_with([signature.return_value])
+        group.return_value.apply_async.assert_called_once_with()
+
+class ReadFileChunksTests(SimpleTestCase):
+    def assertChunks(self, chunks, expected):
+        self.assertEqual(
+            [(list(chunk.index), chunk.to_dict(orient="records")) for chunk in chunks],
+            expected,
+        )
+
+    def test_csv_is_read_in_chunks_of_strings(self):
+        path = write_upload(self, "email,phone\na@example.com,0123\nb@example.com,\nc@example.com,NA\n")
+
+        self.assertChunks(read_file_chunks(path, 2), [
+            ([0, 1], [{"email": "a@example.com", "phone": "0123"}, {"email": "b@example.com", "phone": ""}]),
+            ([2], [{"email": "c@example.com", "phone": "NA"}]),
+        ])
+
+    def test_xlsx_is_streamed_in_chunks_of_strings(self):
+        handle, path = tempfile.mkstemp(suffix=".XLSX")
+        os.close(handle)
+        self.addCleanup(delete_upload, path)
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(["email", "phone"])
+        sheet.append(["a@example.com", 15551234567.0])
+        sheet.append(["b@example.com"])
+        sheet.append(["c@example.com", 1.5])
+        workbook.save(path)
+
+        self.assertChunks(read_file_chunks(path, 2), [
+            ([0, 1], [{"email": "a@example.com", "phone": "15551234567"}, {"email": "b@example.com", "phone": ""}]),
+            ([2], [{"email": "c@example.com", "phone": "1.5"}]),
+        ])
+
+    def test_empty_xlsx_has_no_chunks(self):
+        handle, path = tempfile.mkstemp(suffix=".xlsx")
+        os.close(handle)
+        self.addCleanup(delete_upload, path)
+        Workbook().save(path)
+
+        self.assertEqual(list(read_file_chunks(path)), [])
+
+    def test_unsupported_file_type(self):
+        with self.assertRaisesMessage(ValueError, "Unsupported file type"):
+            read_file_chunks("leads.txt")
+
+@mock.patch("campaigns.tasks.IMPORT_CHUNK_SIZE", 2)
+class ImportJobTests(TestCase):
+    def setUp(self):
+        self.org = Organization.objects.create(name="Acme")
+
+    def create_job(self, text, **fields):
+        path = write_upload(self, text)
+        return ImportJob.objects.create(org=self.org, file_name="leads.csv", file_path=path, **fields)
+
+    def test_resumed_job_skips_committed_chunks(self):
+        # chunks of two rows: a@, b@ | c@, not an email | a@ again, d@
+        job = self.create_job(
+            "email\na@example.com\nb@example.com\nc@example.com\nnope\nA@example.com\nd@example.com\n",
+            status="running", committed_chunks=1, processed_rows=2, created_leads=2,
+        )
+
+        result = run_import_job(job.id)
+
+        self.assertEqual(result["status"], "completed")
+        job.refresh_from_db()
+        self.assertEqual(
+            (job.status, job.committed_chunks, job.processed_rows, job.created_leads, job.updated_leads, job.failed_rows),
+            ("completed", 3, 6, 4, 0, 1),
+        )
+        # the first chunk was not written again, and its a@ still counts as seen
+        self.assertEqual(
+            set(Lead.objects.filter(org=self.org).values_list("email", flat=True)),
+            {"c@example.com", "d@example.com"},
+        )
+        self.assertFalse(os.path.exists(job.file_path))
+
+    def test_finished_job_is_not_run_again(self):
+        job = self.create_job("email\na@example.com\n", status="completed")
+
+        self.assertEqual(run_import_job(job.id)["status"], "completed")
+        self.assertFalse(Lead.objects.exists())
+
+    @mock.patch("campaigns.tasks.MAX_REPORTED_ERRORS", 3)
+    def test_error_report_is_capped(self):
+        job = self.create_job("email\n" + "".join(f"bad{index}\n" for index in range(5)) + "ok@example.com\n")
+
+        run_import_job(job.id)
+
+        job.refresh_from_db()
+        self.assertEqual([error["value"] for error in job.error_report], ["bad0", "bad1", "bad2"])
+        self.assertEqual((job.processed_rows, job.failed_rows, job.created_leads), (6, 5, 1))
+
+    def test_failing_chunk_marks_the_job_failed(self):
+        job = self.create_job("email\na@example.com\nb@example.com\nc@example.com\n")
+
+        with mock.patch("campaigns.tasks.add_leads_to_db", side_effect=[{"created": 2, "updated": 0}, RuntimeError("boom")]):
+            result = run_import_job(job.id)
+
+        self.assertEqual(result, {"status": "failed", "job_id": str(job.id), "error": "boom"})
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error, job.committed_chunks), ("failed", "boom", 1))
+        self.assertIsNotNone(job.finished_at)
+        self.assertFalse(os.path.exists(job.file_path))
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class LeadEmailNormalizationMigrationTests(MigrationTestCase):
+    migrate_from = [("campaigns", "0022_org_scoped_lookup_indexes")]
+    migrate_to = [("campaigns", "0024_lead_email_normalized")]
+
+    def test_case_variants_are_merged_and_lowercased(self):
+        Organization = self.old_apps.get_model("users", "Organization")
+        Lead = self.old_apps.get_model("campaigns", "Lead")
+        LeadEmail = self.old_apps.get_model("campaigns", "LeadEmail")
+        org, other_org = Organization.objects.create(name="Acme"), Organization.objects.create(name="Other")
+        now = timezone.now()
+        stale = Lead.objects.create(org=org, email="John@X.com", first_name="Old")
+        kept = Lead.objects.create(org=org, email=" john@x.COM", first_name="New")
+        Lead.objects.filter(id=stale.id).update(updated_at=now - timedelta(days=1))
+        Lead.objects.filter(id=kept.id).update(updated_at=now)
+        LeadEmail.objects.create(lead=stale, subject="Hi", body="Hello")
+        other = Lead.objects.create(org=other_org, email="John@X.com")
+
+        apps = self.migrate()
+
+        Lead = apps.get_model("campaigns", "Lead")
+        merged = Lead.objects.get(org_id=org.id)
+        self.assertEqual((merged.id, merged.email, merged.first_name), (kept.id, "john@x.com", "New"))
+        self.assertEqual(apps.get_model("campaigns", "LeadEmail").objects.get().lead_id, kept.id)
+        self.assertEqual(Lead.objects.get(id=other.id).email, "john@x.com")
+
+    def test_reimporting_a_legacy_mixed_case_lead_updates_it(self):
+        Lead = self.old_apps.get_model("campaigns", "Lead")
+        org = Organization.objects.create(name="Acme")
+        legacy = Lead.objects.create(org_id=org.id, email="John@X.com")
+        self.migrate()
+
+        path = write_upload(self, "email,company\nJohn@X.com,Acme\n")
+        result = import_leads_from_file(path, org, commit=True)
+
+        self.assertEqual(result["stats"], {"created": 0, "updated": 1})
+        self.assertEqual(list(Lead.objects.filter(org_id=org.id).values_list("id", "company")), [(legacy.id, "Acme")])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CounterTriggerTests(TransactionTestCase):
+    """Every kind of write keeps the trigger-maintained counters equal to a recount."""
+
+    def setUp(self):
+        self.org = Organization.objects.create(name="Acme")
+        self.campaign = Campaign.objects.create(org=self.org, name="Launch")
+        self.other_campaign = Campaign.objects.create(org=self.org, name="Follow-up")
+        self.leads = Lead.objects.bulk_create(
+            Lead(org=self.org, campaign=self.campaign, email=f"lead{index}@example.com") for index in range(3)
+        )
+        self.emails = LeadEmail.objects.bulk_create(
+            LeadEmail(lead=lead, subject="Hi", body="Hello") for lead in self.leads
+        )
+
+    def tearDown(self):
+        self.assertEqual(verify_counters(), [])
+
+    def test_lead_inserts(self):
+        Lead.objects.bulk_create([
+            Lead(org=self.org, email="loose@example.com"),
+            Lead(org=self.org, campaign=self.other_campaign, email="other@example.com", status="contacted"),
+        ])
+
+    @mock.patch("campaigns.signals.handle_new_leads")
+    def test_import_upserts(self, handle_new_leads):
+        path = write_upload(self, "email,company\nlead0@example.com,Acme\nnew@example.com,New\n")
+
+        result = import_leads_from_file(path, self.org, campaign_id=str(self.other_campaign.id), commit=True)
+
+        self.assertEqual(result["stats"], {"created": 1, "updated": 1})
+
+    def test_lead_status_updates(self):
+        lead = self.leads[0]
+        lead.status = "replied"
+        lead.save()
+        Lead.objects.filter(id__in=[self.leads[1].id, self.leads[2].id]).update(status="contacted")
+
+    def test_lead_campaign_moves(self):
+        Lead.objects.filter(id=self.leads[0].id).update(campaign=self.other_campaign)
+        Lead.objects.filter(id=self.leads[1].id).update(campaign=None)
+
+    def test_lead_deletes(self):
+        Lead.objects.filter(id__in=[self.leads[0].id, self.leads[1].id]).delete()
+
+    def test_email_writes(self):
+        now = timezone.now()
+        LeadEmail.objects.bulk_create([LeadEmail(lead=self.leads[0], subject="Again", body="Hello", status="queued")])
+        LeadEmail.objects.filter(id=self.emails[0].id).update(status="sent", sent_at=now, opened_at=now)
+        LeadEmail.objects.filter(id=self.emails[1].id).update(status="sent", sent_at=now, replied_at=now)
+        LeadEmail.objects.filter(id=self.emails[2].id).update(status="failed")
+        LeadEmail.objects.filter(id=self.emails[1].id).delete()
+
+    def test_sequence_step_writes(self):
+        steps = SequenceStep.objects.bulk_create(
+            SequenceStep(campaign=self.campaign, order=order, action="send_email") for order in range(2)
+        )
+        SequenceStep.objects.filter(id=steps[0].id).update(campaign=self.other_campaign)
+        SequenceStep.objects.filter(id=steps[1].id).delete()
+
+    def test_campaign_writes(self):
+        Campaign.objects.create(org=self.org, name="Empty")
+        SequenceStep.objects.create(campaign=self.campaign, order=0, action="wait", wait_days=2)
+        # the leads' campaign is set to null, the steps are deleted with it
+        self.campaign.delete()
+
+    def test_org_deletes(self):
+        other_org = Organization.objects.create(name="Other")
+        Lead.objects.bulk_create([Lead(org=other_org, email="kept@example.com")])
+        self.org.delete()
+
+
+class TrackingTimeTests(SimpleTestCase):
+    tracking_time = staticmethod(
+        importlib.import_module("campaigns.migrations.0018_leademail_tracking_data").tracking_time
+    )
+
+    def test_meta_values(self):
+        sent_at = datetime.datetime(2026, 3, 1, 9, tzinfo=datetime.timezone.utc)
+        for value, expected in (
+            ("2026-03-02T10:00:00Z", datetime.datetime(2026, 3, 2, 10, tzinfo=datetime.timezone.utc)),
+            ("2026-03-02T12:00:00+02:00", datetime.datetime(2026, 3, 2, 10, tzinfo=datetime.timezone.utc)),
+            # naive timestamps were written in UTC
+            ("2026-03-02 10:00:00", datetime.datetime(2026, 3, 2, 10, tzinfo=datetime.timezone.utc)),
+            # set, but not a timestamp: the counters saw it as set, so it falls back to the send time
+            (True, sent_at),
+            ("yes", sent_at),
+            (1, sent_at),
+            # what campaigns_meta_flag counted as unset
+            (None, None),
+            ("", None),
+            (False, None),
+            (0, None),
+            ([], None),
+            ({}, None),
+        ):
+            with self.subTest(value):
+                email = SimpleNamespace(meta={"opened_at": value}, sent_at=sent_at, updated_at=None)
+                self.assertEqual(self.tracking_time(email, "opened_at"), expected)
+
+    def test_missing_key(self):
+        email = SimpleNamespace(meta={"replied_at": "2026-03-02T10:00:00Z"}, sent_at=None, updated_at=None)
+
+        self.assertIsNone(self.tracking_time(email, "opened_at"))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class TrackingColumnsMigrationTests(MigrationTestCase):
+    migrate_from = [("campaigns", "0017_leademail_tracking_columns")]
+    migrate_to = [("campaigns", "0018_leademail_tracking_data")]
+
+    def test_meta_is_moved_to_the_columns(self):
+        Lead = self.old_apps.get_model("campaigns", "Lead")
+        LeadEmail = self.old_apps.get_model("campaigns", "LeadEmail")
+        CampaignCounter = self.old_apps.get_model("campaigns", "CampaignCounter")
+        org = Organization.objects.create(name="Acme")
+        lead = Lead.objects.create(org_id=org.id, email="jane@example.com")
+        sent_at = datetime.datetime(2026, 3, 1, 9, tzinfo=datetime.timezone.utc)
+        iso, flagged, untracked = (
+            LeadEmail.objects.create(lead=lead, subject="Hi", body="Hello", status="sent", sent_at=sent_at, meta=meta)
+            for meta in (
+                {
+                    "opened_at": "2026-03-02T10:00:00Z", "replied_at": "2026-03-02T12:30:00+02:00",
+                    "gmail_message_id": "m1", "gmail_thread_id": "t1", "campaign_step": 2,
+                },
+                {"opened_at": True, "replied_at": False},
+                {"campaign_step": 1},
+            )
+        )
+        counts = list(CampaignCounter.objects.filter(org_id=org.id).values("emails_opened", "emails_replied"))
+
+        apps = self.migrate()
+
+        LeadEmail = apps.get_model("campaigns", "LeadEmail")
+        self.assertEqual(
+            {
+                email.id: (email.opened_at, email.replied_at, email.gmail_message_id, email.gmail_thread_id, email.meta)
+                for email in LeadEmail.objects.all()
+            },
+            {
+                iso.id: (
+                    datetime.datetime(2026, 3, 2, 10, tzinfo=datetime.timezone.utc),
+                    datetime.datetime(2026, 3, 2, 10, 30, tzinfo=datetime.timezone.utc),
+                    "m1", "t1", {"campaign_step": 2},
+                ),
+                flagged.id: (sent_at, None, "", "", {}),
+                untracked.id: (None, None, "", "", {"campaign_step": 1}),
+            },
+        )
+        CampaignCounter = apps.get_model("campaigns", "CampaignCounter")
+        self.assertEqual(counts, [{"emails_opened": 2, "emails_replied": 1}])
+        self.assertEqual(
+            list(CampaignCounter.objects.filter(org_id=org.id).values("emails_opened", "emails_replied")), counts
+        )
@@ -5,14 +5,22 @@ from campaigns import views
 urlpatterns = [
     path("summary/", views.DashboardSummaryView.as_view(), name="campaign-summary"),
     path("leads/", views.LeadListCreateView.as_view(), name="lead-list-create"),
+    path("typeahead/", views.TypeaheadView.as_view(), name="typeahead"),
+    path("leads/bulk/", views.LeadBulkView.as_view(), name="lead-bulk"),
+    path("leads/export/", views.LeadExportView.as_view(), name="lead-export"),
+    path("leads/search/", views.LeadSearchView.as_view(), name="lead-search"),
     path("leads/<uuid:pk>/", views.LeadDetailView.as_view(), name="lead-detail"),
     path("campaigns/", views.CampaignListCreateView.as_view(), name="campaign-list-create"),
     path("campaigns/<uuid:pk>/", views.CampaignDetailView.as_view(), name="campaign-detail"),
+    path("campaigns/<uuid:pk>/send/", views.CampaignSendView.as_view(), name="campaign-send"),
     path("sequences/", views.SequenceStepListCreateView.as_view(), name="sequence-list-create"),
     path("sequences/<uuid:pk>/", views.SequenceStepDetailView.as_view(), name="sequence-detail"),
     path("upload_file/", views.UploadFile.as_view(), name="lead-upload"),
+    path("imports/<uuid:pk>/", views.ImportJobDetailView.as_view(), name="import-job-detail"),
     path("emails/", views.EmailLogListView.as_view(), name="email-log"),
+    path("emails/export/", views.EmailExportView.as_view(), name="email-export"),
     path("emails/stats/", views.EmailStatsView.as_view(), name="email-stats"),
+    path("emails/analytics/", views.EmailAnalyticsView.as_view(), name="email-analytics"),
     path("emails/preview/", views.EmailPreviewView.as_view(), name="email-preview"),
     path("emails/generate/", views.EmailGenerateView.as_view(), name="email-generate"),
     path("emails/send/", views.EmailSendView.as_view(), name="email-send"),
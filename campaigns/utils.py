@@ -1,40 +1,349 @@
 import os
-from typing import Dict, Optional
+import uuid
+from functools import partial
+from typing import Dict, Iterator, Optional
 
+import numpy as np
 import pandas as pd
 from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from openpyxl import load_workbook
 
+from campaigns.cache import EMAILS, LEADS, bump_org_tags_on_commit
 from campaigns.models import Lead, Campaign
 
+SUPPORTED_UPLOAD_EXTENSIONS = (".csv", ".xls", ".xlsx")
+IMPORT_CHUNK_SIZE = 5000
+LEAD_UPSERT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+EMAIL_PATTERN = (
+    r"^[a-z0-9!#$%&'*+/=?^_`{|}~-]+(?:\.[a-z0-9!#$%&'*+/=?^_`{|}~-]+)*"
+    r"@(?:[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?\.)+[a-z]{2,63}$"
+)
+LEAD_UPSERT_FIELDS = ["campaign", "first_name", "last_name", "company", "phone", "linkedin_url", "website", "updated_at"]
+# upserted only from non-empty cells, so a blank or rejected value never overwrites a stored one
+LEAD_OPTIONAL_FIELDS = ["first_name", "last_name", "company", "phone", "linkedin_url", "website"]
+LEAD_BULK_CHUNK_SIZE = 1000
+# filter keys accepted by the bulk lead endpoint and the lookups they map to
+LEAD_BULK_FILTER_LOOKUPS = {
+    "status": "status",
+    "campaign": "campaign_id",
+    "company": "company__iexact",
+    "created_after": "created_at__gte",
+    "created_before": "created_at__lt",
+}
 
-def upload_file(file_obj):
-    upload_path = os.path.join(settings.BASE_DIR, "static", "uploads", file_obj.name)
+
+def upload_file(file_obj, name: Optional[str] = None) -> str:
+    """
+    Stores the uploaded file under static/uploads as ``<name><ext>`` and returns
+    its path. ``name`` defaults to a random UUID, so uploads sharing a client
+    file name never overwrite each other; remove the file with delete_upload.
+    """
+    ext = os.path.splitext(file_obj.name)[1].lower()
+    if ext not in SUPPORTED_UPLOAD_EXTENSIONS:
+        raise ValueError("Unsupported file type")
+
+    upload_dir = os.path.join(settings.BASE_DIR, "static", "uploads")
+    os.makedirs(upload_dir, exist_ok=True)
+    upload_path = os.path.join(upload_dir, f"{name or uuid.uuid4()}{ext}")
     with open(upload_path, "wb+") as destination:
         for chunk in file_obj.chunks():
             destination.write(chunk)
+    return upload_path
 
-    ext = os.path.splitext(file_obj.name)[1].lower()
+
+def delete_upload(path: str) -> None:
+    """Removes a file stored by upload_file; a file already gone is fine."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def read_file_chunks(path: str, chunksize: int = IMPORT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    Yields the rows of a CSV/Excel file as DataFrames of at most ``chunksize``
+    rows, so only one chunk is held in memory at a time. All cells are read as
+    strings; the frame index keeps the row position within the file.
+    """
+    ext = os.path.splitext(path)[1].lower()
     if ext == ".csv":
-        df = pd.read_csv(upload_path)
-    elif ext in [".xls", ".xlsx"]:
-        df = pd.read_excel(upload_path)
+        return pd.read_csv(path, chunksize=chunksize, dtype=str, keep_default_na=False)
+    if ext == ".xlsx":
+        return _read_xlsx_chunks(path, chunksize)
+    if ext == ".xls":
+        # legacy binary workbooks have no streaming reader, slice the loaded sheet instead
+        df = pd.read_excel(path, dtype=str).fillna("")
+        return (df.iloc[start:start + chunksize] for start in range(0, len(df.index), chunksize))
+    raise ValueError("Unsupported file type")
+
+
+def _cell_to_str(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _read_xlsx_chunks(path: str, chunksize: int) -> Iterator[pd.DataFrame]:
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [_cell_to_str(cell) for cell in header]
+        width = len(columns)
+
+        batch, offset = [], 0
+        for row in rows:
+            cells = [_cell_to_str(cell) for cell in row[:width]]
+            batch.append(cells + [""] * (width - len(cells)))
+            if len(batch) == chunksize:
+                yield pd.DataFrame(batch, columns=columns, index=pd.RangeIndex(offset, offset + len(batch)))
+                offset += len(batch)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=columns, index=pd.RangeIndex(offset, offset + len(batch)))
+    finally:
+        workbook.close()
+
+
+def _error_rows(values: pd.Series, mask: pd.Series, field: str, message: str) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "row": values.index[mask] + 1,
+            "field": field,
+            "value": values[mask].to_numpy(),
+            "error": message,
+        }
+    )
+
+
+def normalize_emails(values: pd.Series):
+    """
+    Lowercases/strips emails and checks their syntax. Returns the normalized
+    values and a boolean mask of the valid ones.
+    """
+    emails = values.fillna("").astype(str).str.strip().str.lower()
+    return emails, emails.str.match(EMAIL_PATTERN)
+
+
+def normalize_phones(values: pd.Series):
+    """
+    Normalizes phone numbers to E.164. Numbers without an international prefix
+    get ``LEAD_IMPORT_DEFAULT_COUNTRY_CODE``, after dropping a trunk 0 or that
+    country code when the number already starts with it. Without a configured
+    country code such numbers cannot be made E.164 and are invalid. Returns the
+    normalized values and a mask of the valid ones (empty values count as valid).
+    """
+    raw = values.fillna("").astype(str).str.strip()
+    digits = raw.str.replace(r"[^\d+]", "", regex=True).str.replace(r"^00", "+", regex=True)
+    international = digits.str.startswith("+")
+    number = digits.str.replace("+", "", regex=False)
+    misplaced_plus = digits.str[1:].str.contains("+", regex=False)
+
+    country_code = getattr(settings, "LEAD_IMPORT_DEFAULT_COUNTRY_CODE", "")
+    if country_code:
+        # "1-555-123-4567" with country code 1 is the national number 5551234567
+        has_country_code = number.str.startswith(country_code) & (number.str.len() - len(country_code) >= 7)
+        national = number.where(~has_country_code, number.str[len(country_code):]).str.lstrip("0")
+        local = np.where(national != "", "+" + country_code + national, "")
     else:
-        raise ValueError("Unsupported file type")
+        local = ""
+
+    phones = pd.Series(np.where(international, "+" + number, local), index=values.index, dtype=object)
+    valid = (raw == "") | (
+        phones.str.startswith("+") & (phones.str.len() - 1).between(8, 15) & ~misplaced_plus
+    )
+    return phones.where(valid, ""), valid
+
+
+def normalize_urls(values: pd.Series):
+    """
+    Canonicalizes URLs: adds a missing https:// scheme, lowercases the scheme
+    and host and drops the fragment and trailing slash. Returns the normalized
+    values and a mask of the valid ones (empty values count as valid).
+    """
+    raw = values.fillna("").astype(str).str.strip()
+    with_scheme = raw.where(raw.str.contains(r"^[a-zA-Z][a-zA-Z0-9+.-]*://", regex=True), "https://" + raw)
+    parts = with_scheme.str.extract(r"^(?P<scheme>[a-zA-Z][a-zA-Z0-9+.-]*)://(?P<host>[^/?#\s]+)(?P<rest>[^#\s]*)(?:#\S*)?$")
+    scheme = parts["scheme"].str.lower()
+    host = parts["host"].str.lower()
+
+    valid = (raw == "") | (scheme.isin(["http", "https"]) & host.str.contains(r"^[^.]+\..+$", regex=True, na=False))
+    urls = scheme + "://" + host + parts["rest"].fillna("").str.rstrip("/")
+    return urls.where(valid & (raw != ""), ""), valid
 
-    return df
+
+def validate_lead_frame(df: pd.DataFrame):
+    """
+    Normalizes the email, phone and URL columns of an import frame with column-wise
+    pandas operations. Rows with a missing or invalid email are dropped; invalid
+    phones and URLs are blanked but the row is kept. Returns the cleaned frame and
+    a frame of per-row errors (row, field, value, error), ``row`` being the
+    1-based data row in the file.
+    """
+    errors = []
+    updates = {}
+
+    keep = None
+    if "email" in df.columns:
+        emails, valid = normalize_emails(df["email"])
+        missing = emails == ""
+        errors.append(_error_rows(df["email"], missing, "email", "Missing email"))
+        errors.append(_error_rows(df["email"], ~missing & ~valid, "email", "Invalid email"))
+        updates["email"] = emails
+        keep = valid
+
+    if "phone" in df.columns:
+        phones, valid = normalize_phones(df["phone"])
+        errors.append(_error_rows(df["phone"], ~valid, "phone", "Invalid phone number"))
+        updates["phone"] = phones
+
+    for column in ("website", "linkedin_url", "linkedin"):
+        if column in df.columns:
+            urls, valid = normalize_urls(df[column])
+            errors.append(_error_rows(df[column], ~valid, column, "Invalid URL"))
+            updates[column] = urls
+
+    df = df.assign(**updates)
+    if keep is not None:
+        df = df[keep]
+
+    errors = [frame for frame in errors if not frame.empty]
+    if errors:
+        report = pd.concat(errors, ignore_index=True).sort_values("row", kind="stable")
+    else:
+        report = pd.DataFrame(columns=["row", "field", "value", "error"])
+    return df, report
 
 
 def file_preprocessing(df):
+    """
+    Normalizes column names, validates the lead fields and drops duplicate emails.
+    Returns the cleaned frame and the per-row error report.
+    """
     df.columns = [c.strip().lower().replace(" ", "_") for c in df.columns]
 
+    df, errors = validate_lead_frame(df)
     if "email" in df.columns:
         df = df.drop_duplicates(subset=["email"])
-    return df
+    return df, errors
+
+
+def preview_file(path: str, preview_rows: int = 5):
+    """
+    Returns the first ``preview_rows`` normalized rows without reading the rest of the file.
+    """
+    chunk = next(iter(read_file_chunks(path, preview_rows)), None)
+    if chunk is None:
+        return []
+    df, _ = file_preprocessing(chunk)
+    return df.fillna("").to_dict(orient="records")
+
+
+class EmailSeenSet:
+    """
+    Tracks the emails already seen across the chunks of one import. Emails are
+    kept as 64-bit hashes rather than strings to keep the set compact.
+    """
+
+    def __init__(self):
+        self._seen = set()
+
+    def __len__(self):
+        return len(self._seen)
+
+    def drop_seen(self, df: pd.DataFrame) -> pd.DataFrame:
+        if "email" not in df.columns or df.empty:
+            return df
+        hashes = pd.util.hash_pandas_object(df["email"], index=False).tolist()
+        keep = [h not in self._seen for h in hashes]
+        self._seen.update(hashes)
+        return df[keep]
+
+
+def import_leads_from_file(
+    path: str,
+    org,
+    campaign_id: Optional[str] = None,
+    commit: bool = False,
+    preview_rows: int = 5,
+    chunksize: int = IMPORT_CHUNK_SIZE,
+) -> Dict:
+    """
+    Streams ``path`` chunk by chunk: normalizes and validates each chunk, drops
+    emails already seen in earlier chunks and, when ``commit`` is set, upserts it
+    before the next chunk is read. Only the first ``MAX_REPORTED_ERRORS`` row
+    errors are returned, ``error_count`` holds the total.
+    """
+    seen = EmailSeenSet()
+    preview = []
+    errors = []
+    error_count = 0
+    total_rows = 0
+    stats = {"created": 0, "updated": 0}
+
+    for chunk in read_file_chunks(path, chunksize):
+        chunk, chunk_errors = file_preprocessing(chunk)
+        chunk = seen.drop_seen(chunk)
+        error_count += len(chunk_errors.index)
+        if len(errors) < MAX_REPORTED_ERRORS:
+            errors.extend(chunk_errors.head(MAX_REPORTED_ERRORS - len(errors)).to_dict(orient="records"))
+        total_rows += len(chunk.index)
+        if len(preview) < preview_rows:
+            preview.extend(chunk.head(preview_rows - len(preview)).fillna("").to_dict(orient="records"))
+        if commit:
+            chunk_stats = add_leads_to_db(chunk, org, campaign_id)
+            stats["created"] += chunk_stats["created"]
+            stats["updated"] += chunk_stats["updated"]
+
+    return {
+        "total_rows": total_rows,
+        "preview": preview,
+        "errors": errors,
+        "error_count": error_count,
+        "stats": stats,
+    }
 
 
-def add_leads_to_db(df: pd.DataFrame, org, campaign_id: Optional[str] = None) -> Dict[str, int]:
-    df = df.copy()
-    df.columns = df.columns.str.lower().str.strip()
+def _lead_column(df: pd.DataFrame, columns: Dict[str, str], *aliases: str) -> pd.Series:
+    """
+    Returns a string Series holding the first non-empty value across the given
+    column aliases, e.g. ``first_name`` falling back to ``firstname``.
+    """
+    result = pd.Series("", index=df.index, dtype=object)
+    for alias in reversed(aliases):
+        source = columns.get(alias)
+        if source is None:
+            continue
+        values = df[source].fillna("").astype(str).str.strip()
+        result = values.where(values != "", result)
+    return result
+
+
+def add_leads_to_db(
+    df: pd.DataFrame,
+    org,
+    campaign_id: Optional[str] = None,
+    chunk_size: int = LEAD_UPSERT_CHUNK_SIZE,
+) -> Dict[str, int]:
+    """
+    Upserts the leads in ``df`` for ``org`` keyed on the unique (org, email) pair.
+
+    Rows are written in chunks of ``chunk_size`` with an
+    ``INSERT ... ON CONFLICT DO UPDATE`` per set of filled-in fields, instead
+    of one ``update_or_create`` round trip per row. Existing leads keep the
+    values of the fields a row leaves empty, including phones and URLs that
+    validation rejected.
+    """
+    from campaigns.signals import handle_new_leads
+
+    columns = {str(c).lower().strip(): c for c in df.columns}
 
     campaign = None
     if campaign_id:
@@ -42,36 +351,107 @@ def add_leads_to_db(df: pd.DataFrame, org, campaign_id: Optional[str] = None) ->
         if campaign is None:
             raise ValueError("Campaign not found for this organization")
 
-    created, updated = 0, 0
-    for _, row in df.iterrows():
-        email = row.get("email")
-        if not email:
-            continue  # skip rows without email
-
-        defaults = {
-            "campaign": campaign,
-            "org": org,
-            "first_name": row.get("first_name") or row.get("firstname", ""),
-            "last_name": row.get("last_name") or row.get("lastname", ""),
-            "company": row.get("company", ""),
-            "phone": row.get("phone", ""),
-            "linkedin_url": row.get("linkedin") or row.get("linkedin_url", ""),
-            "website": row.get("website", ""),
+    records = pd.DataFrame(
+        {
+            "email": _lead_column(df, columns, "email"),
+            "first_name": _lead_column(df, columns, "first_name", "firstname"),
+            "last_name": _lead_column(df, columns, "last_name", "lastname"),
+            "company": _lead_column(df, columns, "company"),
+            "phone": _lead_column(df, columns, "phone"),
+            "linkedin_url": _lead_column(df, columns, "linkedin", "linkedin_url"),
+            "website": _lead_column(df, columns, "website"),
         }
+    )
+    # skip rows without email; the last occurrence of an email wins
+    records = records[records["email"] != ""].drop_duplicates(subset=["email"], keep="last")
+
+    created, updated = 0, 0
+    for start in range(0, len(records.index), chunk_size):
+        chunk = records.iloc[start:start + chunk_size]
+        leads = [Lead(org=org, campaign=campaign, **row) for row in chunk.to_dict(orient="records")]
 
-        _, was_created = Lead.objects.update_or_create(
-            email=email,
-            org=org,
-            defaults=defaults,
-        )
-        if was_created:
-            created += 1
-        else:
-            updated += 1
+        with transaction.atomic():
+            existing = set(
+                Lead.objects.filter(org=org, email__in=chunk["email"].tolist()).values_list("email", flat=True)
+            )
+            by_fields = {}
+            for lead in leads:
+                filled = frozenset(field for field in LEAD_OPTIONAL_FIELDS if getattr(lead, field))
+                by_fields.setdefault(filled, []).append(lead)
+            for filled, group in by_fields.items():
+                Lead.objects.bulk_create(
+                    group,
+                    update_conflicts=True,
+                    unique_fields=["org", "email"],
+                    update_fields=[
+                        field for field in LEAD_UPSERT_FIELDS if field not in LEAD_OPTIONAL_FIELDS or field in filled
+                    ],
+                )
+            new_leads = [lead for lead in leads if lead.email not in existing]
+            # bulk_create sends no post_save, run the new-lead side effects once per chunk instead
+            transaction.on_commit(partial(handle_new_leads, new_leads))
+            bump_org_tags_on_commit(org.id, LEADS)
+
+        created += len(new_leads)
+        updated += len(leads) - len(new_leads)
 
     return {"created": created, "updated": updated}
 
 
+def _lead_id_chunks(queryset, chunk_size: int) -> Iterator[list]:
+    """Yields the ids matched by ``queryset`` in chunks, walking the primary key so every row is visited once."""
+    last_id = None
+    while True:
+        page = queryset.order_by("id")
+        if last_id is not None:
+            page = page.filter(id__gt=last_id)
+        ids = list(page.values_list("id", flat=True)[:chunk_size])
+        if not ids:
+            return
+        yield ids
+        last_id = ids[-1]
+
+
+def bulk_lead_action(
+    org,
+    action: str,
+    ids: Optional[list] = None,
+    filters: Optional[dict] = None,
+    changes: Optional[dict] = None,
+    chunk_size: int = LEAD_BULK_CHUNK_SIZE,
+) -> int:
+    """
+    Updates or deletes the leads of ``org`` selected by ``ids`` or ``filters``.
+
+    Each chunk is one org-scoped ``UPDATE``/``DELETE`` in its own transaction,
+    so locks are held briefly and a failure keeps the chunks already done.
+    Returns the number of affected leads.
+    """
+    if ids is not None:
+        chunks = (ids[start:start + chunk_size] for start in range(0, len(ids), chunk_size))
+    else:
+        lookups = {LEAD_BULK_FILTER_LOOKUPS[key]: value for key, value in filters.items()}
+        chunks = _lead_id_chunks(Lead.objects.filter(org=org, **lookups), chunk_size)
+
+    if action == "update":
+        changes = {"campaign_id" if key == "campaign" else key: value for key, value in changes.items()}
+        changes["updated_at"] = timezone.now()
+
+    # queryset updates and deletes send no cache-invalidating signals
+    tags = (LEADS,) if action == "update" else (LEADS, EMAILS)
+    affected = 0
+    for chunk in chunks:
+        leads = Lead.objects.filter(org=org, id__in=chunk)
+        with transaction.atomic():
+            if action == "update":
+                affected += leads.update(**changes)
+            else:
+                _, deleted = leads.delete()
+                affected += deleted.get(Lead._meta.label, 0)
+            bump_org_tags_on_commit(org.id, *tags)
+    return affected
+
+
 def personalize_template_copy(template: str, lead: Lead) -> str:
     """
     Replaces simple merge tags in the template string with lead attributes.
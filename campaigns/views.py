@@ -1,25 +1,59 @@
+import uuid
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+from django.db import transaction
+from django.db.models import F, Q
+from django.db.models.functions import Greatest, Upper
 from django.http import JsonResponse
-from django.utils import timezone
 from rest_framework import status
 from rest_framework.exceptions import ValidationError
 from rest_framework.parsers import FormParser, MultiPartParser
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from activities.models import ActivityTimeline
-from campaigns.models import Campaign, Lead, LeadEmail, SequenceStep
+from campaigns.conditional import conditional_list_response
+from campaigns.cache import (
+    CAMPAIGNS,
+    EMAILS,
+    INTEGRATIONS,
+    LEADS,
+    bump_org_tags_on_commit,
+    cached_org_data,
+)
+from campaigns.counters import org_counter_totals
+from campaigns.exports import (
+    EMAIL_EXPORT_COLUMNS,
+    EXPORT_FORMATS,
+    LEAD_EXPORT_COLUMNS,
+    annotate_lead_name,
+    streaming_export,
+)
+from campaigns.models import Campaign, CampaignCounter, ImportJob, Lead, LeadEmail, SequenceStep
+from campaigns.pagination import KeysetPagination
+from campaigns.query_budget import query_budget
+from campaigns.renderers import ORJSONRenderer
+from campaigns.rollups import rollup_series
 from campaigns.serializers import (
     ActivityTimelineSerializer,
     CampaignSerializer,
+    EmailAnalyticsQuerySerializer,
+    ImportJobSerializer,
+    LeadBulkActionSerializer,
     LeadEmailSerializer,
     LeadSerializer,
     SequenceStepSerializer,
 )
+from campaigns.sending import queue_campaign_emails
+from campaigns.tasks import run_import_job, start_outbox_workers
 from campaigns.utils import (
-    add_leads_to_db,
-    file_preprocessing,
+    bulk_lead_action,
+    delete_upload,
+    import_leads_from_file,
     personalize_template_copy,
+    preview_file,
     upload_file,
 )
 from integrations.models import Integration
@@ -42,41 +76,71 @@ class SalesorchBaseAPIView(APIView):
     def get_user(self, request):
         return request.user
 
+    def get_paginated_response(self, request, queryset, serializer_class, page_size=None):
+        paginator = KeysetPagination(page_size=page_size)
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        return paginator.get_paginated_response(serializer_class(page, many=True).data)
+
+    def get_sparse_paginated_response(self, request, queryset, serializer_class):
+        """
+        Paginated list honouring ``?fields=``. Only the rendered columns are
+        selected, as ``.values()`` rows that are turned into the serializer's
+        output directly instead of going through model and serializer instances.
+        """
+        fields = serializer_class.get_requested_fields(request)
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(serializer_class.values_queryset(queryset, fields), request, view=self)
+        return paginator.get_paginated_response(serializer_class.build_rows(page, fields))
+
 
 class DashboardSummaryView(SalesorchBaseAPIView):
+    cache_tags = (LEADS, EMAILS, CAMPAIGNS, INTEGRATIONS)
+
+    # org, counters, recent leads, recent emails, integrations; a cache hit runs only the first
+    @query_budget(5)
     def get(self, request):
         org = self.get_org(request)
+        return Response(cached_org_data(org, "dashboard", self.cache_tags, lambda: self.build_payload(org)))
+
+    def build_payload(self, org):
         leads_qs = Lead.objects.filter(org=org)
-        campaigns_qs = Campaign.objects.filter(org=org)
         emails_qs = LeadEmail.objects.filter(lead__org=org)
 
+        # one counter row per campaign plus one for leads outside any campaign
+        totals = dict.fromkeys(CampaignCounter.COUNT_FIELDS, 0)
+        campaign_performance = []
+        for counter in CampaignCounter.objects.filter(org=org).select_related("campaign"):
+            for field in CampaignCounter.COUNT_FIELDS:
+                totals[field] += getattr(counter, field)
+            if counter.campaign is not None:
+                campaign_performance.append(
+                    {
+                        "id": str(counter.campaign.id),
+                        "name": counter.campaign.name,
+                        "total_leads": counter.leads_total,
+                        "replied": counter.leads_replied,
+                    }
+                )
+
         status_breakdown = {
-            "new": leads_qs.filter(status="new").count(),
-            "contacted": leads_qs.filter(status="contacted").count(),
-            "replied": leads_qs.filter(status="replied").count(),
+            "new": totals["leads_new"],
+            "contacted": totals["leads_contacted"],
+            "replied": totals["leads_replied"],
         }
 
         metrics = {
-            "total_leads": leads_qs.count(),
-            "total_campaigns": campaigns_qs.count(),
-            "emails_sent": emails_qs.filter(status="sent").count(),
-            "active_sequences": SequenceStep.objects.filter(campaign__org=org).count(),
+            "total_leads": totals["leads_total"],
+            "total_campaigns": len(campaign_performance),
+            "emails_sent": totals["emails_sent"],
+            "active_sequences": totals["sequence_steps"],
         }
 
-        recent_leads = LeadSerializer(leads_qs.order_by("-created_at")[:5], many=True).data
-        recent_emails = LeadEmailSerializer(emails_qs.order_by("-created_at")[:5], many=True).data
-
-        campaign_performance = []
-        for campaign in campaigns_qs.prefetch_related("lead_set"):
-            total_leads = campaign.lead_set.count()
-            replied = campaign.lead_set.filter(status="replied").count()
-            performance = {
-                "id": str(campaign.id),
-                "name": campaign.name,
-                "total_leads": total_leads,
-                "replied": replied,
-            }
-            campaign_performance.append(performance)
+        recent_leads = LeadSerializer(
+            LeadSerializer.project_queryset(leads_qs).order_by("-created_at")[:5], many=True
+        ).data
+        recent_emails = LeadEmailSerializer(
+            LeadEmailSerializer.project_queryset(emails_qs).order_by("-created_at")[:5], many=True
+        ).data
 
         integration_status = []
         for integration in Integration.objects.filter(org=org):
@@ -95,25 +159,171 @@ class DashboardSummaryView(SalesorchBaseAPIView):
             "campaign_performance": campaign_performance,
             "integration_status": integration_status,
         }
-        return Response(payload)
+        return payload
 
 
 class LeadListCreateView(SalesorchBaseAPIView):
+    renderer_classes = (ORJSONRenderer, BrowsableAPIRenderer)
+
+    @query_budget(3)
     def get(self, request):
         org = self.get_org(request)
-        leads = Lead.objects.filter(org=org).order_by("-created_at")
-        serializer = LeadSerializer(leads, many=True)
-        return Response(serializer.data)
+        leads = Lead.objects.filter(org=org)
+        # campaign_name is rendered too, so renaming a campaign must change the ETag
+        return conditional_list_response(
+            request,
+            [leads, Campaign.objects.filter(org=org)],
+            lambda: self.get_sparse_paginated_response(request, leads, LeadSerializer),
+        )
 
     def post(self, request):
         org = self.get_org(request)
         serializer = LeadSerializer(data=request.data)
         if serializer.is_valid():
+            if Lead.objects.filter(org=org, email__iexact=serializer.validated_data["email"]).exists():
+                return Response({"email": ["A lead with this email already exists."]}, status=status.HTTP_400_BAD_REQUEST)
             serializer.save(org=org)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class LeadBulkView(SalesorchBaseAPIView):
+    """
+    Updates or deletes many leads in one request. Leads are selected by ``ids``
+    or by a ``filter`` (status, campaign, company, created_after, created_before);
+    ``changes`` may set status and campaign.
+    """
+
+    def post(self, request):
+        org = self.get_org(request)
+        serializer = LeadBulkActionSerializer(data=request.data, context={"org": org})
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        data = serializer.validated_data
+        affected = bulk_lead_action(
+            org,
+            data["action"],
+            ids=data.get("ids"),
+            filters=data.get("filter"),
+            changes=data.get("changes"),
+        )
+        result_key = "updated" if data["action"] == "update" else "deleted"
+        return Response({"action": data["action"], result_key: affected})
+
+
+class LeadExportView(SalesorchBaseAPIView):
+    """Streams every lead of the org as CSV (default) or NDJSON, ``?output=csv|ndjson``."""
+
+    def get(self, request):
+        org = self.get_org(request)
+        export_format = request.query_params.get("output", "csv")
+        if export_format not in EXPORT_FORMATS:
+            return Response({"error": "output must be csv or ndjson"}, status=status.HTTP_400_BAD_REQUEST)
+
+        leads = Lead.objects.filter(org=org).order_by("created_at", "id")
+        return streaming_export(leads, LEAD_EXPORT_COLUMNS, export_format, "leads")
+
+
+class LeadSearchView(SalesorchBaseAPIView):
+    """
+    Full-text search over the org's leads: names, email, company, website and the
+    text Firecrawl stored in ``enriched``. Results are ordered by rank.
+    """
+
+    default_limit = 25
+    max_limit = 100
+
+    def get(self, request):
+        org = self.get_org(request)
+        term = request.query_params.get("q", "").strip()
+        if not term:
+            return Response({"error": "q is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            limit = int(request.query_params.get("limit", self.default_limit))
+        except ValueError:
+            return Response({"error": "limit must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+        limit = max(1, min(limit, self.max_limit))
+
+        # names and emails are indexed unstemmed, free text with english stemming
+        query = SearchQuery(term, search_type="websearch", config="simple") | SearchQuery(
+            term, search_type="websearch", config="english"
+        )
+        leads = (
+            Lead.objects.filter(org=org, search_vector=query)
+            .annotate(rank=SearchRank(F("search_vector"), query))
+            .select_related("campaign")
+            .defer("enriched", "search_vector")
+            .order_by("-rank", "-created_at")[:limit]
+        )
+
+        results = []
+        for lead in leads:
+            results.append({**LeadSerializer(lead).data, "rank": lead.rank})
+        return Response({"results": results})
+
+
+class TypeaheadView(SalesorchBaseAPIView):
+    """
+    Prefix/substring and fuzzy matching for the lead and campaign pickers.
+    Matches run against the org's UPPER(...) trigram indexes and return only ids
+    and labels.
+    """
+
+    max_results = 10
+    # a shorter term has no trigram, so the indexes could not narrow the match
+    min_term_length = 3
+
+    def get(self, request):
+        org = self.get_org(request)
+        term = request.query_params.get("q", "").strip()
+        kind = request.query_params.get("type", "lead")
+        if kind not in ("lead", "campaign"):
+            return Response({"error": "type must be lead or campaign"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(term) < self.min_term_length:
+            return Response({"results": []})
+
+        needle = term.upper()
+        if kind == "campaign":
+            rows = (
+                Campaign.objects.filter(org=org)
+                .annotate(name_upper=Upper("name"))
+                .filter(Q(name_upper__contains=needle) | Q(name_upper__trigram_similar=needle))
+                .annotate(score=TrigramSimilarity("name_upper", needle))
+                .order_by("-score", "name")
+                .values_list("id", "name")[: self.max_results]
+            )
+            return Response({"results": [{"id": str(pk), "label": name} for pk, name in rows]})
+
+        rows = (
+            Lead.objects.filter(org=org)
+            .annotate(email_upper=Upper("email"), company_upper=Upper("company"))
+            .filter(
+                Q(email_upper__contains=needle)
+                | Q(company_upper__contains=needle)
+                | Q(email_upper__trigram_similar=needle)
+                | Q(company_upper__trigram_similar=needle)
+            )
+            .annotate(
+                score=Greatest(
+                    TrigramSimilarity("email_upper", needle),
+                    TrigramSimilarity("company_upper", needle),
+                )
+            )
+            .order_by("-score", "email")
+            .values_list("id", "first_name", "last_name", "email", "company")[: self.max_results]
+        )
+        results = []
+        for pk, first_name, last_name, email, company in rows:
+            name = f"{first_name} {last_name}".strip()
+            label = f"{name} <{email}>" if name else email
+            if company:
+                label = f"{label} · {company}"
+            results.append({"id": str(pk), "label": label})
+        return Response({"results": results})
+
+
 class LeadDetailView(SalesorchBaseAPIView):
     def get_object(self, org, pk):
         try:
@@ -129,6 +339,9 @@ class LeadDetailView(SalesorchBaseAPIView):
 
         serializer = LeadSerializer(lead, data=request.data, partial=True)
         if serializer.is_valid():
+            email = serializer.validated_data.get("email")
+            if email and Lead.objects.filter(org=org, email__iexact=email).exclude(id=lead.id).exists():
+                return Response({"email": ["A lead with this email already exists."]}, status=status.HTTP_400_BAD_REQUEST)
             serializer.save()
             return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -139,6 +352,7 @@ class LeadDetailView(SalesorchBaseAPIView):
         if not lead:
             return Response({"error": "Lead not found"}, status=status.HTTP_404_NOT_FOUND)
         lead.delete()
+        bump_org_tags_on_commit(org.id, LEADS, EMAILS)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -146,8 +360,11 @@ class CampaignListCreateView(SalesorchBaseAPIView):
     def get(self, request):
         org = self.get_org(request)
         campaigns = Campaign.objects.filter(org=org).order_by("name")
-        serializer = CampaignSerializer(campaigns, many=True)
-        return Response(serializer.data)
+        return conditional_list_response(
+            request,
+            [campaigns],
+            lambda: Response(CampaignSerializer(campaigns, many=True).data),
+        )
 
     def post(self, request):
         org = self.get_org(request)
@@ -185,15 +402,44 @@ class CampaignDetailView(SalesorchBaseAPIView):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+class CampaignSendView(SalesorchBaseAPIView):
+    """
+    Queues the drafts of every lead in the campaign that has not replied and
+    returns 202; Celery workers send them through the org's Gmail integration
+    at the rate its quota allows.
+    """
+
+    def post(self, request, pk):
+        org = self.get_org(request)
+        campaign = Campaign.objects.filter(id=pk, org=org).first()
+        if not campaign:
+            return Response({"error": "Campaign not found"}, status=status.HTTP_404_NOT_FOUND)
+        integration = Integration.objects.filter(org=org, provider="gmail").first()
+        if not integration:
+            return Response(
+                {"error": "Connect a Gmail account before sending a campaign"}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        email_ids = queue_campaign_emails(campaign)
+        transaction.on_commit(lambda: start_outbox_workers(integration.id, len(email_ids)))
+        return Response({"campaign": str(campaign.id), "queued": len(email_ids)}, status=status.HTTP_202_ACCEPTED)
+
+
 class SequenceStepListCreateView(SalesorchBaseAPIView):
+    @query_budget(3)
     def get(self, request):
         org = self.get_org(request)
         campaign_id = request.query_params.get("campaign_id")
-        queryset = SequenceStep.objects.filter(campaign__org=org).order_by("campaign_id", "order")
+        queryset = SequenceStep.objects.filter(campaign__org=org).select_related("campaign").order_by("campaign_id", "order")
+        campaigns = Campaign.objects.filter(org=org)
         if campaign_id:
             queryset = queryset.filter(campaign_id=campaign_id)
-        serializer = SequenceStepSerializer(queryset, many=True)
-        return Response(serializer.data)
+            campaigns = campaigns.filter(id=campaign_id)
+        return conditional_list_response(
+            request,
+            [queryset, campaigns],
+            lambda: Response(SequenceStepSerializer(queryset, many=True).data),
+        )
 
     def post(self, request):
         org = self.get_org(request)
@@ -247,31 +493,66 @@ class UploadFile(SalesorchBaseAPIView):
         if not file_obj:
             return Response({"error": "No file uploaded"}, status=status.HTTP_400_BAD_REQUEST)
 
+        # a committed file is kept, under its job's id, until run_import_job has read it
+        job_id = uuid.uuid4()
+        upload_path = None
         try:
-            df = upload_file(file_obj)
-            valid_df = file_preprocessing(df)
+            if commit_flag and campaign_id and not Campaign.objects.filter(id=campaign_id, org=org).exists():
+                raise ValueError("Campaign not found for this organization")
+            upload_path = upload_file(file_obj, name=job_id if commit_flag else None)
+            if commit_flag:
+                preview_records = preview_file(upload_path, preview_rows)
+            else:
+                result = import_leads_from_file(upload_path, org, preview_rows=preview_rows)
         except Exception as exc:
+            if upload_path:
+                delete_upload(upload_path)
             return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
-        preview_records = valid_df.fillna("").head(preview_rows).to_dict(orient="records")
-        save_stats = {"created": 0, "updated": 0}
         if commit_flag:
-            try:
-                save_stats = add_leads_to_db(valid_df, org, campaign_id)
-            except Exception as exc:
-                return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+            # the leads are written by a worker, the client polls the job for progress
+            job = ImportJob.objects.create(
+                id=job_id,
+                org=org,
+                campaign_id=campaign_id or None,
+                file_name=file_obj.name,
+                file_path=upload_path,
+            )
+            transaction.on_commit(lambda: run_import_job.delay(str(job.id)))
+            return Response(
+                {
+                    "file_name": file_obj.name,
+                    "preview": preview_records,
+                    "committed": True,
+                    "job": ImportJobSerializer(job).data,
+                },
+                status=status.HTTP_202_ACCEPTED,
+            )
 
+        delete_upload(upload_path)
         return Response(
             {
             "file_name": file_obj.name,
-                "total_rows": len(valid_df.index),
-                "preview": preview_records,
-                "committed": commit_flag,
-                "stats": save_stats,
+                "total_rows": result["total_rows"],
+                "preview": result["preview"],
+                "errors": result["errors"],
+                "error_count": result["error_count"],
+                "committed": False,
+                "stats": result["stats"],
             }
         )
 
 
+class ImportJobDetailView(SalesorchBaseAPIView):
+    def get(self, request, pk):
+        org = self.get_org(request)
+        try:
+            job = ImportJob.objects.get(id=pk, org=org)
+        except ImportJob.DoesNotExist:
+            return Response({"error": "Import job not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(ImportJobSerializer(job).data)
+
+
 class EmailPreviewView(SalesorchBaseAPIView):
     def post(self, request):
         org = self.get_org(request)
@@ -300,6 +581,12 @@ class EmailPreviewView(SalesorchBaseAPIView):
 
 
 class EmailSendView(SalesorchBaseAPIView):
+    """
+    Puts one email in the outbox and returns 202: the draft given by
+    ``email_id``, or a new email to ``lead_id``. Its status becomes "queued",
+    then "sent" or "failed" once an outbox worker has handed it to Gmail.
+    """
+
     def post(self, request):
         org = self.get_org(request)
         lead_id = request.data.get("lead_id")
@@ -307,150 +594,162 @@ class EmailSendView(SalesorchBaseAPIView):
         subject_template = request.data.get("subject", "")
         body_template = request.data.get("body", "")
 
-        lead_email = None
-        lead = None
-
-        if email_id:
-            try:
-                lead_email = LeadEmail.objects.select_related("lead").get(id=email_id, lead__org=org)
+        if not email_id and not lead_id:
+            return Response({"error": "lead_id is required when no email draft is provided"}, status=status.HTTP_400_BAD_REQUEST)
+        integration = Integration.objects.filter(org=org, provider="gmail").first()
+        if not integration:
+            return Response({"error": "Connect a Gmail account before sending an email"}, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            if email_id:
+                lead_email = (
+                    LeadEmail.objects.select_for_update(of=("self",))
+                    .select_related("lead")
+                    .filter(id=email_id, lead__org=org)
+                    .first()
+                )
+                if lead_email is None:
+                    return Response({"error": "Draft email not found"}, status=status.HTTP_404_NOT_FOUND)
+                if lead_email.status not in ("draft", "failed"):
+                    return Response(
+                        {"error": f"Email is already {lead_email.status}"}, status=status.HTTP_400_BAD_REQUEST
+                    )
                 lead = lead_email.lead
-            except LeadEmail.DoesNotExist:
-                return Response({"error": "Draft email not found"}, status=status.HTTP_404_NOT_FOUND)
-        else:
-            if not lead_id:
-                return Response({"error": "lead_id is required when no email draft is provided"}, status=status.HTTP_400_BAD_REQUEST)
-            try:
-                lead = Lead.objects.get(id=lead_id, org=org)
-            except Lead.DoesNotExist:
-                return Response({"error": "Lead not found"}, status=status.HTTP_404_NOT_FOUND)
-
-        if lead_email is None:
-            rendered_subject = personalize_template_copy(subject_template, lead)
-            rendered_body = personalize_template_copy(body_template, lead)
-            lead_email = LeadEmail.objects.create(
-                lead=lead,
-                subject=rendered_subject,
-                body=rendered_body,
-                preview=rendered_body,
-                status="draft",
-                meta={"source": "salesorch_dashboard", "mode": "manual"},
-            )
-        else:
-            # Update draft with any new text that might have been supplied
-            if subject_template:
-                lead_email.subject = personalize_template_copy(subject_template, lead)
-            if body_template:
+                # Update draft with any new text that might have been supplied
+                if subject_template:
+                    lead_email.subject = personalize_template_copy(subject_template, lead)
+                if body_template:
+                    rendered_body = personalize_template_copy(body_template, lead)
+                    lead_email.body = rendered_body
+                    lead_email.preview = rendered_body
+                lead_email.status = "queued"
+                lead_email.save(update_fields=["status", "subject", "body", "preview", "updated_at"])
+            else:
+                lead = Lead.objects.filter(id=lead_id, org=org).first()
+                if lead is None:
+                    return Response({"error": "Lead not found"}, status=status.HTTP_404_NOT_FOUND)
                 rendered_body = personalize_template_copy(body_template, lead)
-                lead_email.body = rendered_body
-                lead_email.preview = rendered_body
-            lead_email.save()
-
-        # Try to send via Gmail if integration exists
-        gmail_sent = False
-        try:
-            from integrations.models import Integration
-            from integrations.gmail_utils import send_gmail_email, get_valid_access_token
-            
-            integration = Integration.objects.filter(org=org, provider="gmail").first()
-            if integration:
-                try:
-                    access_token = get_valid_access_token(integration)
-                    gmail_response = send_gmail_email(
-                        integration=integration,
-                        to_email=lead.email,
-                        subject=lead_email.subject,
-                        body=lead_email.body,
-                    )
-                    gmail_sent = True
-                    lead_email.meta = {
-                        **(lead_email.meta or {}),
-                        "disposition": "sent_via_gmail",
-                        "gmail_message_id": gmail_response.get("id"),
-                    }
-                except Exception as e:
-                    # If Gmail send fails, mark as failed but don't raise error
-                    lead_email.meta = {
-                        **(lead_email.meta or {}),
-                        "disposition": "gmail_send_failed",
-                        "error": str(e),
-                    }
-        except Exception as e:
-            # Integration not available or error, continue without Gmail
-            pass
-
-        if gmail_sent:
-            lead_email.status = "sent"
-            lead_email.sent_at = timezone.now()
-        else:
-            # If Gmail not available, just mark as sent in our system
-            lead_email.status = "sent"
-            lead_email.sent_at = timezone.now()
-            if not gmail_sent:
-                lead_email.meta = {**(lead_email.meta or {}), "disposition": "sent_via_dashboard"}
-        
-        lead_email.save(update_fields=["status", "sent_at", "meta", "updated_at", "subject", "body", "preview"])
-
-        lead.last_contacted_at = timezone.now()
-        lead.status = "contacted"
-        lead.save(update_fields=["last_contacted_at", "status", "updated_at"])
+                lead_email = LeadEmail.objects.create(
+                    lead=lead,
+                    subject=personalize_template_copy(subject_template, lead),
+                    body=rendered_body,
+                    preview=rendered_body,
+                    status="queued",
+                    meta={"source": "salesorch_dashboard", "mode": "manual"},
+                )
+            transaction.on_commit(lambda: start_outbox_workers(integration.id, 1))
 
         serializer = LeadEmailSerializer(lead_email)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
 
 
 class EmailLogListView(SalesorchBaseAPIView):
+    renderer_classes = (ORJSONRenderer, BrowsableAPIRenderer)
+
+    @query_budget(3)
     def get(self, request):
         org = self.get_org(request)
-        emails = LeadEmail.objects.filter(lead__org=org).order_by("-created_at")
-        serializer = LeadEmailSerializer(emails, many=True)
-        return Response(serializer.data)
+        emails = LeadEmail.objects.filter(lead__org=org)
+        return self.get_sparse_paginated_response(request, emails, LeadEmailSerializer)
+
+
+class EmailExportView(SalesorchBaseAPIView):
+    """Streams every email of the org as CSV (default) or NDJSON, ``?output=csv|ndjson``."""
+
+    def get(self, request):
+        org = self.get_org(request)
+        export_format = request.query_params.get("output", "csv")
+        if export_format not in EXPORT_FORMATS:
+            return Response({"error": "output must be csv or ndjson"}, status=status.HTTP_400_BAD_REQUEST)
+
+        emails = annotate_lead_name(LeadEmail.objects.filter(lead__org=org)).order_by("created_at", "id")
+        return streaming_export(emails, EMAIL_EXPORT_COLUMNS, export_format, "emails")
 
 
 class EmailStatsView(SalesorchBaseAPIView):
+    renderer_classes = (ORJSONRenderer, BrowsableAPIRenderer)
+    # the timeline shows lead names, hence LEADS
+    cache_tags = (EMAILS, LEADS)
+
     def get(self, request):
         org = self.get_org(request)
-        emails = LeadEmail.objects.filter(lead__org=org)
-        
-        # Count opened and replied emails by checking meta field
-        opened_count = 0
-        replied_count = 0
-        for email in emails:
-            meta = email.meta or {}
-            if meta.get("opened_at"):
-                opened_count += 1
-            if meta.get("replied_at"):
-                replied_count += 1
-        
+        return Response(cached_org_data(org, "email-stats", self.cache_tags, lambda: self.build_payload(org)))
+
+    @staticmethod
+    def timeline_queryset(org):
+        """The org's 50 most recently sent emails, with the lead fields the timeline shows."""
+        return LeadEmail.objects.filter(lead__org=org, status="sent").order_by("-sent_at").values(
+            "id",
+            "subject",
+            "sent_at",
+            "lead__email",
+            "lead__first_name",
+            "lead__last_name",
+            "opened_at",
+            "replied_at",
+            "meta__ai_reply",
+        )[:50]
+
+    def build_payload(self, org):
+        counts = org_counter_totals(org)
         stats = {
-            "total": emails.count(),
-            "sent": emails.filter(status="sent").count(),
-            "drafts": emails.filter(status="draft").count(),
-            "failed": emails.filter(status="failed").count(),
-            "opened": opened_count,
-            "replied": replied_count,
+            "total": counts["emails_total"],
+            "sent": counts["emails_sent"],
+            "drafts": counts["emails_draft"],
+            "failed": counts["emails_failed"],
+            "opened": counts["emails_opened"],
+            "replied": counts["emails_replied"],
         }
-        
+
         # Get detailed email timeline
-        sent_emails = emails.filter(status="sent").select_related("lead").order_by("-sent_at")[:50]
+        sent_emails = self.timeline_queryset(org)
         email_timeline = []
-        for email in sent_emails:
-            meta = email.meta or {}
-            timeline_item = {
-                "id": str(email.id),
-                "subject": email.subject,
-                "lead_email": email.lead.email,
-                "lead_name": f"{email.lead.first_name} {email.lead.last_name}".strip() or email.lead.email,
-                "sent_at": email.sent_at.isoformat() if email.sent_at else None,
-                "opened_at": meta.get("opened_at"),
-                "replied_at": meta.get("replied_at"),
-                "ai_reply": meta.get("ai_reply"),
-            }
-            email_timeline.append(timeline_item)
-        
-        return Response({
+        for row in sent_emails:
+            email_timeline.append(
+                {
+                    "id": str(row["id"]),
+                    "subject": row["subject"],
+                    "lead_email": row["lead__email"],
+                    "lead_name": f"{row['lead__first_name']} {row['lead__last_name']}".strip() or row["lead__email"],
+                    "sent_at": row["sent_at"].isoformat() if row["sent_at"] else None,
+                    "opened_at": row["opened_at"].isoformat() if row["opened_at"] else None,
+                    "replied_at": row["replied_at"].isoformat() if row["replied_at"] else None,
+                    "ai_reply": row["meta__ai_reply"],
+                }
+            )
+
+        return {
             "stats": stats,
             "timeline": email_timeline,
-        })
+        }
+
+
+class EmailAnalyticsView(SalesorchBaseAPIView):
+    """
+    Sent, opened, replied and failed counts per day, week or month over a date
+    range, ``?start=&end=&interval=day|week|month&campaign=``, read from the
+    daily rollups only.
+    """
+
+    renderer_classes = (ORJSONRenderer, BrowsableAPIRenderer)
+
+    # org and rollups
+    @query_budget(2)
+    def get(self, request):
+        org = self.get_org(request)
+        serializer = EmailAnalyticsQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+
+        data = rollup_series(org, params["start"], params["end"], params["interval"], params.get("campaign"))
+        return Response(
+            {
+                "start": params["start"].isoformat(),
+                "end": params["end"].isoformat(),
+                "interval": params["interval"],
+                **data,
+            }
+        )
 
 
 class EmailGenerateView(SalesorchBaseAPIView):
@@ -495,8 +794,8 @@ class EmailGenerateView(SalesorchBaseAPIView):
 
 
 class ActivityListView(SalesorchBaseAPIView):
+    @query_budget(3)
     def get(self, request):
         org = self.get_org(request)
-        activities = ActivityTimeline.objects.filter(lead__org=org).order_by("-created_at")[:25]
-        serializer = ActivityTimelineSerializer(activities, many=True)
-        return Response(serializer.data)
+        activities = ActivityTimeline.objects.filter(lead__org=org).select_related("lead__campaign")
+        return self.get_paginated_response(request, activities, ActivityTimelineSerializer, page_size=25)
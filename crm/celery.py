@@ -20,4 +20,24 @@ app.conf.beat_schedule = {
         "task": "campaigns.tasks.daily_enrich_leads",
         "schedule": crontab(hour=2, minute=0),
     },
+    # Email analytics rollups - every 10 minutes
+    "email-daily-rollups": {
+        "task": "campaigns.tasks.update_email_rollups",
+        "schedule": crontab(minute="*/10"),
+    },
+    # Email analytics rollups of the last 31 days, recounted - daily at 3 AM UTC
+    "email-rollups-recount": {
+        "task": "campaigns.tasks.recount_email_rollups",
+        "schedule": crontab(hour=3, minute=0),
+    },
+    # Email outbox emails whose send worker was lost - every minute
+    "drain-email-outbox": {
+        "task": "campaigns.tasks.drain_email_outbox",
+        "schedule": crontab(),
+    },
+    # OAuth tokens expiring in the next 15 minutes - every 5 minutes
+    "renew-oauth-tokens": {
+        "task": "integrations.tasks.renew_oauth_tokens",
+        "schedule": crontab(minute="*/5"),
+    },
 }
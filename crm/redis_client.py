@@ -0,0 +1,14 @@
+import functools
+
+import redis
+from django.conf import settings
+
+
+@functools.lru_cache(maxsize=None)
+def get_redis():
+    """
+    The process-wide client for ``settings.REDIS_URL``. redis-py pools its
+    connections per client and reopens them in forked worker processes, so one
+    client per process is enough.
+    """
+    return redis.Redis.from_url(settings.REDIS_URL)
@@ -37,6 +37,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'corsheaders',
     'users',
     'campaigns.apps.CampaignsConfig',  # Use custom AppConfig to ensure signals are loaded
@@ -166,6 +167,37 @@ CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
 CELERY_TIMEZONE = "UTC"
 
+# Django cache, used for the per-org dashboard/stats cache (campaigns.cache)
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.getenv("REDIS_CACHE_URL", "redis://localhost:6379/2"),
+        "KEY_PREFIX": "crm",
+    }
+}
+# Seconds a cached dashboard/stats payload lives; writes invalidate it earlier
+ORG_CACHE_TIMEOUT = int(os.getenv("ORG_CACHE_TIMEOUT", "300"))
+
+# Redis shared by web and workers for coordination, e.g. send rate limits (crm.redis_client)
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/3")
+# Gmail allows 250 quota units per second per mailbox and messages.send costs 100,
+# so each connected mailbox sends at most 2.5 emails per second, 2 at once
+GMAIL_SEND_RATE = float(os.getenv("GMAIL_SEND_RATE", "2.5"))
+GMAIL_SEND_BURST = int(os.getenv("GMAIL_SEND_BURST", "2"))
+# Domain of the Message-ID given to each sent email, which makes resending it detectable
+EMAIL_MESSAGE_ID_DOMAIN = os.getenv("EMAIL_MESSAGE_ID_DOMAIN", "salesorch.local")
+# Send workers started at most per mailbox when emails are queued
+EMAIL_OUTBOX_WORKERS = int(os.getenv("EMAIL_OUTBOX_WORKERS", "4"))
+# Gmail API host; pointed at a local fake server by the bench_gmail_fetch command
+GMAIL_API_BASE_URL = os.getenv("GMAIL_API_BASE_URL", "https://gmail.googleapis.com")
+
 
 BACKEND_URL=os.getenv("BACKEND_URL", "")
-CALLING_SERVICE_URL=os.getenv("CALLING_SERVICE_URL", "")
\ No newline at end of file
+CALLING_SERVICE_URL=os.getenv("CALLING_SERVICE_URL", "")
+
+# What to do when a view exceeds its query budget (campaigns.query_budget): "log", "raise" or "off"
+QUERY_BUDGET_ACTION = os.getenv("QUERY_BUDGET_ACTION", "log")
+
+# Country calling code (digits only, e.g. "1") applied to imported phone numbers without an international
+# prefix; when empty, such numbers are reported as invalid rows
+LEAD_IMPORT_DEFAULT_COUNTRY_CODE = os.getenv("LEAD_IMPORT_DEFAULT_COUNTRY_CODE", "")
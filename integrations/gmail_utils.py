@@ -1,13 +1,25 @@
 import base64
 import email
+import json
+import re
+import uuid
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import requests
 from django.utils import timezone
 from datetime import timedelta
 from django.conf import settings
+from integrations import http_client, tokens
 from users.models import OrganizationConfigurations
 
+# sub-requests the Gmail batch endpoint accepts per call
+GMAIL_BATCH_LIMIT = 100
+
+
+def gmail_api_url(path):
+    """Absolute URL of a Gmail API path, under settings.GMAIL_API_BASE_URL."""
+    return f"{settings.GMAIL_API_BASE_URL.rstrip('/')}{path}"
+
 
 def refresh_google_token(integration):
     """Refresh Google access token using refresh token."""
@@ -23,7 +35,8 @@ def refresh_google_token(integration):
         "grant_type": "refresh_token",
     }
     
-    resp = requests.post(token_url, data=data, timeout=15)
+    # a refresh can be repeated safely
+    resp = http_client.post(token_url, data=data, idempotent=True)
     resp.raise_for_status()
     token_data = resp.json()
     
@@ -33,20 +46,21 @@ def refresh_google_token(integration):
     
     integration.access_token = access_token
     integration.expires_at = expires_at
-    integration.save(update_fields=["access_token", "expires_at"])
+    integration.save(update_fields=["access_token", "expires_at", "updated_at"])
     
     return access_token
 
 
 def get_valid_access_token(integration):
-    """Get a valid access token, refreshing if necessary."""
-    if integration.expires_at and timezone.now() >= integration.expires_at - timedelta(minutes=5):
-        return refresh_google_token(integration)
-    return integration.access_token
+    """Get a valid access token, refreshing it once across all workers if necessary."""
+    return tokens.get_access_token(integration, refresh_google_token)
 
 
-def send_gmail_email(integration, to_email, subject, body, from_email=None):
-    """Send an email via Gmail API."""
+def send_gmail_email(integration, to_email, subject, body, from_email=None, message_id=None):
+    """
+    Send an email via Gmail API. ``message_id`` sets the Message-ID header,
+    which find_gmail_message can look the sent email up by.
+    """
     access_token = get_valid_access_token(integration)
     
     # Create message
@@ -55,6 +69,8 @@ def send_gmail_email(integration, to_email, subject, body, from_email=None):
     message['subject'] = subject
     if from_email:
         message['from'] = from_email
+    if message_id:
+        message['Message-ID'] = message_id
     
     message.attach(MIMEText(body, 'plain'))
     
@@ -62,55 +78,149 @@ def send_gmail_email(integration, to_email, subject, body, from_email=None):
     raw_message = base64.urlsafe_b64encode(message.as_bytes()).decode('utf-8')
     
     # Send via Gmail API
-    url = "https://gmail.googleapis.com/gmail/v1/users/me/messages/send"
+    url = gmail_api_url("/gmail/v1/users/me/messages/send")
     headers = {
         "Authorization": f"Bearer {access_token}",
         "Content-Type": "application/json",
     }
     data = {"raw": raw_message}
     
-    resp = requests.post(url, json=data, headers=headers, timeout=15)
+    resp = http_client.post(url, json=data, headers=headers)
     resp.raise_for_status()
     return resp.json()
 
 
-def fetch_gmail_messages(integration, query="", max_results=50):
-    """Fetch Gmail messages."""
+def find_gmail_message(integration, message_id):
+    """
+    The ``{"id", "threadId"}`` of the mailbox's message with the Message-ID
+    header ``message_id``, or None when it has none.
+    """
+    access_token = get_valid_access_token(integration)
+    resp = http_client.get(
+        gmail_api_url("/gmail/v1/users/me/messages"),
+        headers={"Authorization": f"Bearer {access_token}"},
+        params={"q": f"rfc822msgid:{message_id}", "maxResults": 1, "includeSpamTrash": "true"},
+    )
+    resp.raise_for_status()
+    messages = resp.json().get("messages", [])
+    return messages[0] if messages else None
+
+
+def _message_body(payload):
+    """The text/plain body of a message payload in ``format=full``."""
+    if "parts" in payload:
+        for part in payload["parts"]:
+            if part.get("mimeType") == "text/plain":
+                return base64.urlsafe_b64decode(part["body"]["data"]).decode("utf-8", errors="ignore")
+    elif payload.get("body", {}).get("data"):
+        return base64.urlsafe_b64decode(payload["body"]["data"]).decode("utf-8", errors="ignore")
+    return ""
+
+
+def _split_http_message(raw):
+    """Splits raw HTTP text into its header lines and body, at the first blank line."""
+    head, *rest = re.split(rb"\r?\n\r?\n", raw, maxsplit=1)
+    return head.decode("utf-8", errors="replace").splitlines(), rest[0] if rest else b""
+
+
+def _parse_batch_response(resp):
+    """
+    Splits a multipart/mixed batch response into ``{content_id: (status_code, body)}``,
+    with the ``response-`` prefix Gmail adds to each Content-ID removed.
+    """
+    match = re.search(r'boundary="?([^";]+)"?', resp.headers.get("Content-Type", ""))
+    if not match:
+        raise requests.HTTPError("Batch response without a multipart boundary", response=resp)
+    delimiter = b"--" + match.group(1).encode()
+
+    results = {}
+    for part in resp.content.split(delimiter)[1:]:
+        if part.startswith(b"--"):
+            break
+        part_headers, http_response = _split_http_message(part.strip())
+        content_id = ""
+        for line in part_headers:
+            name, _, value = line.partition(":")
+            if name.strip().lower() == "content-id":
+                content_id = value.strip().strip("<>").removeprefix("response-")
+        status_lines, body = _split_http_message(http_response)
+        status_code = int(status_lines[0].split()[1]) if status_lines else 0
+        results[content_id] = (status_code, body)
+    return results
+
+
+def _get_message(message_id, headers):
+    url = gmail_api_url(f"/gmail/v1/users/me/messages/{message_id}")
+    resp = http_client.get(url, headers=headers, params={"format": "full"})
+    resp.raise_for_status()
+    return resp.json()
+
+
+def _batch_get_messages(message_ids, headers):
+    """
+    Fetches messages in ``format=full`` through the Gmail batch endpoint,
+    GMAIL_BATCH_LIMIT per HTTP call, in the order of ``message_ids``. Messages
+    whose sub-request failed, e.g. rate-limited ones, are fetched one by one.
+    """
+    messages = {}
+    for start in range(0, len(message_ids), GMAIL_BATCH_LIMIT):
+        chunk = message_ids[start:start + GMAIL_BATCH_LIMIT]
+        boundary = f"batch_{uuid.uuid4().hex}"
+        parts = [
+            f"--{boundary}\r\n"
+            "Content-Type: application/http\r\n"
+            f"Content-ID: <{message_id}>\r\n\r\n"
+            f"GET /gmail/v1/users/me/messages/{message_id}?format=full\r\n\r\n"
+            for message_id in chunk
+        ]
+        # the sub-requests only read, so the batch is safe to repeat
+        resp = http_client.post(
+            gmail_api_url("/batch/gmail/v1"),
+            data=("".join(parts) + f"--{boundary}--\r\n").encode(),
+            headers={**headers, "Content-Type": f"multipart/mixed; boundary={boundary}"},
+            idempotent=True,
+        )
+        resp.raise_for_status()
+        for message_id, (status_code, body) in _parse_batch_response(resp).items():
+            if status_code == 200:
+                messages[message_id] = json.loads(body)
+
+    return [
+        messages[message_id] if message_id in messages else _get_message(message_id, headers)
+        for message_id in message_ids
+    ]
+
+
+def fetch_gmail_messages(integration, query="", max_results=50, batch=True):
+    """
+    Fetch Gmail messages. The message details are fetched with batch requests,
+    two round trips for up to GMAIL_BATCH_LIMIT messages; ``batch=False`` makes
+    one request per message instead.
+    """
     access_token = get_valid_access_token(integration)
     
     # First, get message list
-    url = "https://gmail.googleapis.com/gmail/v1/users/me/messages"
+    url = gmail_api_url("/gmail/v1/users/me/messages")
     headers = {"Authorization": f"Bearer {access_token}"}
     params = {"maxResults": max_results}
     if query:
         params["q"] = query
     
-    resp = requests.get(url, headers=headers, params=params, timeout=15)
+    resp = http_client.get(url, headers=headers, params=params)
     resp.raise_for_status()
     messages_list = resp.json()
-    
+
+    message_ids = [msg["id"] for msg in messages_list.get("messages", [])[:max_results]]
+    if batch:
+        details = _batch_get_messages(message_ids, headers)
+    else:
+        details = [_get_message(message_id, headers) for message_id in message_ids]
+
     messages = []
-    for msg in messages_list.get("messages", [])[:max_results]:
-        # Get full message details
-        msg_url = f"https://gmail.googleapis.com/gmail/v1/users/me/messages/{msg['id']}"
-        msg_resp = requests.get(msg_url, headers=headers, params={"format": "full"}, timeout=15)
-        msg_resp.raise_for_status()
-        msg_data = msg_resp.json()
-        
+    for msg_data in details:
         # Parse headers
         headers_dict = {h["name"]: h["value"] for h in msg_data.get("payload", {}).get("headers", [])}
         
-        # Extract body
-        body = ""
-        payload = msg_data.get("payload", {})
-        if "parts" in payload:
-            for part in payload["parts"]:
-                if part.get("mimeType") == "text/plain":
-                    body = base64.urlsafe_b64decode(part["body"]["data"]).decode("utf-8", errors="ignore")
-                    break
-        elif payload.get("body", {}).get("data"):
-            body = base64.urlsafe_b64decode(payload["body"]["data"]).decode("utf-8", errors="ignore")
-        
         messages.append({
             "id": msg_data["id"],
             "thread_id": msg_data.get("threadId"),
@@ -118,7 +228,7 @@ def fetch_gmail_messages(integration, query="", max_results=50):
             "from": headers_dict.get("From", ""),
             "to": headers_dict.get("To", ""),
             "date": headers_dict.get("Date", ""),
-            "body": body,
+            "body": _message_body(msg_data.get("payload", {})),
             "snippet": msg_data.get("snippet", ""),
         })
     
@@ -129,10 +239,10 @@ def fetch_gmail_replies(integration, thread_id):
     """Fetch replies for a specific thread."""
     access_token = get_valid_access_token(integration)
     
-    url = f"https://gmail.googleapis.com/gmail/v1/users/me/threads/{thread_id}"
+    url = gmail_api_url(f"/gmail/v1/users/me/threads/{thread_id}")
     headers = {"Authorization": f"Bearer {access_token}"}
     
-    resp = requests.get(url, headers=headers, params={"format": "full"}, timeout=15)
+    resp = http_client.get(url, headers=headers, params={"format": "full"})
     resp.raise_for_status()
     thread_data = resp.json()
     
@@ -140,23 +250,13 @@ def fetch_gmail_replies(integration, thread_id):
     for msg in thread_data.get("messages", []):
         headers_dict = {h["name"]: h["value"] for h in msg.get("payload", {}).get("headers", [])}
         
-        body = ""
-        payload = msg.get("payload", {})
-        if "parts" in payload:
-            for part in payload["parts"]:
-                if part.get("mimeType") == "text/plain":
-                    body = base64.urlsafe_b64decode(part["body"]["data"]).decode("utf-8", errors="ignore")
-                    break
-        elif payload.get("body", {}).get("data"):
-            body = base64.urlsafe_b64decode(payload["body"]["data"]).decode("utf-8", errors="ignore")
-        
         replies.append({
             "id": msg["id"],
             "from": headers_dict.get("From", ""),
             "to": headers_dict.get("To", ""),
             "subject": headers_dict.get("Subject", ""),
             "date": headers_dict.get("Date", ""),
-            "body": body,
+            "body": _message_body(msg.get("payload", {})),
             "snippet": msg.get("snippet", ""),
         })
     
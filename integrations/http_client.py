@@ -0,0 +1,104 @@
+import logging
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# (connect, read) seconds; no provider call may wait forever
+DEFAULT_TIMEOUT = (5, 30)
+# attempts after the first one
+DEFAULT_RETRIES = 3
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 8.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+POOL_MAXSIZE = 10
+
+_sessions = threading.local()
+
+
+def get_session(url):
+    """
+    The keep-alive session for the scheme and host of ``url``. Sessions are
+    kept per thread, since requests does not promise a Session is thread-safe,
+    and reused for every later call to that host.
+    """
+    parts = urlsplit(url)
+    key = (parts.scheme, parts.netloc)
+    sessions = getattr(_sessions, "by_host", None)
+    if sessions is None:
+        sessions = _sessions.by_host = {}
+    session = sessions.get(key)
+    if session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_MAXSIZE)
+        session.mount(f"{parts.scheme}://", adapter)
+        sessions[key] = session
+    return session
+
+
+def _backoff(attempt, response=None):
+    """Full-jitter exponential backoff, or the server's Retry-After when it sends one in seconds."""
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after and retry_after.isdigit():
+        return min(float(retry_after), BACKOFF_MAX)
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+def request(method, url, *, idempotent=None, retries=DEFAULT_RETRIES, timeout=DEFAULT_TIMEOUT, **kwargs):
+    """
+    Sends a request to a provider API over the pooled session of its host.
+
+    429 responses and connect timeouts are retried for every method, since the
+    provider did not act on the request. 5xx responses and other connection
+    errors are only retried when the call is ``idempotent``, which defaults to
+    whether the HTTP method is; pass ``idempotent=True`` for POSTs that are
+    safe to repeat. The last response is returned as is, for the caller's
+    ``raise_for_status``; the last exception is raised.
+    """
+    method = method.upper()
+    if idempotent is None:
+        idempotent = method in IDEMPOTENT_METHODS
+    session = get_session(url)
+
+    for attempt in range(retries + 1):
+        last_attempt = attempt == retries
+        try:
+            response = session.request(method, url, timeout=timeout, **kwargs)
+        except requests.ConnectTimeout:
+            if last_attempt:
+                raise
+            response = None
+        except (requests.ConnectionError, requests.Timeout):
+            if last_attempt or not idempotent:
+                raise
+            response = None
+        else:
+            retryable = response.status_code == 429 or (idempotent and response.status_code in RETRY_STATUSES)
+            if last_attempt or not retryable:
+                return response
+
+        delay = _backoff(attempt, response)
+        if response is not None:
+            response.close()
+        logger.warning(
+            "%s %s failed (%s), retrying in %.2fs",
+            method,
+            urlsplit(url).netloc,
+            response.status_code if response is not None else "connection error",
+            delay,
+        )
+        time.sleep(delay)
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
@@ -0,0 +1,117 @@
+import base64
+import json
+import re
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from django.utils import timezone
+
+from integrations.gmail_utils import fetch_gmail_messages
+from integrations.models import Integration
+
+
+def fake_message(message_id):
+    body = base64.urlsafe_b64encode(f"Hello from {message_id}\n".encode()).decode()
+    return {
+        "id": message_id,
+        "threadId": f"thread-{message_id}",
+        "snippet": f"Hello from {message_id}",
+        "payload": {
+            "headers": [
+                {"name": "Subject", "value": f"Subject {message_id}"},
+                {"name": "From", "value": "lead@example.com"},
+                {"name": "To", "value": "me@example.com"},
+                {"name": "Date", "value": "Mon, 1 Jun 2026 10:00:00 +0000"},
+            ],
+            "parts": [{"mimeType": "text/plain", "body": {"data": body}}],
+        },
+    }
+
+
+class FakeGmailHandler(BaseHTTPRequestHandler):
+    """Serves the message list, message get and batch endpoints, each after ``server.latency`` seconds."""
+
+    protocol_version = "HTTP/1.1"
+    # headers and body go out as separate writes; without this, Nagle's algorithm
+    # and delayed ACKs stall every response on a kept-alive connection
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_body(self, body, content_type="application/json"):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        time.sleep(self.server.latency)
+        url = urlparse(self.path)
+        if url.path == "/gmail/v1/users/me/messages":
+            count = int(parse_qs(url.query).get("maxResults", ["50"])[0])
+            messages = [{"id": f"msg{i}", "threadId": f"thread-msg{i}"} for i in range(count)]
+            self.send_body(json.dumps({"messages": messages}).encode())
+        else:
+            self.send_body(json.dumps(fake_message(url.path.rsplit("/", 1)[1])).encode())
+
+    def do_POST(self):
+        time.sleep(self.server.latency)
+        request = self.rfile.read(int(self.headers["Content-Length"]))
+        boundary = re.search(r"boundary=(\S+)", self.headers["Content-Type"]).group(1)
+        parts = []
+        for part in request.split(f"--{boundary}".encode())[1:]:
+            if part.startswith(b"--"):
+                break
+            content_id = re.search(rb"Content-ID: <([^>]+)>", part).group(1).decode()
+            message_id = re.search(rb"GET /gmail/v1/users/me/messages/([^?\s]+)", part).group(1).decode()
+            parts.append(
+                f"--response_boundary\r\nContent-Type: application/http\r\nContent-ID: <response-{content_id}>\r\n\r\n"
+                f"HTTP/1.1 200 OK\r\nContent-Type: application/json; charset=UTF-8\r\n\r\n"
+                f"{json.dumps(fake_message(message_id))}\r\n"
+            )
+        body = ("".join(parts) + "--response_boundary--\r\n").encode()
+        self.send_body(body, "multipart/mixed; boundary=response_boundary")
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures fetch_gmail_messages against a local fake Gmail server that adds a fixed "
+        "latency to every HTTP request, one request per message versus the batch endpoint."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--messages", type=int, default=50)
+        parser.add_argument("--latency-ms", type=float, default=50, help="Simulated round-trip time per request.")
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, **options):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), FakeGmailHandler)
+        server.latency = options["latency_ms"] / 1000
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        # never saved: only its token is read, and it does not need refreshing
+        integration = Integration(provider="gmail", access_token="bench", expires_at=timezone.now() + timedelta(hours=1))
+        count = options["messages"]
+        outputs = {}
+        try:
+            with override_settings(GMAIL_API_BASE_URL=f"http://127.0.0.1:{server.server_address[1]}"):
+                for name, batch in (("per-message", False), ("batch", True)):
+                    started = time.perf_counter()
+                    for _ in range(options["repeat"]):
+                        outputs[name] = fetch_gmail_messages(integration, max_results=count, batch=batch)
+                    elapsed = (time.perf_counter() - started) / options["repeat"]
+                    self.stdout.write(f"{name:<12} {count} messages in {elapsed * 1000:.0f}ms")
+        finally:
+            server.shutdown()
+
+        if outputs["per-message"] != outputs["batch"]:
+            raise CommandError("batch fetch returned different messages than the per-message fetch")
+        self.stdout.write(f"both modes returned the same {len(outputs['batch'])} messages")
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 04:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('integrations', '0002_initial'),
+        ('users', '0005_add_company_product_fields'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='integration',
+            index=models.Index(fields=['org', 'provider'], name='integrations_org_provider'),
+        ),
+    ]
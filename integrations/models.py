@@ -14,4 +14,9 @@ class Integration(BaseModel):
     provider = models.CharField(max_length=20, choices=PROVIDER_CHOICES)
     access_token = models.TextField()
     refresh_token = models.TextField()
-    expires_at = models.DateTimeField()
\ No newline at end of file
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["org", "provider"], name="integrations_org_provider"),
+        ]
@@ -0,0 +1,69 @@
+import time
+
+from django.conf import settings
+
+from crm.redis_client import get_redis
+
+# Refills the bucket for the time elapsed since the last call, then takes
+# ARGV[3] tokens if there are enough. Returns "0" when they were taken,
+# otherwise the seconds until there will be enough. The clock is Redis's own,
+# so every worker sees the same one.
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local clock = redis.call("TIME")
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+
+local state = redis.call("HMGET", KEYS[1], "tokens", "updated")
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+
+local wait = 0
+if tokens >= requested then
+    tokens = tokens - requested
+else
+    wait = (requested - tokens) / rate
+end
+redis.call("HSET", KEYS[1], "tokens", tostring(tokens), "updated", tostring(now))
+redis.call("EXPIRE", KEYS[1], math.ceil(capacity / rate) + 1)
+return tostring(wait)
+"""
+
+
+class TokenBucket:
+    """
+    A token bucket kept in Redis, so every web and worker process shares it:
+    ``rate`` tokens per second accumulate up to ``capacity``.
+    """
+
+    def __init__(self, key, rate, capacity):
+        self.key = key
+        self.rate = rate
+        self.capacity = capacity
+        self._script = get_redis().register_script(TOKEN_BUCKET_SCRIPT)
+
+    def try_acquire(self, tokens=1):
+        """Takes ``tokens`` if available; returns 0, or the seconds to wait before trying again."""
+        return float(self._script(keys=[self.key], args=[self.rate, self.capacity, tokens]))
+
+    def acquire(self, tokens=1, timeout=None):
+        """Blocks until ``tokens`` are taken; returns False if that would take longer than ``timeout`` seconds."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.try_acquire(tokens)
+            if not wait:
+                return True
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+def gmail_send_bucket(integration):
+    """The send limiter of one connected Gmail mailbox, sized to Gmail's per-user quota."""
+    return TokenBucket(
+        f"ratelimit:gmail-send:{integration.id}",
+        rate=settings.GMAIL_SEND_RATE,
+        capacity=settings.GMAIL_SEND_BURST,
+    )
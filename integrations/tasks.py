@@ -39,3 +39,16 @@ def sync_calls_task(self, org_id):
         )
         synced += 1
     return {"synced": synced}
+
+
+@shared_task
+def renew_oauth_tokens():
+    """
+    Refresh the Gmail and HubSpot tokens that are about to expire, ahead of
+    the requests that would otherwise refresh them inline.
+    """
+    from .gmail_utils import refresh_google_token
+    from .tokens import renew_expiring_tokens
+    from .utils import refresh_hubspot_token
+    renewed, failed = renew_expiring_tokens({"gmail": refresh_google_token, "hubspot": refresh_hubspot_token})
+    return {"renewed": renewed, "failed": failed}
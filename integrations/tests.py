@@ -1,3 +1,233 @@
-from django.test import TestCase
+import io
+import json
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+import requests
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from users.models import Organization
+from . import gmail_utils, http_client, tokens
+from .models import Integration
+
+
+def make_response(status_code=200, content=b"", headers=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = content
+    response.raw = io.BytesIO(content)
+    response.headers.update(headers or {})
+    return response
+
+
+def batch_part(content_id, status_line, body=b""):
+    return (
+        b"--batch_abc\r\n"
+        b"Content-Type: application/http\r\n"
+        b"Content-ID: <response-" + content_id.encode() + b">\r\n\r\n"
+        + status_line.encode() + b"\r\n"
+        b"Content-Type: application/json; charset=UTF-8\r\n\r\n"
+        + body + b"\r\n"
+    )
+
+
+class GmailBatchTests(SimpleTestCase):
+    headers = {"Authorization": "Bearer token"}
+
+    def batch_response(self):
+        # parts come back in any order; m3 was rate limited
+        content = (
+            batch_part("m2", "HTTP/1.1 200 OK", json.dumps({"id": "m2", "snippet": "two"}).encode())
+            + batch_part("m3", "HTTP/1.1 429 Too Many Requests", b'{"error": {"code": 429}}')
+            + batch_part("m1", "HTTP/1.1 200 OK", json.dumps({"id": "m1", "snippet": "one"}).encode())
+            + b"--batch_abc--\r\n"
+        )
+        return make_response(content=content, headers={"Content-Type": "multipart/mixed; boundary=batch_abc"})
+
+    def test_parse_batch_response(self):
+        results = gmail_utils._parse_batch_response(self.batch_response())
+
+        self.assertEqual(
+            {content_id: (status_code, json.loads(body)) for content_id, (status_code, body) in results.items()},
+            {
+                "m1": (200, {"id": "m1", "snippet": "one"}),
+                "m2": (200, {"id": "m2", "snippet": "two"}),
+                "m3": (429, {"error": {"code": 429}}),
+            },
+        )
+
+    def test_response_without_boundary(self):
+        with self.assertRaises(requests.HTTPError):
+            gmail_utils._parse_batch_response(make_response(headers={"Content-Type": "application/json"}))
+
+    @mock.patch("integrations.gmail_utils.http_client.get")
+    @mock.patch("integrations.gmail_utils.http_client.post")
+    def test_failed_parts_are_fetched_singly_and_order_is_kept(self, post, get):
+        post.return_value = self.batch_response()
+        get.return_value = make_response(content=json.dumps({"id": "m3", "snippet": "three"}).encode())
+
+        messages = gmail_utils._batch_get_messages(["m1", "m2", "m3"], self.headers)
+
+        self.assertEqual([message["snippet"] for message in messages], ["one", "two", "three"])
+        self.assertEqual(post.call_args.kwargs["idempotent"], True)
+        sent = post.call_args.kwargs["data"].decode()
+        self.assertEqual(
+            [line for line in sent.splitlines() if line.startswith("GET ")],
+            [f"GET /gmail/v1/users/me/messages/{message_id}?format=full" for message_id in ("m1", "m2", "m3")],
+        )
+        get.assert_called_once_with(
+            gmail_utils.gmail_api_url("/gmail/v1/users/me/messages/m3"), headers=self.headers, params={"format": "full"}
+        )
+
+    @mock.patch("integrations.gmail_utils.GMAIL_BATCH_LIMIT", 2)
+    @mock.patch("integrations.gmail_utils.http_client.get")
+    @mock.patch("integrations.gmail_utils.http_client.post")
+    def test_ids_are_sent_in_batches_of_the_limit(self, post, get):
+        post.return_value = self.batch_response()
+        get.return_value = make_response(content=json.dumps({"id": "m3", "snippet": "three"}).encode())
+
+        gmail_utils._batch_get_messages(["m1", "m2", "m3"], self.headers)
+
+        self.assertEqual(post.call_count, 2)
+
+
+@mock.patch("integrations.http_client.time.sleep")
+class HttpClientRetryTests(SimpleTestCase):
+    url = "https://api.example.com/v1/things"
+
+    def send(self, method, responses, **kwargs):
+        session = mock.Mock()
+        session.request.side_effect = responses
+        with mock.patch("integrations.http_client.get_session", return_value=session), \
+                mock.patch("integrations.http_client.logger"):
+            return http_client.request(method, self.url, **kwargs), session.request.call_count
+
+    def test_server_errors_are_retried_only_when_idempotent(self, sleep):
+        response, calls = self.send("POST", [make_response(503), make_response(200)])
+        self.assertEqual((response.status_code, calls), (503, 1))
+
+        response, calls = self.send("POST", [make_response(503), make_response(200)], idempotent=True)
+        self.assertEqual((response.status_code, calls), (200, 2))
+
+        response, calls = self.send("GET", [make_response(502), make_response(200)])
+        self.assertEqual((response.status_code, calls), (200, 2))
+
+        response, calls = self.send("GET", [make_response(500)] * 3, retries=2)
+        self.assertEqual((response.status_code, calls), (500, 3))
+
+    def test_rate_limits_are_retried_after_retry_after(self, sleep):
+        response, calls = self.send("POST", [make_response(429, headers={"Retry-After": "3"}), make_response(201)])
+
+        self.assertEqual((response.status_code, calls), (201, 2))
+        sleep.assert_called_once_with(3.0)
+
+    def test_retry_after_is_capped(self, sleep):
+        self.send("GET", [make_response(429, headers={"Retry-After": "3600"}), make_response(200)])
+
+        sleep.assert_called_once_with(http_client.BACKOFF_MAX)
+
+    def test_connection_errors(self, sleep):
+        # the request may have reached the server, so a POST is not sent again
+        with self.assertRaises(requests.ConnectionError):
+            self.send("POST", [requests.ConnectionError(), make_response(200)])
+
+        # a connect timeout never reached it
+        response, calls = self.send("POST", [requests.ConnectTimeout(), make_response(200)])
+        self.assertEqual((response.status_code, calls), (200, 2))
+
+        with self.assertRaises(requests.ReadTimeout):
+            self.send("GET", [requests.ReadTimeout()] * 2, retries=1)
+
+    def test_client_errors_are_returned(self, sleep):
+        response, calls = self.send("GET", [make_response(404)])
+
+        self.assertEqual((response.status_code, calls), (404, 1))
+        sleep.assert_not_called()
+
+
+class TokenRefreshTests(TestCase):
+    def setUp(self):
+        self.integration = Integration.objects.create(
+            org=Organization.objects.create(name="Acme"), provider="hubspot", access_token="old",
+            refresh_token="refresh", expires_at=timezone.now() + timedelta(hours=1),
+        )
+        self.addCleanup(tokens.forget_access_token, self.integration.id)
+        self.lock = mock.Mock()
+        self.lock.acquire.return_value = True
+        redis = mock.patch("integrations.tokens.get_redis")
+        redis.start().return_value.lock.return_value = self.lock
+        self.addCleanup(redis.stop)
+        self.refresh = mock.Mock(side_effect=self.store_token)
+
+    def store_token(self, integration, token="refreshed"):
+        integration.access_token = token
+        integration.expires_at = timezone.now() + timedelta(hours=1)
+        integration.save()
+
+    def expire(self):
+        Integration.objects.filter(id=self.integration.id).update(expires_at=timezone.now() + timedelta(minutes=1))
+        self.integration.refresh_from_db()
+
+    def test_rejected_token_is_refreshed_once(self):
+        token = tokens.refresh_access_token(self.integration, self.refresh, rejected_token="old")
+
+        self.assertEqual(token, "refreshed")
+        self.refresh.assert_called_once()
+        self.lock.release.assert_called_once_with()
+
+    def test_rejected_token_already_replaced_is_not_refreshed_again(self):
+        # another worker refreshed it after this one read "old"
+        self.store_token(Integration.objects.get(id=self.integration.id), "new")
+
+        token = tokens.refresh_access_token(self.integration, self.refresh, rejected_token="old")
+
+        self.assertEqual((token, self.integration.access_token), ("new", "new"))
+        self.refresh.assert_not_called()
+
+    def test_lock_timeout_returns_the_stored_token(self):
+        self.expire()
+        self.store_token(Integration.objects.get(id=self.integration.id), "new")
+        self.lock.acquire.return_value = False
+
+        with self.assertLogs("integrations.tokens", "WARNING"):
+            token = tokens.refresh_access_token(self.integration, self.refresh)
+
+        self.assertEqual(token, "new")
+        self.refresh.assert_not_called()
+        self.lock.release.assert_not_called()
+
+    def test_refreshes_without_redis(self):
+        self.expire()
+
+        with mock.patch("integrations.tokens.get_redis", side_effect=ConnectionError), \
+                self.assertLogs("integrations.tokens", "ERROR"):
+            token = tokens.refresh_access_token(self.integration, self.refresh)
+
+        self.assertEqual(token, "refreshed")
+
+    def test_access_token_is_cached_until_it_nears_expiry(self):
+        self.assertEqual(tokens.get_access_token(self.integration, self.refresh), "old")
+        with self.assertNumQueries(0):
+            self.assertEqual(tokens.get_access_token(self.integration, self.refresh), "old")
+        self.refresh.assert_not_called()
+
+        tokens.forget_access_token(self.integration.id)
+        self.expire()
+        self.assertEqual(tokens.get_access_token(self.integration, self.refresh), "refreshed")
+        self.refresh.assert_called_once()
+
+    def test_renew_expiring_tokens(self):
+        self.expire()
+        Integration.objects.create(
+            org=self.integration.org, provider="gmail", access_token="gmail", refresh_token="refresh",
+            expires_at=timezone.now() + timedelta(minutes=1),
+        )
+        failing = mock.Mock(side_effect=RuntimeError("revoked"))
+
+        with self.assertLogs("integrations.tokens", "ERROR"):
+            renewed = tokens.renew_expiring_tokens({"hubspot": self.refresh, "gmail": failing})
+
+        self.assertEqual(renewed, (1, 1))
+        self.integration.refresh_from_db()
+        self.assertEqual(self.integration.access_token, "refreshed")
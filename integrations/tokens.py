@@ -0,0 +1,127 @@
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.utils import timezone
+
+from crm.redis_client import get_redis
+from .models import Integration
+
+logger = logging.getLogger(__name__)
+
+# callers refresh a token themselves only this close to its expiry; the
+# renew_expiring_tokens task renews earlier, so normally they never have to
+TOKEN_REFRESH_MARGIN = timedelta(minutes=5)
+TOKEN_RENEW_AHEAD = timedelta(minutes=15)
+# seconds a process reuses an access token it has seen without looking again
+TOKEN_CACHE_TTL = 30
+# seconds one process may hold the refresh lock, and others wait for it
+REFRESH_LOCK_TIMEOUT = 30
+REFRESH_WAIT_SECONDS = 10
+
+TOKEN_FIELDS = ["access_token", "refresh_token", "expires_at"]
+
+_token_cache = {}
+_token_cache_lock = threading.Lock()
+
+
+def needs_refresh(expires_at, margin=TOKEN_REFRESH_MARGIN):
+    return expires_at is not None and timezone.now() >= expires_at - margin
+
+
+def _remember(integration):
+    with _token_cache_lock:
+        _token_cache[integration.id] = (
+            integration.access_token,
+            integration.expires_at,
+            time.monotonic() + TOKEN_CACHE_TTL,
+        )
+
+
+def forget_access_token(integration_id):
+    """Drops the cached token of an integration, e.g. after it was reconnected."""
+    with _token_cache_lock:
+        _token_cache.pop(integration_id, None)
+
+
+def get_access_token(integration, refresh):
+    """
+    A usable access token for ``integration``. Served from the in-process cache
+    while it is fresh; otherwise ``refresh(integration)``, the provider's
+    refresh function, is called through refresh_access_token when the token is
+    about to expire.
+    """
+    cached = _token_cache.get(integration.id)
+    if cached and cached[2] > time.monotonic() and not needs_refresh(cached[1]):
+        return cached[0]
+
+    if needs_refresh(integration.expires_at):
+        refresh_access_token(integration, refresh)
+    _remember(integration)
+    return integration.access_token
+
+
+def refresh_access_token(integration, refresh, margin=TOKEN_REFRESH_MARGIN, rejected_token=None):
+    """
+    Refreshes the token at most once across all processes: under a Redis lock
+    per integration, the stored token is read again and only refreshed if it
+    still expires within ``margin``, or is still ``rejected_token``, the one a
+    provider just answered 401 to. Waiters that time out use whatever is stored.
+    The current token fields are copied onto ``integration``; returns its token.
+    """
+    try:
+        lock = get_redis().lock(
+            f"lock:token-refresh:{integration.id}",
+            timeout=REFRESH_LOCK_TIMEOUT,
+            blocking_timeout=REFRESH_WAIT_SECONDS,
+        )
+        acquired = lock.acquire()
+    except Exception:
+        # refreshing without the lock only risks a duplicate refresh
+        logger.exception("Token refresh lock unavailable for integration %s", integration.id)
+        lock, acquired = None, True
+
+    try:
+        current = Integration.objects.get(id=integration.id)
+        if acquired:
+            if rejected_token is not None:
+                stale = current.access_token == rejected_token
+            else:
+                stale = needs_refresh(current.expires_at, margin)
+            if stale:
+                refresh(current)
+        else:
+            logger.warning("Gave up waiting for the token refresh of integration %s", integration.id)
+    finally:
+        if lock is not None and acquired:
+            try:
+                lock.release()
+            except Exception:
+                # expired while refreshing; the token was still saved
+                logger.exception("Token refresh lock of integration %s expired", integration.id)
+
+    for field in TOKEN_FIELDS:
+        setattr(integration, field, getattr(current, field))
+    _remember(integration)
+    return integration.access_token
+
+
+def renew_expiring_tokens(refreshers, ahead=TOKEN_RENEW_AHEAD):
+    """
+    Refreshes every integration whose token expires within ``ahead``, using
+    ``refreshers``, a mapping of provider to refresh function. Returns
+    ``(renewed, failed)`` counts; one failing integration does not stop the rest.
+    """
+    expiring = Integration.objects.filter(
+        provider__in=list(refreshers), expires_at__lt=timezone.now() + ahead
+    ).exclude(refresh_token="")
+    renewed = failed = 0
+    for integration in expiring:
+        try:
+            refresh_access_token(integration, refreshers[integration.provider], margin=ahead)
+            renewed += 1
+        except Exception:
+            logger.exception("Could not renew the token of integration %s", integration.id)
+            failed += 1
+    return renewed, failed
@@ -1,8 +1,8 @@
 # apps/integrations/utils.py
-import requests
 from django.utils import timezone
 from datetime import timedelta
 from django.conf import settings
+from . import http_client, tokens
 from .models import Integration
 from users.models import OrganizationConfigurations
 
@@ -24,7 +24,7 @@ def refresh_hubspot_token(integration: Integration):
         "refresh_token": integration.refresh_token,
     }
     headers = {"Content-Type": "application/x-www-form-urlencoded"}
-    resp = requests.post(HUBSPOT_TOKEN_URL, data=data, headers=headers, timeout=15)
+    resp = http_client.post(HUBSPOT_TOKEN_URL, data=data, headers=headers, idempotent=True)
     resp.raise_for_status()
     token_data = resp.json()
     expires_in = token_data.get("expires_in")
@@ -33,7 +33,7 @@ def refresh_hubspot_token(integration: Integration):
     if token_data.get("refresh_token"):
         integration.refresh_token = token_data["refresh_token"]
     integration.expires_at = expires_at
-    integration.save(update_fields=["access_token", "refresh_token", "expires_at"])
+    integration.save(update_fields=["access_token", "refresh_token", "expires_at", "updated_at"])
     return integration.access_token
 
 def hubspot_api_request(integration: Integration, method: str, path: str, **kwargs):
@@ -41,15 +41,15 @@ def hubspot_api_request(integration: Integration, method: str, path: str, **kwar
     Generic helper. Tries request and refreshes token on 401
     `path` is the API path, e.g. "/crm/v3/objects/contacts"
     """
-    access = integration.access_token
+    access = tokens.get_access_token(integration, refresh_hubspot_token)
     headers = kwargs.pop("headers", {})
     headers.setdefault("Authorization", f"Bearer {access}")
     url = HUBSPOT_API_BASE + path
-    resp = requests.request(method, url, headers=headers, timeout=20, **kwargs)
+    resp = http_client.request(method, url, headers=headers, **kwargs)
     if resp.status_code == 401:
-        # try refresh
-        access = refresh_hubspot_token(integration)
+        # try refresh, unless another worker already replaced the rejected token
+        access = tokens.refresh_access_token(integration, refresh_hubspot_token, rejected_token=access)
         headers["Authorization"] = f"Bearer {access}"
-        resp = requests.request(method, url, headers=headers, timeout=20, **kwargs)
+        resp = http_client.request(method, url, headers=headers, **kwargs)
     resp.raise_for_status()
     return resp.json()
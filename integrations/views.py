@@ -6,7 +6,11 @@ from django.http import JsonResponse
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 
+from campaigns.cache import INTEGRATIONS, cached_org_data
+from campaigns.conditional import conditional_list_response
 from users.models import Organization, User, OrganizationConfigurations
+from . import http_client, tokens
+from .utils import refresh_hubspot_token
 from .models import Integration
 from django.utils import timezone
 import requests
@@ -101,7 +105,7 @@ class GmailOAuthCallbackView(APIView):
 
             # Exchange code for tokens
             try:
-                r = requests.post(token_url, data=data, timeout=10)
+                r = http_client.post(token_url, data=data)
                 r.raise_for_status()
                 token_data = r.json()
             except requests.RequestException as e:
@@ -128,6 +132,7 @@ class GmailOAuthCallbackView(APIView):
                 )
             except Exception as e:
                 return JsonResponse({"error": f"Failed to save integration: {str(e)}"}, status=500)
+            tokens.forget_access_token(integration.id)
 
             # Get frontend URL from settings or use default
             frontend_origins = getattr(settings, 'FRONTEND_ORIGINS', 'http://localhost:3000')
@@ -274,7 +279,7 @@ class HubspotOAuthCallbackView(APIView):
             "code": code,
         }
 
-        r = requests.post(token_url, data=data, headers={"Content-Type": "application/x-www-form-urlencoded"})
+        r = http_client.post(token_url, data=data, headers={"Content-Type": "application/x-www-form-urlencoded"})
         token_data = r.json()
 
         if "access_token" not in token_data:
@@ -283,7 +288,7 @@ class HubspotOAuthCallbackView(APIView):
         expires_in = token_data.get("expires_in")  # e.g., 21600 seconds
         expires_at = timezone.now() + datetime.timedelta(seconds=expires_in) if expires_in else None
 
-        Integration.objects.update_or_create(
+        integration, _ = Integration.objects.update_or_create(
             org=user.org,
             provider="hubspot",
             defaults={
@@ -292,6 +297,7 @@ class HubspotOAuthCallbackView(APIView):
                 "expires_at": expires_at,  # ✅ proper datetime
             },
         )
+        tokens.forget_access_token(integration.id)
 
         return JsonResponse({
             "message": "HubSpot connected successfully",
@@ -313,9 +319,9 @@ class HubspotSyncContactsView(APIView):
             return Response({"error": "HubSpot not connected"}, status=400)
 
         url = "https://api.hubapi.com/crm/v3/objects/contacts"
-        headers = {"Authorization": f"Bearer {integration.access_token}"}
+        headers = {"Authorization": f"Bearer {tokens.get_access_token(integration, refresh_hubspot_token)}"}
 
-        r = requests.get(url, headers=headers)
+        r = http_client.get(url, headers=headers)
         if r.status_code != 200:
             return Response({"error": "Failed to fetch contacts", "details": r.json()}, status=400)
 
@@ -334,16 +340,24 @@ class IntegrationStatusView(APIView):
             return Response({"integrations": []})
 
         integrations = Integration.objects.filter(org=org)
-        data = []
-        for integration in integrations:
-            data.append(
-                {
-                    "id": str(integration.id),
-                    "provider": integration.provider,
-                    "expires_at": integration.expires_at,
-                }
-            )
-        return Response({"integrations": data})
+
+        def build_payload():
+            data = []
+            for integration in integrations:
+                data.append(
+                    {
+                        "id": str(integration.id),
+                        "provider": integration.provider,
+                        "expires_at": integration.expires_at,
+                    }
+                )
+            return {"integrations": data}
+
+        return conditional_list_response(
+            request,
+            [integrations],
+            lambda: Response(cached_org_data(org, "integration-status", (INTEGRATIONS,), build_payload)),
+        )
 
 
 class IntegrationDisconnectView(APIView):